@@ -198,33 +198,26 @@ def generate_system_metrics(**context):
             'user_analytics_records': user_analytics_count
         }
         
-        # Метрики S3/MinIO
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=S3_ENDPOINT,
-            aws_access_key_id=S3_ACCESS_KEY,
-            aws_secret_access_key=S3_SECRET_KEY
-        )
+        # Метрики S3/MinIO из инвентаря хранилища, который ведет API (без листинга bucket)
+        inventory = pg_hook.get_pandas_df("""
+            SELECT 
+                bucket,
+                SUM(object_count) as objects_count,
+                SUM(total_bytes) as total_size_bytes,
+                MIN(scanned_at) as scanned_at
+            FROM storage_inventory
+            GROUP BY bucket
+        """)
         
         storage_stats = {}
-        buckets = ['tracks', 'covers', 'playlists', 'temp']
-        
-        for bucket_name in buckets:
-            try:
-                response = s3_client.list_objects_v2(Bucket=bucket_name)
-                objects = response.get('Contents', [])
-                
-                total_size = sum(obj['Size'] for obj in objects)
-                object_count = len(objects)
-                
-                storage_stats[bucket_name] = {
-                    'objects_count': object_count,
-                    'total_size_bytes': total_size,
-                    'total_size_mb': round(total_size / (1024 * 1024), 2)
-                }
-                
-            except Exception as e:
-                storage_stats[bucket_name] = {'error': str(e)}
+        for _, row in inventory.iterrows():
+            total_size = int(row['total_size_bytes'])
+            storage_stats[row['bucket']] = {
+                'objects_count': int(row['objects_count']),
+                'total_size_bytes': total_size,
+                'total_size_mb': round(total_size / (1024 * 1024), 2),
+                'scanned_at': str(row['scanned_at'])
+            }
         
         metrics['storage_metrics'] = storage_stats
         
@@ -310,34 +303,23 @@ def cleanup_old_logs(**context):
             """)
             cleanup_summary['cleaned_items']['old_analytics'] = f"Removed {old_records_count} old analytics records"
         
-        # Очистка временных файлов в S3
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=S3_ENDPOINT,
-            aws_access_key_id=S3_ACCESS_KEY,
-            aws_secret_access_key=S3_SECRET_KEY
-        )
+        # Временные файлы S3 удаляет фоновая очистка API постранично и с продолжением
+        # с сохраненной позиции; здесь только ее последний отчет
+        temp_cleanup = pg_hook.get_first("""
+            SELECT position, report, updated_at
+            FROM maintenance_checkpoints
+            WHERE name = 'temp_cleanup'
+        """)
         
-        # Получаем файлы старше 24 часов из temp bucket
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        
-        try:
-            response = s3_client.list_objects_v2(Bucket='temp')
-            objects_to_delete = []
-            
-            for obj in response.get('Contents', []):
-                if obj['LastModified'].replace(tzinfo=None) < cutoff_time:
-                    objects_to_delete.append({'Key': obj['Key']})
-            
-            if objects_to_delete:
-                s3_client.delete_objects(
-                    Bucket='temp',
-                    Delete={'Objects': objects_to_delete}
-                )
-                cleanup_summary['cleaned_items']['temp_files'] = f"Removed {len(objects_to_delete)} temp files"
-            
-        except Exception as e:
-            cleanup_summary['cleaned_items']['temp_files'] = f"Error cleaning temp files: {e}"
+        if temp_cleanup and temp_cleanup[1]:
+            position, report, updated_at = temp_cleanup
+            cleanup_summary['cleaned_items']['temp_files'] = (
+                f"Removed {report.get('deleted', 0)} temp files "
+                f"({report.get('deleted_bytes', 0)} bytes) at {updated_at}, "
+                f"{'pass completed' if position is None else f'resumes after {position}'}"
+            )
+        else:
+            cleanup_summary['cleaned_items']['temp_files'] = "Temp cleanup has not run yet"
         
         logger.info("Cleanup completed successfully")
         return cleanup_summary
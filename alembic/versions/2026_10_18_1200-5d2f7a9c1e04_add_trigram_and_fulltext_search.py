@@ -0,0 +1,104 @@
+"""add_trigram_and_fulltext_search
+
+Revision ID: 5d2f7a9c1e04
+Revises: 0663bc15b5fd
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f7a9c1e04'
+down_revision: Union[str, None] = '0663bc15b5fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Вектор собирается из полей других таблиц, поэтому вместо GENERATED-колонки
+# (она не может ссылаться на другие таблицы) используются триггеры.
+# Веса A-D повторяют бусты Elasticsearch: title^3, artist_name^2, album_title, genre_name.
+TRACKS_SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION tracks_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce((SELECT name FROM artists WHERE id = NEW.artist_id), '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce((SELECT title FROM albums WHERE id = NEW.album_id), '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce((SELECT name FROM genres WHERE id = NEW.genre_id), '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRACKS_SEARCH_VECTOR_TRIGGER = """
+CREATE TRIGGER tracks_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, artist_id, album_id, genre_id ON tracks
+FOR EACH ROW EXECUTE FUNCTION tracks_search_vector_update();
+"""
+
+# Переименование артиста, альбома или жанра пересобирает векторы связанных треков
+PROPAGATION_TRIGGERS = [
+    ("artists", "name", "artist_id"),
+    ("albums", "title", "album_id"),
+    ("genres", "name", "genre_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('tracks', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(TRACKS_SEARCH_VECTOR_FUNCTION)
+    op.execute(TRACKS_SEARCH_VECTOR_TRIGGER)
+
+    for table, column, fk_column in PROPAGATION_TRIGGERS:
+        op.execute(f"""
+        CREATE OR REPLACE FUNCTION {table}_refresh_tracks_search_vector() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tracks SET title = title WHERE {fk_column} = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_refresh_tracks_search_vector_trigger
+        AFTER UPDATE OF {column} ON {table}
+        FOR EACH ROW WHEN (OLD.{column} IS DISTINCT FROM NEW.{column})
+        EXECUTE FUNCTION {table}_refresh_tracks_search_vector();
+        """)
+
+    # Заполняем вектор для существующих треков
+    op.execute("UPDATE tracks SET title = title")
+
+    op.create_index('ix_tracks_search_vector', 'tracks', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_tracks_title_trgm', 'tracks', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_artists_name_trgm', 'artists', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_albums_title_trgm', 'albums', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_genres_name_trgm', 'genres', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_genres_name_trgm', table_name='genres')
+    op.drop_index('ix_albums_title_trgm', table_name='albums')
+    op.drop_index('ix_artists_name_trgm', table_name='artists')
+    op.drop_index('ix_tracks_title_trgm', table_name='tracks')
+    op.drop_index('ix_tracks_search_vector', table_name='tracks')
+
+    for table, _, _ in PROPAGATION_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_refresh_tracks_search_vector_trigger ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_refresh_tracks_search_vector()")
+
+    op.execute("DROP TRIGGER IF EXISTS tracks_search_vector_trigger ON tracks")
+    op.execute("DROP FUNCTION IF EXISTS tracks_search_vector_update()")
+    op.drop_column('tracks', 'search_vector')
@@ -0,0 +1,57 @@
+"""add_hot_query_indexes
+
+Revision ID: 8b41e0c7d2a6
+Revises: 5d2f7a9c1e04
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41e0c7d2a6'
+down_revision: Union[str, None] = '5d2f7a9c1e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Индексы строятся CONCURRENTLY, чтобы не блокировать запись в рабочие таблицы
+INDEXES = [
+    ("ix_tracks_artist_id_popularity", "tracks", "artist_id, popularity DESC"),
+    ("ix_tracks_album_id", "tracks", "album_id"),
+    ("ix_tracks_genre_id", "tracks", "genre_id"),
+    ("ix_tracks_popularity_id", "tracks", "popularity DESC, id DESC"),
+    ("ix_albums_artist_id_release_date", "albums", "artist_id, release_date DESC"),
+    ("ix_albums_release_date", "albums", "release_date DESC"),
+    ("ix_playlist_tracks_playlist_id_position", "playlist_tracks", "playlist_id, position"),
+    ("ix_listening_history_user_id_played_at", "listening_history", "user_id, played_at DESC"),
+]
+
+INVALID_INDEX_QUERY = sa.text("""
+    SELECT 1 FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name AND NOT i.indisvalid
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    context = op.get_context()
+
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    with context.autocommit_block():
+        for name, table, columns in INDEXES:
+            # Прерванная сборка оставляет невалидный индекс, IF NOT EXISTS его не пересоберет
+            if not context.as_sql and op.get_bind().execute(INVALID_INDEX_QUERY, {"name": name}).first():
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,126 @@
+"""partition_listening_history_by_month
+
+Revision ID: c7e9a1f3b5d8
+Revises: 8b41e0c7d2a6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e9a1f3b5d8'
+down_revision: Union[str, None] = '8b41e0c7d2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Ключ партиционирования обязан входить в первичный ключ, поэтому PK — (id, played_at)
+PARTITIONED_TABLE = """
+CREATE TABLE listening_history (
+    id BIGINT NOT NULL DEFAULT nextval('listening_history_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    track_id INTEGER NOT NULL REFERENCES tracks (id),
+    played_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    play_duration_ms INTEGER,
+    completion_percentage DOUBLE PRECISION,
+    source VARCHAR(50),
+    device_type VARCHAR(50),
+    CONSTRAINT listening_history_pkey PRIMARY KEY (id, played_at)
+) PARTITION BY RANGE (played_at)
+"""
+
+# Партиции listening_history_pYYYYMM от самого старого месяца до трех месяцев вперед
+MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month_start date;
+    last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(played_at), now()))::date
+    INTO month_start
+    FROM listening_history_legacy;
+
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF listening_history FOR VALUES FROM (%L) TO (%L)',
+            'listening_history_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + interval '1 month')::date
+        );
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+END
+$$;
+"""
+
+COLUMNS = "id, user_id, track_id, played_at, play_duration_ms, completion_percentage, source, device_type"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE listening_history RENAME TO listening_history_legacy")
+    op.execute("ALTER TABLE listening_history_legacy RENAME CONSTRAINT listening_history_pkey TO listening_history_legacy_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_listening_history_id")
+    op.execute("DROP INDEX IF EXISTS ix_listening_history_played_at")
+    op.execute("DROP INDEX IF EXISTS ix_listening_history_user_id_played_at")
+
+    # Последовательность id переживает удаление старой таблицы
+    op.execute("CREATE SEQUENCE IF NOT EXISTS listening_history_id_seq")
+    op.execute("ALTER SEQUENCE listening_history_id_seq OWNED BY NONE")
+
+    op.execute(PARTITIONED_TABLE)
+    op.execute("CREATE TABLE listening_history_default PARTITION OF listening_history DEFAULT")
+    op.execute(MONTHLY_PARTITIONS)
+
+    op.execute(f"""
+        INSERT INTO listening_history ({COLUMNS})
+        SELECT id, user_id, track_id, coalesce(played_at, 'epoch'::timestamp), play_duration_ms,
+               completion_percentage, source, device_type
+        FROM listening_history_legacy
+    """)
+    op.execute("""
+        SELECT setval('listening_history_id_seq', coalesce(max(id), 0) + 1, false)
+        FROM listening_history
+    """)
+    op.execute("DROP TABLE listening_history_legacy")
+    op.execute("ALTER SEQUENCE listening_history_id_seq OWNED BY listening_history.id")
+
+    # Индексы на родительской таблице каскадно создаются во всех партициях, в том числе будущих
+    op.execute("CREATE INDEX ix_listening_history_user_id_played_at ON listening_history (user_id, played_at DESC)")
+    op.execute("CREATE INDEX ix_listening_history_played_at ON listening_history (played_at)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE listening_history RENAME TO listening_history_partitioned")
+    op.execute("ALTER TABLE listening_history_partitioned RENAME CONSTRAINT listening_history_pkey TO listening_history_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_listening_history_user_id_played_at")
+    op.execute("DROP INDEX IF EXISTS ix_listening_history_played_at")
+    op.execute("ALTER SEQUENCE listening_history_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE listening_history (
+            id BIGINT NOT NULL DEFAULT nextval('listening_history_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            track_id INTEGER NOT NULL REFERENCES tracks (id),
+            played_at TIMESTAMP WITHOUT TIME ZONE,
+            play_duration_ms INTEGER,
+            completion_percentage DOUBLE PRECISION,
+            source VARCHAR(50),
+            device_type VARCHAR(50),
+            CONSTRAINT listening_history_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"""
+        INSERT INTO listening_history ({COLUMNS})
+        SELECT {COLUMNS} FROM listening_history_partitioned
+    """)
+    op.execute("DROP TABLE listening_history_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE listening_history_id_seq OWNED BY listening_history.id")
+
+    op.create_index('ix_listening_history_id', 'listening_history', ['id'], unique=False)
+    op.create_index('ix_listening_history_played_at', 'listening_history', ['played_at'], unique=False)
+    op.execute("CREATE INDEX ix_listening_history_user_id_played_at ON listening_history (user_id, played_at DESC)")
@@ -0,0 +1,92 @@
+"""add_play_counters
+
+Revision ID: e4a2c9d71b35
+Revises: c7e9a1f3b5d8
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a2c9d71b35'
+down_revision: Union[str, None] = 'c7e9a1f3b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ["tracks", "albums", "artists"]
+
+# Значения по умолчанию POPULARITY_HALF_LIFE_HOURS (168) и POPULARITY_LOG_SCALE (10)
+HALF_LIFE_SECONDS = 168 * 3600
+LOG_SCALE = 10
+
+NOW = "(now() AT TIME ZONE 'utc')"
+
+# Затухание ограничено 1000 периодами полураспада: power() в PostgreSQL падает на underflow.
+# К счету из истории добавляется счет, соответствующий импортированной popularity,
+# поэтому пересчитанная popularity не ниже импортированной
+SEED_SCORE = f"(exp(coalesce(t.popularity, 0) / {LOG_SCALE}.0) - 1)"
+
+BACKFILL_TRACKS = f"""
+UPDATE tracks t
+SET play_count = s.plays,
+    popularity_score = s.score + {SEED_SCORE},
+    score_updated_at = {NOW},
+    popularity = LEAST(100, ROUND({LOG_SCALE} * ln(1 + s.score + {SEED_SCORE})))::integer
+FROM (
+    SELECT track_id,
+           count(*) AS plays,
+           sum(power(0.5, LEAST(extract(epoch FROM {NOW} - played_at) / {HALF_LIFE_SECONDS}, 1000))) AS score
+    FROM listening_history
+    GROUP BY track_id
+) s
+WHERE t.id = s.track_id
+"""
+
+BACKFILL_PARENT = """
+UPDATE {table} p
+SET play_count = s.plays, popularity_score = s.score, score_updated_at = {now}
+FROM (
+    SELECT {key} AS id, sum(play_count) AS plays, sum(popularity_score) AS score
+    FROM tracks
+    WHERE {key} IS NOT NULL AND play_count > 0
+    GROUP BY {key}
+) s
+WHERE p.id = s.id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # DEFAULT-константа не переписывает таблицу (PostgreSQL 11+)
+    for table in TABLES:
+        op.add_column(table, sa.Column('play_count', sa.BigInteger(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('popularity_score', sa.Float(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('score_updated_at', sa.DateTime(), nullable=True))
+
+    op.execute(BACKFILL_TRACKS)
+    op.execute(BACKFILL_PARENT.format(table="albums", key="album_id", now=NOW))
+    op.execute(BACKFILL_PARENT.format(table="artists", key="artist_id", now=NOW))
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_popularity_score "
+                f"ON {table} (popularity_score DESC)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_popularity_score")
+
+    for table in reversed(TABLES):
+        op.drop_column(table, 'score_updated_at')
+        op.drop_column(table, 'popularity_score')
+        op.drop_column(table, 'play_count')
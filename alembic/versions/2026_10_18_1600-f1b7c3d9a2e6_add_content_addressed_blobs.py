@@ -0,0 +1,61 @@
+"""add_content_addressed_blobs
+
+Revision ID: f1b7c3d9a2e6
+Revises: e4a2c9d71b35
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7c3d9a2e6'
+down_revision: Union[str, None] = 'e4a2c9d71b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'storage_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('refcount', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('unreferenced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(
+        'ix_storage_blobs_unreferenced_at', 'storage_blobs', ['unreferenced_at'],
+        postgresql_where=sa.text('refcount = 0')
+    )
+
+    op.create_table(
+        'blob_references',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('blob_sha256', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('track_id', sa.Integer(), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['blob_sha256'], ['storage_blobs.sha256']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['track_id'], ['tracks.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blob_references_blob_sha256_user_id', 'blob_references', ['blob_sha256', 'user_id'])
+    op.create_index('ix_blob_references_track_id', 'blob_references', ['track_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blob_references_track_id', table_name='blob_references')
+    op.drop_index('ix_blob_references_blob_sha256_user_id', table_name='blob_references')
+    op.drop_table('blob_references')
+    op.drop_index('ix_storage_blobs_unreferenced_at', table_name='storage_blobs')
+    op.drop_table('storage_blobs')
@@ -0,0 +1,47 @@
+"""add_stored_objects_catalog
+
+Revision ID: a9d4e2f6c8b1
+Revises: f1b7c3d9a2e6
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e2f6c8b1'
+down_revision: Union[str, None] = 'f1b7c3d9a2e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stored_objects',
+        sa.Column('s3_key', sa.String(length=1024), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('etag', sa.String(length=100), nullable=True),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('last_modified', sa.DateTime(), nullable=True),
+        sa.Column('synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('s3_key')
+    )
+    op.create_index(
+        'ix_stored_objects_user_id_last_modified', 'stored_objects', ['user_id', 'last_modified']
+    )
+    op.create_index(
+        'ix_blob_references_user_id_created_at', 'blob_references', ['user_id', 'created_at']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blob_references_user_id_created_at', table_name='blob_references')
+    op.drop_index('ix_stored_objects_user_id_last_modified', table_name='stored_objects')
+    op.drop_table('stored_objects')
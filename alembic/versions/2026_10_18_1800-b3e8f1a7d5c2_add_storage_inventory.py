@@ -0,0 +1,37 @@
+"""add_storage_inventory
+
+Revision ID: b3e8f1a7d5c2
+Revises: a9d4e2f6c8b1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1a7d5c2'
+down_revision: Union[str, None] = 'a9d4e2f6c8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'storage_inventory',
+        sa.Column('bucket', sa.String(length=63), nullable=False),
+        sa.Column('prefix', sa.String(length=255), nullable=False),
+        sa.Column('object_count', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('scanned_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('bucket', 'prefix')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('storage_inventory')
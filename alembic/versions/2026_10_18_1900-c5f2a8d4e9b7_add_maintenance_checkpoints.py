@@ -0,0 +1,36 @@
+"""add_maintenance_checkpoints
+
+Revision ID: c5f2a8d4e9b7
+Revises: b3e8f1a7d5c2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f2a8d4e9b7'
+down_revision: Union[str, None] = 'b3e8f1a7d5c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'maintenance_checkpoints',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('position', sa.String(length=1024), nullable=True),
+        sa.Column('report', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('maintenance_checkpoints')
@@ -0,0 +1,53 @@
+"""add_resumable_uploads
+
+Revision ID: d7a3c9e1f5b8
+Revises: c5f2a8d4e9b7
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3c9e1f5b8'
+down_revision: Union[str, None] = 'c5f2a8d4e9b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'resumable_uploads',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('track_id', sa.Integer(), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('expected_sha256', sa.String(length=64), nullable=True),
+        sa.Column('staging_key', sa.String(length=255), nullable=False),
+        sa.Column('s3_upload_id', sa.String(length=1024), nullable=False),
+        sa.Column('part_size', sa.Integer(), nullable=False),
+        sa.Column('received_bytes', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('parts', postgresql.JSONB(astext_type=sa.Text()), server_default='[]', nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['track_id'], ['tracks.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_resumable_uploads_expires_at', 'resumable_uploads', ['expires_at'], unique=False)
+    op.create_index('ix_resumable_uploads_user_id', 'resumable_uploads', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_resumable_uploads_user_id', table_name='resumable_uploads')
+    op.drop_index('ix_resumable_uploads_expires_at', table_name='resumable_uploads')
+    op.drop_table('resumable_uploads')
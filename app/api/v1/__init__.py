@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.db.database import read_only_for_get
 
 from app.api.v1.endpoints import (  # noqa
     albums,
@@ -14,12 +16,16 @@ from app.api.v1.endpoints import (  # noqa
 )
 
 api_router = APIRouter()
+
+# Каталог только читается через GET: такие запросы идут в read-only транзакции
+catalog_dependencies = [Depends(read_only_for_get)]
+
 api_router.include_router(auth.router, tags=["Auth"], prefix="/auth")
-api_router.include_router(tracks.router, tags=["Tracks"], prefix="/tracks")
-api_router.include_router(artists.router, tags=["Artists"], prefix="/artists")
-api_router.include_router(albums.router, tags=["Albums"], prefix="/albums")
-api_router.include_router(genres.router, tags=["Genres"], prefix="/genres")
-api_router.include_router(search.router, tags=["Search"], prefix="/search")
+api_router.include_router(tracks.router, tags=["Tracks"], prefix="/tracks", dependencies=catalog_dependencies)
+api_router.include_router(artists.router, tags=["Artists"], prefix="/artists", dependencies=catalog_dependencies)
+api_router.include_router(albums.router, tags=["Albums"], prefix="/albums", dependencies=catalog_dependencies)
+api_router.include_router(genres.router, tags=["Genres"], prefix="/genres", dependencies=catalog_dependencies)
+api_router.include_router(search.router, tags=["Search"], prefix="/search", dependencies=catalog_dependencies)
 api_router.include_router(upload.router, tags=["Upload"], prefix="/upload")
 api_router.include_router(users.router, tags=["Users"], prefix="/users")
 api_router.include_router(analytics.router, tags=["Analytics"], prefix="/analytics")
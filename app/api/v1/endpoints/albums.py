@@ -1,11 +1,12 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.album import Album, AlbumCreate, AlbumUpdate
 from app.services.album_service import AlbumService
 from app.services.artist_service import ArtistService
 from app.services.search_service import SearchService
+from app.core.pagination import set_next_cursor_header
 from app.db.database import get_db
 
 router = APIRouter()
@@ -21,14 +22,21 @@ async def get_search_service(db: AsyncSession = Depends(get_db)) -> SearchServic
 
 @router.get("/", response_model=List[Album], summary="Получить список альбомов")
 async def read_albums(
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     album_service: AlbumService = Depends(get_album_service)
 ):
     """
     Получить список альбомов с пагинацией.
+    Для глубоких страниц передавайте cursor из заголовка X-Next-Cursor вместо skip.
     """
-    albums = await album_service.get_albums(skip=skip, limit=limit)
+    try:
+        albums = await album_service.get_albums(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, albums, limit)
     return albums
 
 @router.post("/", response_model=Album, status_code=201, summary="Создать новый альбом")
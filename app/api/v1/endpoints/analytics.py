@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
 from app.schemas.user_activity import ListeningEvent, AnalyticsStats
 from app.services.clickhouse_service import clickhouse_service
 from app.core.deps import get_current_user
+from app.core.responses import FastJSONResponse
 from app.db.models import User
 
 router = APIRouter()
@@ -941,7 +942,8 @@ async def get_user_analytics_by_id(
                 'listening_count': day.get('listening_count', 0)
             })
         
-        return {
+        # Большой ответ из словарей: orjson напрямую, без прохода jsonable_encoder
+        return FastJSONResponse({
             "search_stats": {
                 "total_searches": search_count,
                 "unique_queries": unique_queries,
@@ -962,7 +964,7 @@ async def get_user_analytics_by_id(
             "search_history": formatted_search_history,
             "top_tracks": formatted_top_tracks,
             "activity_timeline": formatted_timeline
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user analytics: {str(e)}")
@@ -1,10 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.artist import Artist, ArtistCreate, ArtistUpdate
 from app.services.artist_service import ArtistService
 from app.services.search_service import SearchService
+from app.core.pagination import set_next_cursor_header
 from app.db.database import get_db
 
 router = APIRouter()
@@ -17,14 +18,21 @@ async def get_search_service(db: AsyncSession = Depends(get_db)) -> SearchServic
 
 @router.get("/", response_model=List[Artist], summary="Получить список исполнителей")
 async def read_artists(
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     artist_service: ArtistService = Depends(get_artist_service)
 ):
     """
     Получить список исполнителей с пагинацией.
+    Для глубоких страниц передавайте cursor из заголовка X-Next-Cursor вместо skip.
     """
-    artists = await artist_service.get_artists(skip=skip, limit=limit)
+    try:
+        artists = await artist_service.get_artists(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, artists, limit)
     return artists
 
 @router.post("/", response_model=Artist, status_code=201, summary="Создать нового исполнителя")
@@ -106,14 +114,20 @@ async def delete_artist(
 
 @router.get("/{artist_id}/tracks", response_model=List[dict], summary="Получить треки исполнителя")
 async def get_artist_tracks(
+    response: Response,
     artist_id: int = Path(..., title="ID исполнителя", ge=1),
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     artist_service: ArtistService = Depends(get_artist_service)
 ):
     """
     Получить треки конкретного исполнителя.
     """
-    tracks = await artist_service.get_artist_tracks(artist_id=artist_id, limit=limit)
+    try:
+        tracks = await artist_service.get_artist_tracks(artist_id=artist_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, tracks, limit)
     return tracks
 
 @router.get("/{artist_id}/albums", response_model=List[dict], summary="Получить альбомы исполнителя")
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
+from app.core.pagination import next_cursor_headers, set_next_cursor_header
+from app.core.responses import payload_cache
 from app.db.database import get_db
 from app.schemas.genre import Genre, GenreCreate, GenreUpdate, GenreWithStats
-from app.services.genre_service import GenreService
+from app.services.genre_service import GenreService, GENRES_TAG
 
 router = APIRouter()
 
+GENRE_LIST = TypeAdapter(List[Genre])
+
 
 @router.post("/", response_model=Genre, status_code=status.HTTP_201_CREATED)
 async def create_genre(
@@ -29,13 +34,30 @@ async def create_genre(
 
 @router.get("/", response_model=List[Genre])
 async def get_genres(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     db: AsyncSession = Depends(get_db)
 ):
     """Получить список жанров"""
     genre_service = GenreService(db)
-    return await genre_service.get_all(skip=skip, limit=limit)
+    if cursor is None and skip == 0:
+        # Первая страница — горячий и редко меняющийся ответ, отдается готовыми байтами
+        return await payload_cache.get_or_render(
+            f"genres:list:{limit}",
+            lambda: genre_service.get_all(limit=limit),
+            GENRE_LIST,
+            tags=[GENRES_TAG],
+            headers=lambda genres: next_cursor_headers(genres, limit)
+        )
+
+    try:
+        genres = await genre_service.get_all(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    set_next_cursor_header(response, genres, limit)
+    return genres
 
 
 @router.get("/{genre_id}", response_model=Genre)
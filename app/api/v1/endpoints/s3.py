@@ -1,10 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
-from fastapi.responses import RedirectResponse
-from typing import Optional, List, Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Header, Body, Response
+from starlette.requests import ClientDisconnect
+from typing import Optional, List, Dict, Any, AsyncIterator
 import logging
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.s3_service import s3_service
+from app.core.config import settings
+from app.db.database import get_db
+from app.db.models import Album, Playlist, PlaylistTrack, ResumableUpload, Track
+from app.services.s3_service import async_s3_service
+from app.services.s3_multipart import UploadTooLarge
+from app.services.track_streaming import IMMUTABLE_CACHE_CONTROL, s3_object_response
+from app.services.object_catalog import ObjectCatalogService
+from app.services.storage_inventory import run_storage_rescan, storage_inventory
+from app.services.temp_cleanup import run_temp_cleanup
+from app.services.blob_storage import BlobStorageService, ChecksumMismatch, StoredBlob, blob_key, normalize_sha256, parse_blob_key
+from app.services.resumable_uploads import ResumableUploadService, UploadConflict, UploadNotFound
 from app.core.deps import get_current_user
 from app.schemas.user import User
 
@@ -12,60 +24,275 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ALLOWED_TRACK_TYPES = ['audio/mpeg', 'audio/wav', 'audio/flac', 'audio/mp4', 'audio/m4a']
+# Размер куска чтения; части в S3 собираются из кусков до S3_MULTIPART_PART_SIZE
+UPLOAD_READ_CHUNK = 1024 * 1024
+# Сколько ключей можно подписать одним запросом
+MAX_URL_BATCH = 500
+
+
+def _check_track_type(content_type: Optional[str]):
+    if content_type not in ALLOWED_TRACK_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неподдерживаемый тип файла. Разрешены: {', '.join(ALLOWED_TRACK_TYPES)}"
+        )
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Файл слишком большой. Максимальный размер: {max_size // (1024 * 1024)}MB"
+    )
+
+
+async def _read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(UPLOAD_READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _store_track(chunks: AsyncIterator[bytes], filename: str, content_type: str,
+                       current_user: User, db: AsyncSession,
+                       content_sha256: Optional[str], track_id: Optional[int]) -> Dict[str, Any]:
+    expected_sha256 = _expected_sha256(content_sha256)
+    await _authorize_track_attach(track_id, current_user, db)
+    
+    max_size = settings.TRACK_UPLOAD_MAX_BYTES
+    try:
+        stored = await BlobStorageService(db).store_stream(
+            chunks,
+            user_id=current_user.id,
+            filename=filename,
+            content_type=content_type,
+            max_size=max_size,
+            expected_sha256=expected_sha256,
+            track_id=track_id
+        )
+    except UploadTooLarge:
+        raise _too_large(max_size)
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error uploading track: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка загрузки файла")
+    
+    return _stored_track_response(stored, filename, current_user)
+
+
+def _expected_sha256(content_sha256: Optional[str]) -> Optional[str]:
+    if content_sha256 is None:
+        return None
+    expected_sha256 = normalize_sha256(content_sha256)
+    if expected_sha256 is None:
+        raise HTTPException(status_code=400, detail="X-Content-SHA256 должен содержать 64 hex-символа")
+    return expected_sha256
+
+
+async def _authorize_track_attach(track_id: Optional[int], current_user: User, db: AsyncSession):
+    """Привязать файл к треку может только его исполнитель или администратор"""
+    if track_id is None:
+        return
+    allowed = await BlobStorageService(db).can_attach(track_id, current_user.id, current_user.role == "admin")
+    if allowed is None:
+        raise HTTPException(status_code=404, detail="Трек не найден")
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Недостаточно прав для изменения файла трека")
+
+
+def _stored_track_response(stored: StoredBlob, filename: str, current_user: User) -> Dict[str, Any]:
+    s3_key = blob_key(stored.sha256)
+    logger.info(f"Track uploaded by user {current_user.id}: {filename} -> {s3_key} (deduplicated: {stored.deduplicated})")
+    return {
+        "success": True,
+        "message": "Трек успешно загружен",
+        "data": {
+            "s3_key": s3_key,
+            "file_size": stored.size,
+            "file_hash": stored.sha256,
+            "deduplicated": stored.deduplicated,
+            "url": async_s3_service.get_track_url(s3_key)
+        }
+    }
+
+
 @router.post("/tracks/upload")
 async def upload_track(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    track_id: Optional[int] = Query(None, ge=1, description="Трек, к которому привязать файл"),
+    content_sha256: Optional[str] = Header(None, alias="X-Content-SHA256"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Загрузка трека в S3
+    Файл хранится один раз под blobs/{sha256}; повторная загрузка того же содержимого
+    добавляет только ссылку. С заголовком X-Content-SHA256 файла, уже загруженного этим пользователем, содержимое не передается в S3.
     """
-    allowed_types = ['audio/mpeg', 'audio/wav', 'audio/flac', 'audio/mp4', 'audio/m4a']
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Неподдерживаемый тип файла. Разрешены: {', '.join(allowed_types)}"
-        )
+    _check_track_type(file.content_type)
     
-    max_size = 100 * 1024 * 1024  
-    contents = await file.read()
-    if len(contents) > max_size:
-        raise HTTPException(
-            status_code=400,
-            detail="Файл слишком большой. Максимальный размер: 100MB"
-        )
+    if file.size is not None and file.size > settings.TRACK_UPLOAD_MAX_BYTES:
+        raise _too_large(settings.TRACK_UPLOAD_MAX_BYTES)
+    
+    return await _store_track(
+        _read_chunks(file), file.filename, file.content_type, current_user, db, content_sha256, track_id
+    )
+
+@router.put("/tracks/upload/stream")
+async def upload_track_stream(
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    track_id: Optional[int] = Query(None, ge=1, description="Трек, к которому привязать файл"),
+    content_sha256: Optional[str] = Header(None, alias="X-Content-SHA256"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Потоковая загрузка трека: тело запроса — содержимое файла, тип — в Content-Type
+    Тело не буферизуется ни в памяти, ни на диске; лимит размера проверяется по ходу чтения.
+    С заголовком X-Content-SHA256 файла, уже загруженного этим пользователем, тело не читается.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    _check_track_type(content_type)
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.TRACK_UPLOAD_MAX_BYTES:
+        raise _too_large(settings.TRACK_UPLOAD_MAX_BYTES)
+    
+    return await _store_track(
+        request.stream(), filename, content_type, current_user, db, content_sha256, track_id
+    )
+
+def _upload_headers(upload: ResumableUpload) -> Dict[str, str]:
+    return {
+        "Upload-Offset": str(upload.received_bytes),
+        "Upload-Length": str(upload.total_size),
+        "Upload-Expires": upload.expires_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-store"
+    }
+
+
+def _upload_error(e: Exception) -> HTTPException:
+    if isinstance(e, UploadNotFound):
+        return HTTPException(status_code=404, detail="Загрузка не найдена или истекла")
+    if isinstance(e, UploadConflict):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, UploadTooLarge):
+        return HTTPException(status_code=413, detail="Данные выходят за объявленный Upload-Length")
+    if isinstance(e, ChecksumMismatch):
+        return HTTPException(status_code=400, detail=str(e))
+    logger.error(f"Error in resumable upload: {e}")
+    return HTTPException(status_code=500, detail="Ошибка загрузки файла")
+
+
+@router.post("/tracks/uploads", status_code=201)
+async def create_resumable_upload(
+    response: Response,
+    filename: str = Query(..., min_length=1, max_length=255),
+    content_type: str = Query(..., description="MIME-тип файла"),
+    upload_length: int = Header(..., alias="Upload-Length", ge=1),
+    track_id: Optional[int] = Query(None, ge=1, description="Трек, к которому привязать файл"),
+    content_sha256: Optional[str] = Header(None, alias="X-Content-SHA256"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Создание возобновляемой загрузки
+    Байты передаются запросами PATCH со смещением; после обрыва принятое смещение
+    возвращает HEAD, загрузка продолжается с него без повторной передачи принятых байтов.
+    """
+    _check_track_type(content_type)
+    if upload_length > settings.RESUMABLE_UPLOAD_MAX_BYTES:
+        raise _too_large(settings.RESUMABLE_UPLOAD_MAX_BYTES)
+    expected_sha256 = _expected_sha256(content_sha256)
+    await _authorize_track_attach(track_id, current_user, db)
     
     try:
-        from io import BytesIO
-        file_content = BytesIO(contents)
-        
-        result = s3_service.upload_track(
-            file_content=file_content,
-            filename=file.filename,
-            user_id=current_user.id,
-            metadata={
-                'content_type': file.content_type,
-                'size': len(contents)
-            }
+        upload = await ResumableUploadService(db).create(
+            current_user.id, filename, content_type, upload_length, expected_sha256, track_id
         )
-        
-        if result['success']:
-            logger.info(f"Track uploaded by user {current_user.id}: {file.filename}")
-            return {
-                "success": True,
-                "message": "Трек успешно загружен",
-                "data": {
-                    "s3_key": result['s3_key'],
-                    "file_size": result['file_size'],
-                    "url": result['url']
-                }
-            }
-        else:
-            raise HTTPException(status_code=500, detail=result['error'])
-            
     except Exception as e:
-        logger.error(f"Error uploading track: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка загрузки файла")
+        raise _upload_error(e)
+    
+    response.headers.update(_upload_headers(upload))
+    response.headers["Location"] = f"{settings.API_V1_STR}/s3/tracks/uploads/{upload.id}"
+    return {
+        "success": True,
+        "data": {
+            "upload_id": upload.id,
+            "offset": upload.received_bytes,
+            "length": upload.total_size,
+            # Смещение растет на целые части: PATCH кратный part_size не теряет хвост
+            "part_size": upload.part_size,
+            "expires_at": upload.expires_at
+        }
+    }
+
+@router.head("/tracks/uploads/{upload_id}")
+async def get_resumable_upload_offset(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """Принятое смещение загрузки в заголовке Upload-Offset"""
+    try:
+        upload = await ResumableUploadService(db).get(upload_id, current_user.id)
+    except UploadNotFound as e:
+        raise _upload_error(e)
+    return Response(status_code=200, headers=_upload_headers(upload))
+
+@router.patch("/tracks/uploads/{upload_id}", status_code=204)
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    Дозапись байтов с позиции Upload-Offset; тело не буферизуется целиком.
+    Новое смещение — в заголовке ответа Upload-Offset, с него продолжается следующий PATCH.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type должен быть application/offset+octet-stream")
+    
+    try:
+        upload = await ResumableUploadService(db).append(upload_id, current_user.id, upload_offset, request.stream())
+    except ClientDisconnect:
+        logger.info(f"Resumable upload {upload_id}: client disconnected")
+        return Response(status_code=204)
+    except Exception as e:
+        raise _upload_error(e)
+    return Response(status_code=204, headers=_upload_headers(upload))
+
+@router.post("/tracks/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """Завершение загрузки: объект собирается из частей и сохраняется как блоб"""
+    try:
+        upload, stored = await ResumableUploadService(db).complete(upload_id, current_user.id)
+    except Exception as e:
+        raise _upload_error(e)
+    return _stored_track_response(stored, upload.filename, current_user)
+
+@router.delete("/tracks/uploads/{upload_id}", status_code=204)
+async def abort_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """Отмена загрузки; уже переданные части удаляются из S3"""
+    try:
+        await ResumableUploadService(db).abort(upload_id, current_user.id)
+    except Exception as e:
+        raise _upload_error(e)
+    return Response(status_code=204)
 
 @router.post("/covers/upload")
 async def upload_cover(
@@ -102,7 +329,7 @@ async def upload_cover(
         from io import BytesIO
         file_content = BytesIO(contents)
         
-        result = s3_service.upload_cover(
+        result = await async_s3_service.upload_cover(
             file_content=file_content,
             filename=file.filename,
             track_id=track_id,
@@ -126,20 +353,40 @@ async def upload_cover(
         logger.error(f"Error uploading cover: {e}")
         raise HTTPException(status_code=500, detail="Ошибка загрузки обложки")
 
+async def _authorize_track_key(s3_key: str, current_user: User, db: AsyncSession):
+    """404, если файла нет; 403, если он не принадлежит пользователю"""
+    sha256 = parse_blob_key(s3_key)
+    if sha256 is not None:
+        blobs = BlobStorageService(db)
+        if not await blobs.blob_exists(sha256):
+            raise HTTPException(status_code=404, detail="Трек не найден")
+        if current_user.role != "admin" and not await blobs.has_reference(sha256, current_user.id):
+            raise HTTPException(status_code=403, detail="Недостаточно прав")
+        return
+    
+    metadata = await async_s3_service.get_track_metadata(s3_key)
+    if not metadata:
+        raise HTTPException(status_code=404, detail="Трек не найден")
+    
+    track_user_id = metadata.get('metadata', {}).get('user-id')
+    if track_user_id and str(current_user.id) != track_user_id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+
 @router.get("/tracks/user/{user_id}")
 async def get_user_tracks(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    limit: int = Query(100, le=1000)
+    limit: int = Query(100, le=1000),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    Получение списка треков пользователя
+    Получение списка треков пользователя из каталога в PostgreSQL, без запросов к S3
     """
     if current_user.id != user_id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     
     try:
-        tracks = s3_service.list_user_tracks(user_id, limit)
+        tracks = await ObjectCatalogService(db).list_user_tracks(user_id, limit)
         
         return {
             "success": True,
@@ -154,25 +401,124 @@ async def get_user_tracks(
         logger.error(f"Error getting user tracks: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения списка треков")
 
-@router.get("/tracks/{s3_key}/url")
+async def _authorize_track_keys(s3_keys: List[str], current_user: User, db: AsyncSession):
+    """Проверка прав на список ключей двумя-тремя запросами вместо запроса на каждый ключ"""
+    is_admin = current_user.role == "admin"
+    sha256s = {s3_key: parse_blob_key(s3_key) for s3_key in s3_keys}
+    accessible = await BlobStorageService(db).accessible_blobs(
+        [sha256 for sha256 in sha256s.values() if sha256],
+        None if is_admin else current_user.id
+    )
+    # Старые ключи имеют вид users/{user_id}/..., владелец виден по префиксу без head_object
+    own_prefix = f"users/{current_user.id}/"
+    denied = [
+        s3_key for s3_key, sha256 in sha256s.items()
+        if (sha256 not in accessible if sha256 else not (is_admin or s3_key.startswith(own_prefix)))
+    ]
+    if denied:
+        raise HTTPException(status_code=403, detail=f"Недостаточно прав: {', '.join(denied[:10])}")
+
+async def _track_urls(track_ids: List[int], expires_in: int, db: AsyncSession) -> List[Dict[str, Any]]:
+    """URL загруженных файлов для треков в заданном порядке; у треков без файла url = None"""
+    sha256s = await BlobStorageService(db).track_blobs(track_ids)
+    urls = await async_s3_service.get_track_urls([blob_key(sha256) for sha256 in sha256s.values()], expires_in)
+    return [
+        {
+            "track_id": track_id,
+            "url": urls.get(blob_key(sha256s[track_id])) if track_id in sha256s else None
+        }
+        for track_id in track_ids
+    ]
+
+@router.post("/tracks/urls")
+async def get_track_urls(
+    s3_keys: List[str] = Body(..., embed=True, min_length=1, max_length=MAX_URL_BATCH),
+    expires_in: int = Body(3600, embed=True, ge=60, le=86400),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Presigned URL для списка треков одним запросом
+    """
+    s3_keys = list(dict.fromkeys(s3_keys))
+    await _authorize_track_keys(s3_keys, current_user, db)
+    
+    urls = await async_s3_service.get_track_urls(s3_keys, expires_in)
+    return {
+        "success": True,
+        "data": {
+            "urls": urls,
+            "expires_in": expires_in
+        }
+    }
+
+@router.get("/albums/{album_id}/urls")
+async def get_album_track_urls(
+    album_id: int,
+    current_user: User = Depends(get_current_user),
+    expires_in: int = Query(3600, ge=60, le=86400),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Presigned URL всех треков альбома
+    """
+    if await db.scalar(select(Album.id).where(Album.id == album_id)) is None:
+        raise HTTPException(status_code=404, detail="Альбом не найден")
+    
+    track_ids = (await db.scalars(
+        select(Track.id).where(Track.album_id == album_id).order_by(Track.id)
+    )).all()
+    return {
+        "success": True,
+        "data": {
+            "album_id": album_id,
+            "tracks": await _track_urls(list(track_ids), expires_in, db),
+            "expires_in": expires_in
+        }
+    }
+
+@router.get("/playlists/{playlist_id}/urls")
+async def get_playlist_track_urls(
+    playlist_id: int,
+    current_user: User = Depends(get_current_user),
+    expires_in: int = Query(3600, ge=60, le=86400),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Presigned URL всех треков плейлиста в порядке позиций
+    """
+    playlist = await db.get(Playlist, playlist_id)
+    if playlist is None:
+        raise HTTPException(status_code=404, detail="Плейлист не найден")
+    if not playlist.is_public and playlist.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    track_ids = (await db.scalars(
+        select(PlaylistTrack.track_id).where(PlaylistTrack.playlist_id == playlist_id).order_by(PlaylistTrack.position)
+    )).all()
+    return {
+        "success": True,
+        "data": {
+            "playlist_id": playlist_id,
+            "tracks": await _track_urls(list(track_ids), expires_in, db),
+            "expires_in": expires_in
+        }
+    }
+
+@router.get("/tracks/{s3_key:path}/url")
 async def get_track_url(
     s3_key: str,
     current_user: User = Depends(get_current_user),
-    expires_in: int = Query(3600, le=86400)  
+    expires_in: int = Query(3600, le=86400),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Получение presigned URL для трека
     """
     try:
-        metadata = s3_service.get_track_metadata(s3_key)
-        if not metadata:
-            raise HTTPException(status_code=404, detail="Трек не найден")
+        await _authorize_track_key(s3_key, current_user, db)
         
-        track_user_id = metadata.get('metadata', {}).get('user-id')
-        if track_user_id and str(current_user.id) != track_user_id and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="Недостаточно прав")
-        
-        url = s3_service.get_track_url(s3_key, expires_in)
+        url = async_s3_service.get_track_url(s3_key, expires_in)
         
         if url:
             return {
@@ -191,29 +537,21 @@ async def get_track_url(
         logger.error(f"Error getting track URL: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения URL трека")
 
-@router.get("/tracks/{s3_key}/stream")
+@router.get("/tracks/{s3_key:path}/stream")
 async def stream_track(
+    request: Request,
     s3_key: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Перенаправление на поток трека
+    Поток трека через API с поддержкой Range (206), ETag и If-None-Match (304)
     """
     try:
-        metadata = s3_service.get_track_metadata(s3_key)
-        if not metadata:
-            raise HTTPException(status_code=404, detail="Трек не найден")
-    
-        track_user_id = metadata.get('metadata', {}).get('user-id')
-        if track_user_id and str(current_user.id) != track_user_id and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="Недостаточно прав")
-        
-        url = s3_service.get_track_url(s3_key, expires_in=3600)
+        await _authorize_track_key(s3_key, current_user, db)
         
-        if url:
-            return RedirectResponse(url=url)
-        else:
-            raise HTTPException(status_code=500, detail="Ошибка генерации URL")
+        cache_control = IMMUTABLE_CACHE_CONTROL if parse_blob_key(s3_key) else "private, no-cache"
+        return await s3_object_response(request, s3_key, cache_control)
             
     except HTTPException:
         raise
@@ -221,26 +559,34 @@ async def stream_track(
         logger.error(f"Error streaming track: {e}")
         raise HTTPException(status_code=500, detail="Ошибка стриминга трека")
 
-@router.delete("/tracks/{s3_key}")
+@router.delete("/tracks/{s3_key:path}")
 async def delete_track(
     s3_key: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Удаление трека из S3
+    Для blobs/{sha256} удаляется ссылка пользователя; сам файл удалит сборщик мусора,
+    когда ссылок не останется
     """
     try:
-        metadata = s3_service.get_track_metadata(s3_key)
-        if not metadata:
-            raise HTTPException(status_code=404, detail="Трек не найден")
+        sha256 = parse_blob_key(s3_key)
+        if sha256 is not None:
+            if not await BlobStorageService(db).release(sha256, current_user.id):
+                raise HTTPException(status_code=404, detail="Трек не найден")
+            logger.info(f"Blob reference released by user {current_user.id}: {s3_key}")
+            return {
+                "success": True,
+                "message": "Трек успешно удален"
+            }
         
-        track_user_id = metadata.get('metadata', {}).get('user-id')
-        if track_user_id and str(current_user.id) != track_user_id and current_user.role != "admin":
-            raise HTTPException(status_code=403, detail="Недостаточно прав")
+        await _authorize_track_key(s3_key, current_user, db)
         
-        success = s3_service.delete_track(s3_key)
+        success = await async_s3_service.delete_track(s3_key)
         
         if success:
+            await ObjectCatalogService(db).forget(s3_key)
             logger.info(f"Track deleted by user {current_user.id}: {s3_key}")
             return {
                 "success": True,
@@ -257,13 +603,14 @@ async def delete_track(
 
 @router.get("/storage/stats")
 async def get_storage_stats(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    Получение статистики использования хранилища
+    Получение статистики использования хранилища из инвентаря, без листинга S3
     """
     try:
-        stats = s3_service.get_storage_stats()
+        stats = await storage_inventory.stats(db)
         
         return {
             "success": True,
@@ -286,36 +633,125 @@ async def cleanup_temp_files(
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     
     try:
-        deleted_count = s3_service.cleanup_temp_files(older_than_hours)
+        report = await run_temp_cleanup(older_than_hours)
+    except Exception as e:
+        logger.error(f"Error cleaning up temp files: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка очистки временных файлов")
+    
+    if report is None:
+        raise HTTPException(status_code=409, detail="Очистка уже выполняется")
+    
+    logger.info(f"Temp files cleanup by admin {current_user.id}: {report['deleted']} files")
+    
+    return {
+        "success": True,
+        "message": f"Удалено {report['deleted']} временных файлов",
+        "data": {
+            "deleted_files": report['deleted'],
+            "deleted_bytes": report['deleted_bytes'],
+            "scanned": report['scanned'],
+            "completed": report['completed'],
+            "older_than_hours": older_than_hours
+        }
+    }
+
+@router.post("/maintenance/gc-blobs")
+async def collect_blob_garbage(
+    current_user: User = Depends(get_current_user),
+    grace_hours: float = Query(settings.BLOB_GC_GRACE_HOURS, ge=0, le=24 * 30),
+    limit: int = Query(500, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Удаление файлов без ссылок (только для администраторов)
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    try:
+        removed = await BlobStorageService(db).collect_garbage(grace_hours=grace_hours, limit=limit)
         
-        logger.info(f"Temp files cleanup by admin {current_user.id}: {deleted_count} files")
+        logger.info(f"Blob GC by admin {current_user.id}: {removed} blobs")
         
         return {
             "success": True,
-            "message": f"Удалено {deleted_count} временных файлов",
+            "message": f"Удалено {removed} файлов без ссылок",
             "data": {
-                "deleted_files": deleted_count,
-                "older_than_hours": older_than_hours
+                "deleted_blobs": removed,
+                "grace_hours": grace_hours
             }
         }
         
     except Exception as e:
-        logger.error(f"Error cleaning up temp files: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка очистки временных файлов")
+        logger.error(f"Error collecting blob garbage: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка очистки файлов")
+
+@router.post("/maintenance/reconcile-catalog")
+async def reconcile_object_catalog(
+    current_user: User = Depends(get_current_user),
+    user_id: Optional[int] = Query(None, ge=1, description="Сверить только файлы этого пользователя"),
+    db: AsyncSession = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Сверка каталога файлов с S3 (только для администраторов)
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    try:
+        result = await ObjectCatalogService(db).reconcile(user_id)
+        
+        logger.info(f"Object catalog reconciled by admin {current_user.id}: {result}")
+        
+        return {
+            "success": True,
+            "message": f"Проверено {result['scanned']} файлов",
+            "data": result
+        }
+        
+    except Exception as e:
+        logger.error(f"Error reconciling object catalog: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка сверки каталога")
+
+@router.post("/maintenance/rescan-inventory")
+async def rescan_storage_inventory(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Полная сверка инвентаря хранилища с S3 (только для администраторов)
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    try:
+        result = await run_storage_rescan(force=True)
+    except Exception as e:
+        logger.error(f"Error rescanning storage inventory: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка сверки инвентаря")
+    
+    if result is None:
+        raise HTTPException(status_code=409, detail="Сверка уже выполняется")
+    
+    logger.info(f"Storage inventory rescanned by admin {current_user.id}")
+    return {
+        "success": True,
+        "data": result
+    }
 
 @router.get("/health")
-async def s3_health_check() -> Dict[str, Any]:
+async def s3_health_check(db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     """
-    Проверка состояния S3 сервиса
+    Проверка состояния S3 сервиса: один короткий листинг и объем из инвентаря
     """
     try:
-        stats = s3_service.get_storage_stats()
+        await async_s3_service.list_objects_page(async_s3_service.tracks_bucket, max_keys=1)
+        stats = await storage_inventory.stats(db)
         
         return {
             "success": True,
             "status": "healthy",
             "data": {
-                "endpoint": s3_service.endpoint_url,
+                "endpoint": async_s3_service.endpoint_url,
                 "buckets_count": len(stats.get('buckets', {})),
                 "total_objects": stats.get('total_objects', 0),
                 "total_size_mb": stats.get('total_size_mb', 0)
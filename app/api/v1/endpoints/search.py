@@ -5,7 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.track import TrackWithDetails
 from app.schemas.artist import Artist
 from app.schemas.album import Album
+from app.schemas.search import Suggestion
 from app.services.search_service import SearchService
+from app.services.suggest_index import suggest_index
+from app.services.search_cache import search_cache
 from app.db.database import get_db
 
 router = APIRouter()
@@ -30,4 +33,33 @@ async def multi_entity_search_endpoint(
         raise HTTPException(status_code=503, detail="Elasticsearch service is not available")
 
     results = await search_service.multi_entity_search(query=query, limit=limit)
-    return results 
\ No newline at end of file
+    return results
+
+
+@router.get(
+    "/suggest/",
+    response_model=List[Suggestion],
+    summary="Автодополнение поискового запроса"
+)
+async def suggest_endpoint(
+    query: str = Query(..., min_length=1, description="Начало поискового запроса"),
+    limit: int = Query(default=10, ge=1, le=20)
+):
+    """
+    Подсказки по трекам и артистам из in-memory индекса префиксов, без обращения к БД.
+    """
+    if not suggest_index.ready:
+        raise HTTPException(status_code=503, detail="Suggest index is not ready")
+
+    return [
+        Suggestion(text=entry.text, type=entry.kind, id=entry.entity_id)
+        for entry in suggest_index.suggest(query, limit=limit)
+    ]
+
+
+@router.get("/cache/stats", summary="Статистика кэша поиска")
+async def search_cache_stats() -> Dict[str, Any]:
+    """
+    Доля попаданий и сэкономленное время кэша ответов поиска.
+    """
+    return search_cache.stats()
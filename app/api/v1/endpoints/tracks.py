@@ -1,15 +1,24 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.track import Track, TrackCreate, TrackUpdate, TrackSearchResponse, TrackUploadFromURL, TrackUploadResponse
-from app.services.track_service import TrackService
+from app.schemas.user_activity import ListenBatch, ListenBatchResult
+from app.services.track_service import TrackService, POPULAR_TRACKS_TAG
 from app.services.analytics_service import AnalyticsService
 from app.services.search_service import SearchService
+from app.services.blob_storage import BlobStorageService, blob_key
+from app.services.track_streaming import REVALIDATE_CACHE_CONTROL, local_file_response, resolve_local_track, s3_object_response
+from app.core.pagination import set_next_cursor_header
+from app.core.responses import payload_cache
 from app.db.database import get_db
 
 router = APIRouter()
 
+TRACK_LIST = TypeAdapter(List[Track])
+
 async def get_track_service(db: AsyncSession = Depends(get_db)) -> TrackService:
     return TrackService(db)
 
@@ -21,14 +30,21 @@ async def get_search_service(db: AsyncSession = Depends(get_db)) -> SearchServic
 
 @router.get("/", response_model=List[Track], summary="Получить список треков")
 async def read_tracks(
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     track_service: TrackService = Depends(get_track_service)
 ):
     """
     Получить список треков с пагинацией.
+    Для глубоких страниц передавайте cursor из заголовка X-Next-Cursor вместо skip.
     """
-    tracks = await track_service.get_tracks(skip=skip, limit=limit)
+    try:
+        tracks = await track_service.get_tracks(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, tracks, limit)
     return tracks
 
 @router.post("/", response_model=Track, status_code=201, summary="Создать новый трек")
@@ -96,20 +112,26 @@ async def search_tracks_endpoint(
     album: Optional[str] = Query(None, description="Фильтр по альбому"),
     limit: int = Query(default=10, ge=1, le=50),
     offset: int = Query(default=0, ge=0, description="Смещение для пагинации"),
+    cursor: Optional[str] = Query(None, description="Курсор next_cursor из предыдущего ответа"),
     search_service: SearchService = Depends(get_search_service)
 ):
     """
     Поиск треков по названию, исполнителю, с фильтрацией по жанру и году.
+    Для глубокой пагинации (бесконечная лента) передавайте next_cursor вместо offset.
     """
-    results = await search_service.search_tracks(
-        query=query, 
-        genre=genre, 
-        year=year,
-        artist=artist,
-        album=album,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        results = await search_service.search_tracks(
+            query=query, 
+            genre=genre, 
+            year=year,
+            artist=artist,
+            album=album,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return results
 
 @router.get("/{track_id}", response_model=Track, summary="Получить трек по ID")
@@ -165,6 +187,26 @@ async def delete_track(
     
     await search_service.delete_entity(index="tracks", entity_id=track_id)
 
+@router.post("/listen/batch", response_model=ListenBatchResult, summary="Записать пачку прослушиваний")
+async def record_track_listens_batch(
+    request: Request,
+    batch: ListenBatch = Body(...),
+    analytics_service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Записать накопленные прослушивания одним запросом, например офлайн-прослушивания
+    мобильного клиента. События с несуществующими треками пропускаются и перечисляются в ответе.
+    """
+    result = await analytics_service.record_listening_events(
+        user_id=batch.user_id,
+        events=batch.events,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent")
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return result
+
 @router.post("/{track_id}/listen", status_code=204, summary="Записать прослушивание трека")
 async def record_track_listen(
     track_id: int = Path(..., title="ID трека", ge=1),
@@ -179,6 +221,30 @@ async def record_track_listen(
         track_id=track_id
     )
 
+@router.get("/{track_id}/stream", summary="Потоковое воспроизведение трека")
+async def stream_track(
+    request: Request,
+    track_id: int = Path(..., title="ID трека", ge=1),
+    db: AsyncSession = Depends(get_db),
+    track_service: TrackService = Depends(get_track_service)
+):
+    """
+    Аудио трека с поддержкой Range (перемотка), ETag и If-None-Match.
+    Загруженный файл проксируется из хранилища, иначе отдается локальный файл трека.
+    """
+    sha256 = await BlobStorageService(db).track_blob(track_id)
+    if sha256:
+        return await s3_object_response(request, blob_key(sha256), REVALIDATE_CACHE_CONTROL)
+
+    db_track = await track_service.get_track_by_id(track_id=track_id)
+    if db_track is None:
+        raise HTTPException(status_code=404, detail="Track not found")
+
+    path = await asyncio.to_thread(resolve_local_track, db_track.file_path) if db_track.file_path else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Track file not found")
+    return await local_file_response(request, path)
+
 @router.get("/popular/", response_model=List[Track], summary="Получить популярные треки")
 async def get_popular_tracks(
     limit: int = Query(default=20, ge=1, le=100),
@@ -187,7 +253,12 @@ async def get_popular_tracks(
     """
     Получить список популярных треков на основе количества прослушиваний.
     """
-    return await track_service.get_popular_tracks(limit=limit)
+    return await payload_cache.get_or_render(
+        f"tracks:popular:{limit}",
+        lambda: track_service.get_popular_tracks(limit=limit),
+        TRACK_LIST,
+        tags=[POPULAR_TRACKS_TAG]
+    )
 
 @router.get("/recommendations/{user_id}", response_model=List[Track], summary="Получить рекомендации для пользователя")
 async def get_track_recommendations(
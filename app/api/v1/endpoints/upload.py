@@ -1,13 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, Form
-import aiofiles
-import os
-from sqlalchemy.orm import Session
+from pathlib import Path
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db 
 from app.schemas.track import TrackUploadFromFile, Track as TrackSchema, TrackMetadataForAlbumUpload 
 from app.db.models import Track as TrackModel 
 from datetime import datetime
 from app.schemas.album import AlbumCreate, Album as AlbumSchema
 from app.db.models import Album as AlbumModel 
+from app.services.album_upload import MetadataMismatch, match_metadata, remove_files, write_files
 
 router = APIRouter()
 
@@ -17,22 +18,13 @@ UPLOAD_DIR = "app/static/tracks"
 async def create_upload_file(
     file: UploadFile = File(...),
     data: str = Form(...), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     track_data = TrackUploadFromFile.parse_raw(data) 
 
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR)
-
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{track_data.title}_{datetime.now().strftime("%Y%m%d%H%M%S")}{file_extension}"
-    file_location = os.path.join(UPLOAD_DIR, unique_filename)
-    relative_file_path = f"static/tracks/{unique_filename}"
-
     try:
-        async with aiofiles.open(file_location, "wb") as out_file:
-            while content := await file.read(1024):  
-                await out_file.write(content)
+        (written_file,) = await write_files([(file.filename, file.file)], Path(UPLOAD_DIR))
+        relative_file_path = f"static/tracks/{written_file.path.name}"
         
         db_track = TrackModel(
             title=track_data.title,
@@ -45,8 +37,8 @@ async def create_upload_file(
             created_at=datetime.utcnow()
         )
         db.add(db_track)
-        db.commit()
-        db.refresh(db_track)
+        await db.commit()
+        await db.refresh(db_track)
 
         return TrackSchema.model_validate(db_track) 
     except Exception as e:
@@ -60,7 +52,7 @@ async def create_upload_album(
     album_data: str = Form(...),
     track_data: str = Form(...),
     files: list[UploadFile] = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         album_info = AlbumCreate.parse_raw(album_data)
@@ -71,60 +63,59 @@ async def create_upload_album(
             detail=f"Неверный формат метаданных: {e}"
         )
 
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR)
-
-    db_album = AlbumModel(
-        title=album_info.title,
-        artist_id=album_info.artist_id,
-        release_date=album_info.release_date,
-        genre_id=album_info.genre_id,
-        created_at=datetime.utcnow()
-    )
-    db.add(db_album)
-    db.flush() 
-
-    uploaded_tracks = []
-
-    for file in files:
-        track_meta = next((tm for tm in tracks_metadata if tm.file_name == file.filename), None)
-        if not track_meta:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Метаданные для файла {file.filename} не найдены."
-            )
+    try:
+        files_metadata = match_metadata([file.filename for file in files], tracks_metadata)
+    except MetadataMismatch as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{track_meta.title}_{datetime.now().strftime("%Y%m%d%H%M%S")}{file_extension}"
-        file_location = os.path.join(UPLOAD_DIR, unique_filename)
-        relative_file_path = f"static/tracks/{unique_filename}"
+    # Файлы копируются параллельно до открытия транзакции; при ошибке записи в БД они удаляются
+    try:
+        written = await write_files([(file.filename, file.file) for file in files], Path(UPLOAD_DIR))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Не удалось загрузить файлы альбома: {e}"
+        )
 
-        try:
-            async with aiofiles.open(file_location, "wb") as out_file:
-                while content := await file.read(1024):
-                    await out_file.write(content)
-            
-            db_track = TrackModel(
-                title=track_meta.title,
-                artist_id=db_album.artist_id, 
-                album_id=db_album.id, 
-                genre_id=track_meta.genre_id or db_album.genre_id, 
-                explicit=track_meta.explicit,
-                duration_ms=track_meta.duration_ms,
-                file_path=relative_file_path,
-                created_at=datetime.utcnow()
-            )
-            db.add(db_track)
-            uploaded_tracks.append(TrackSchema.model_validate(db_track))
+    try:
+        db_album = AlbumModel(
+            title=album_info.title,
+            artist_id=album_info.artist_id,
+            release_date=album_info.release_date,
+            genre_id=album_info.genre_id,
+            created_at=datetime.utcnow()
+        )
+        db.add(db_album)
+        await db.flush()
+
+        now = datetime.utcnow()
+        db_tracks = (await db.scalars(
+            insert(TrackModel).returning(TrackModel, sort_by_parameter_order=True),
+            [
+                {
+                    'title': track_meta.title,
+                    'artist_id': db_album.artist_id,
+                    'album_id': db_album.id,
+                    'genre_id': track_meta.genre_id or db_album.genre_id,
+                    'explicit': track_meta.explicit,
+                    'duration_ms': track_meta.duration_ms,
+                    'file_path': f"static/tracks/{written_file.path.name}",
+                    'created_at': now
+                }
+                for track_meta, written_file in zip(files_metadata, written)
+            ]
+        )).all()
+        uploaded_tracks = [TrackSchema.model_validate(db_track) for db_track in db_tracks]
+
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        await remove_files([written_file.path for written_file in written])
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Не удалось сохранить данные альбома: {e}"
+        )
 
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Не удалось загрузить файл {file.filename} или сохранить данные трека: {e}"
-            )
-    
-    db.commit() 
-    db.refresh(db_album)
+    await db.refresh(db_album)
 
-    return {"album": AlbumSchema.model_validate(db_album), "tracks": uploaded_tracks} 
+    return {"album": AlbumSchema.model_validate(db_album), "tracks": uploaded_tracks}
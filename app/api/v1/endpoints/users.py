@@ -1,10 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends
+from fastapi import APIRouter, HTTPException, Query, Body, Path, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.services.user_service import UserService
 from app.services.analytics_service import AnalyticsService
+from app.core.pagination import set_next_cursor_header
 from app.db.database import get_db
 
 router = APIRouter()
@@ -17,14 +18,21 @@ async def get_analytics_service(db: AsyncSession = Depends(get_db)) -> Analytics
 
 @router.get("/", response_model=List[User], summary="Получить список пользователей")
 async def read_users(
+    response: Response,
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
     user_service: UserService = Depends(get_user_service)
 ):
     """
     Получить список пользователей с пагинацией.
+    Для глубоких страниц передавайте cursor из заголовка X-Next-Cursor вместо skip.
     """
-    users = await user_service.get_users(skip=skip, limit=limit)
+    try:
+        users = await user_service.get_users(skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor_header(response, users, limit)
     return users
 
 @router.post("/", response_model=User, status_code=201, summary="Создать нового пользователя")
@@ -35,6 +35,34 @@ class Settings(BaseSettings):
             f"{values.get('POSTGRES_DB')}"
         )
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+    DB_APPLICATION_NAME: str = "jonquils-backend"
+    # Роль процесса выбирает statement_timeout: API короткий, фоновые задачи и ETL длиннее, 0 — без лимита
+    DB_ROLE: str = "api"
+    DB_STATEMENT_TIMEOUTS_MS: dict[str, int] = {"api": 15000, "worker": 300000, "etl": 0}
+    # Реплики для read-only запросов (JSON-список URL в окружении)
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+    # Сколько секунд после записи клиент читает с primary; 0 — отключено
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+    # Месячные партиции listening_history: сколько создавать вперед и сколько хранить до архивации в S3
+    LISTENING_HISTORY_PARTITIONS_AHEAD: int = 3
+    LISTENING_HISTORY_RETENTION_MONTHS: int = 13
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 6 * 3600
+    # Счетчики прослушиваний: период сброса в базу и размер пачки UPDATE
+    PLAY_COUNTERS_FLUSH_SECONDS: float = 5.0
+    PLAY_COUNTERS_BATCH_SIZE: int = 1000
+    # Популярность: период полураспада счета, множитель логарифмической шкалы 0-100 и период затухания
+    POPULARITY_HALF_LIFE_HOURS: float = 168.0
+    POPULARITY_LOG_SCALE: float = 10.0
+    POPULARITY_DECAY_INTERVAL_SECONDS: float = 3600.0
+
   
     CLICKHOUSE_HOST: str = "localhost"
     CLICKHOUSE_PORT: int = 9000
@@ -47,6 +75,24 @@ class Settings(BaseSettings):
     ELASTICSEARCH_PORT: int = 9200
     ELASTICSEARCH_USERNAME: Optional[str] = None
     ELASTICSEARCH_PASSWORD: Optional[str] = None
+    SEARCH_HYDRATION_CACHE_TTL_SECONDS: float = 30.0
+    SEARCH_HYDRATION_CACHE_SIZE: int = 10000
+    # Ссылки трека на исполнителя, альбом и жанр для записи прослушиваний
+    TRACK_METADATA_CACHE_TTL_SECONDS: float = 300.0
+    TRACK_METADATA_CACHE_SIZE: int = 50000
+    SUGGEST_SNAPSHOT_PATH: str = "data/suggest_index.json.gz"
+    SUGGEST_TOP_K: int = 10
+    # Проверка каталога и пересборка индекса автодополнения (переименования видны не позже MAX_AGE)
+    SUGGEST_REFRESH_INTERVAL_SECONDS: float = 300.0
+    SUGGEST_MAX_AGE_SECONDS: float = 6 * 3600.0
+    SEARCH_FALLBACK_COUNT_CAP: int = 1000
+    SEARCH_PIT_KEEP_ALIVE: str = "1m"
+    SEARCH_CACHE_BACKEND: str = "memory"
+    SEARCH_CACHE_TTL_SECONDS: float = 15.0
+    SEARCH_CACHE_SIZE: int = 5000
+    # Сериализованные горячие ответы (жанры, популярные треки)
+    PAYLOAD_CACHE_TTL_SECONDS: float = 60.0
+    PAYLOAD_CACHE_SIZE: int = 256
 
 
     REDIS_HOST: str = "localhost"
@@ -63,6 +109,44 @@ class Settings(BaseSettings):
     S3_COVERS_BUCKET: str = "covers"
     S3_PLAYLISTS_BUCKET: str = "playlists"
     S3_TEMP_BUCKET: str = "temp"
+    S3_ARCHIVE_BUCKET: str = "archive"
+    # Потоковая загрузка: размер части multipart (не меньше 5 МБ) и число частей в полете
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+    TRACK_UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    # Возобновляемые загрузки: предельный размер файла, срок жизни незавершенной загрузки
+    # (продлевается каждой принятой частью) и аренда на время одного PATCH
+    RESUMABLE_UPLOAD_MAX_BYTES: int = 4 * 1024 * 1024 * 1024
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: float = 24.0
+    RESUMABLE_UPLOAD_LEASE_SECONDS: float = 300.0
+    # Сколько ключей запрашивать у S3 за страницу list_objects_v2 при сверке каталога
+    OBJECT_CATALOG_PAGE_SIZE: int = 1000
+    # Инвентарь хранилища: период сброса приращений, возраст сверки, после которого она повторяется,
+    # и число одновременных листингов префиксов
+    STORAGE_INVENTORY_FLUSH_SECONDS: float = 10.0
+    STORAGE_INVENTORY_RESCAN_HOURS: float = 24.0
+    STORAGE_INVENTORY_CONCURRENCY: int = 8
+    # Очистка bucket temp: возраст удаляемых объектов, число одновременных пачек delete_objects,
+    # лимит удалений в секунду (0 — без лимита), бюджет времени одного прохода и период запуска
+    TEMP_CLEANUP_OLDER_THAN_HOURS: int = 24
+    TEMP_CLEANUP_CONCURRENCY: int = 4
+    TEMP_CLEANUP_MAX_DELETES_PER_SECOND: float = 5000.0
+    TEMP_CLEANUP_TIME_BUDGET_SECONDS: float = 600.0
+    TEMP_CLEANUP_INTERVAL_SECONDS: float = 3600.0
+    # Кэш presigned URL: запись живет долю срока действия URL, остаток гарантирован клиенту
+    PRESIGNED_URL_CACHE_TTL_RATIO: float = 0.5
+    PRESIGNED_URL_CACHE_SIZE: int = 100000
+    # Размер куска при проксировании аудио из S3; в памяти на запрос не больше двух кусков
+    TRACK_STREAM_CHUNK_SIZE: int = 256 * 1024
+    # Сколько часов блоб без ссылок хранится до удаления сборщиком мусора
+    BLOB_GC_GRACE_HOURS: float = 24.0
+    # Пул потоков для вызовов boto3 и пул HTTP-соединений botocore (не меньше числа потоков)
+    S3_EXECUTOR_WORKERS: int = 16
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    S3_READ_TIMEOUT_SECONDS: float = 60.0
+    # Ограничение времени на запросы метаданных, листинги и удаления
+    S3_OPERATION_TIMEOUT_SECONDS: float = 30.0
 
    
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -73,6 +157,9 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  
     MAX_COVER_SIZE: int = 10 * 1024 * 1024  
+    # Загрузка альбома на диск: число файлов, копируемых одновременно, и размер буфера копирования
+    ALBUM_UPLOAD_CONCURRENCY: int = 4
+    ALBUM_UPLOAD_BUFFER_SIZE: int = 1024 * 1024
 
   
     AIRFLOW_WEBSERVER_URL: str = "http://localhost:8080"
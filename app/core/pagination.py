@@ -0,0 +1,113 @@
+"""
+Пагинация по курсорам
+Непрозрачный курсор — base64url от компактного JSON, клиент передает его обратно без изменений.
+Keyset-пагинация списков продолжает выборку после ключа последнего элемента страницы.
+"""
+
+import base64
+import binascii
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import BigInteger, Integer, Numeric, Float, Select, SmallInteger, String, tuple_
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.types import TypeEngine
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Кодирует состояние пагинации в строку курсора"""
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Декодирует курсор; ValueError для поврежденного курсора"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid pagination cursor")
+
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid pagination cursor")
+    return payload
+
+
+def _key_value_fits(value: Any, type_: TypeEngine) -> bool:
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(type_, Integer):
+        bits = 64 if isinstance(type_, BigInteger) else 16 if isinstance(type_, SmallInteger) else 32
+        return isinstance(value, int) and -2 ** (bits - 1) <= value < 2 ** (bits - 1)
+    if isinstance(type_, (Float, Numeric)):
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    if isinstance(type_, String):
+        return isinstance(value, str) and (type_.length is None or len(value) <= type_.length)
+    return isinstance(value, (int, float, str))
+
+
+def check_cursor_key(after: Any, types: Sequence[TypeEngine]) -> List[Any]:
+    """
+    Проверяет ключ из курсора по типам столбцов: ValueError, если ключ другой длины
+    или значение не помещается в столбец (иначе база ответила бы ошибкой)
+    """
+    if not isinstance(after, list) or len(after) != len(types):
+        raise ValueError("Invalid pagination cursor")
+    if not all(_key_value_fits(value, type_) for value, type_ in zip(after, types)):
+        raise ValueError("Invalid pagination cursor")
+    return after
+
+
+def _by_id(item: Any) -> Sequence[Any]:
+    return (item.id,)
+
+
+def apply_keyset(query: Select, key_columns: Sequence[ColumnElement], cursor: Optional[str]) -> Select:
+    """
+    Keyset-пагинация: сортирует по ключу и продолжает строго после позиции курсора.
+    Стоимость страницы не зависит от ее глубины, в отличие от OFFSET.
+    """
+    query = query.order_by(*key_columns)
+    if cursor is None:
+        return query
+
+    after = check_cursor_key(decode_cursor(cursor).get("k"), [column.type for column in key_columns])
+
+    if len(key_columns) == 1:
+        return query.where(key_columns[0] > after[0])
+    return query.where(tuple_(*key_columns) > tuple_(*after))
+
+
+def next_keyset_cursor(
+    items: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]] = _by_id
+) -> Optional[str]:
+    """Курсор следующей страницы по последнему элементу; None, если страница неполная"""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor({"k": list(key(items[-1]))})
+
+
+def next_cursor_headers(
+    items: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]] = _by_id
+) -> Dict[str, str]:
+    """Заголовок X-Next-Cursor для страницы; пустой словарь, если страница последняя"""
+    cursor = next_keyset_cursor(items, limit, key)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor is not None else {}
+
+
+def set_next_cursor_header(
+    response: Response,
+    items: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]] = _by_id
+) -> None:
+    """Передает курсор следующей страницы в заголовке X-Next-Cursor"""
+    response.headers.update(next_cursor_headers(items, limit, key))
@@ -0,0 +1,133 @@
+"""
+Рендеринг JSON-ответов
+FastJSONResponse (orjson) — класс ответа приложения по умолчанию. Горячие, редко меняющиеся
+ответы хранятся в PayloadCache уже сериализованными и отдаются без повторной сериализации.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ через orjson; понимает datetime, UUID, Decimal и pydantic-модели"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def render_json(adapter: TypeAdapter, value: Any) -> bytes:
+    """Сериализует значение так же, как response_model: валидация по схеме и dump_json в Rust"""
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+class PayloadCache:
+    """
+    Кэш сериализованных ответов в памяти процесса: ключ → (байты, заголовки).
+    Записи помечаются тегами и вытесняются при изменении данных в этом процессе;
+    TTL ограничивает устаревание в остальных воркерах.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Dict[str, str], Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_render(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        adapter: TypeAdapter,
+        tags: Iterable[str] = (),
+        headers: Optional[Callable[[Any], Dict[str, str]]] = None
+    ) -> Response:
+        """Готовый ответ из кэша или вычисленный, сериализованный и сохраненный"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return Response(content=entry[1], media_type=JSON_MEDIA_TYPE, headers=entry[2])
+
+        self.misses += 1
+        value = await compute()
+        body = render_json(adapter, value)
+        extra_headers = headers(value) if headers else {}
+        self._store(key, body, extra_headers, tuple(tags))
+        return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=extra_headers)
+
+    def invalidate(self, tag: str) -> int:
+        """Вытесняет ответы с тегом"""
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": sum(len(entry[1]) for entry in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _store(self, key: str, body: bytes, headers: Dict[str, str], tags: Tuple[str, ...]):
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, body, headers, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+payload_cache = PayloadCache(
+    ttl_seconds=settings.PAYLOAD_CACHE_TTL_SECONDS,
+    max_entries=settings.PAYLOAD_CACHE_SIZE
+)
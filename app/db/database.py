@@ -1,13 +1,106 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncPool, install_pool_listeners, pool_status
 
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,  
-    future=True
-)
+READ_YOUR_WRITES_COOKIE = "jq_primary_reads"
+
+REPLICA_CONNECT_ERRORS = (OSError, asyncio.TimeoutError, exc.DBAPIError, exc.TimeoutError)
+
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if make_url(url).get_driver_name() == "asyncpg":
+        server_settings = {"application_name": f"{settings.DB_APPLICATION_NAME}:{settings.DB_ROLE}"}
+        timeout_ms = settings.DB_STATEMENT_TIMEOUTS_MS.get(settings.DB_ROLE)
+        if timeout_ms is not None:
+            server_settings["statement_timeout"] = str(timeout_ms)
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        }
+    return options
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    created = create_async_engine(url, **_engine_options(url))
+    install_pool_listeners(created.sync_engine.pool)
+    return created
+
+
+engine = _create_engine(settings.DATABASE_URL)
+replica_engines: List[AsyncEngine] = [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+
+
+class ReplicaRouter:
+    """Round-robin по живым репликам; упавшая реплика исключается на DB_REPLICA_RETRY_SECONDS"""
+
+    def __init__(self, engines: List[AsyncEngine], retry_seconds: float):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._counter = itertools.count()
+        self._down_until: Dict[int, float] = {}
+
+    def healthy(self) -> List[AsyncEngine]:
+        """Живые реплики, начиная со следующей по кругу"""
+        now = time.monotonic()
+        alive = [replica for replica in self.engines if self._down_until.get(id(replica), 0) <= now]
+        if not alive:
+            return []
+        start = next(self._counter) % len(alive)
+        return alive[start:] + alive[:start]
+
+    def mark_down(self, replica: AsyncEngine, error: BaseException):
+        if id(replica) not in self._down_until or self._down_until[id(replica)] <= time.monotonic():
+            logger.warning(f"Replica {replica.url.host} marked down for {self.retry_seconds}s: {error}")
+        self._down_until[id(replica)] = time.monotonic() + self.retry_seconds
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "host": replica.url.host,
+                "healthy": self._down_until.get(id(replica), 0) <= now,
+                "pool": pool_status(replica.sync_engine.pool)
+            }
+            for replica in self.engines
+        ]
+
+
+replica_router = ReplicaRouter(replica_engines, settings.DB_REPLICA_RETRY_SECONDS)
+
+
+def _watch_replica(replica: AsyncEngine):
+    @event.listens_for(replica.sync_engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            replica_router.mark_down(replica, context.original_exception)
+
+
+for _replica in replica_engines:
+    _watch_replica(_replica)
 
 
 AsyncSessionLocal = sessionmaker(
@@ -17,9 +110,96 @@ AsyncSessionLocal = sessionmaker(
 )
 
 
-async def get_db() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+def read_session() -> AsyncSession:
+    """Короткая сессия для чтения вне запроса: живая реплика или primary"""
+    replicas = replica_router.healthy()
+    return AsyncSession(bind=replicas[0] if replicas else engine, expire_on_commit=False)
+
+
+def _prefers_primary(request: Request) -> bool:
+    """Read-your-writes: после записи клиент читает с primary, пока жива cookie"""
+    return settings.DB_READ_YOUR_WRITES_SECONDS > 0 and READ_YOUR_WRITES_COOKIE in request.cookies
+
+
+async def _checkout(request: Request, read_only: bool) -> AsyncConnection:
+    if read_only and not _prefers_primary(request):
+        for replica in replica_router.healthy():
+            try:
+                return await replica.connect()
+            except REPLICA_CONNECT_ERRORS as e:
+                replica_router.mark_down(replica, e)
+    return await engine.connect()
+
+
+def _track_writes(session: AsyncSession, response: Response):
+    wrote = False
+
+    @event.listens_for(session.sync_session, "after_flush")
+    def _after_flush(sync_session, flush_context):
+        nonlocal wrote
+        wrote = True
+
+    @event.listens_for(session.sync_session, "do_orm_execute")
+    def _on_execute(orm_execute_state):
+        nonlocal wrote
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            wrote = True
+
+    @event.listens_for(session.sync_session, "after_commit")
+    def _after_commit(sync_session):
+        if wrote:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE, "1",
+                max_age=settings.DB_READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="lax"
+            )
+
+
+@asynccontextmanager
+async def request_session(
+    request: Request,
+    read_only: bool = False,
+    response: Optional[Response] = None
+) -> AsyncIterator[AsyncSession]:
+    """
+    Единица работы запроса: одно соединение из пула на весь запрос.
+    Сессия привязана к соединению, поэтому commit внутри сервисов не возвращает
+    соединение в пул и не берет новое. Сессия доступна через request.state.db.
+    Read-only единицы работы обслуживаются репликами, запись — primary.
+    """
+    connection = await _checkout(request, read_only)
+    try:
+        if read_only:
+            await connection.execution_options(postgresql_readonly=True)
+        async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+            if response is not None and settings.DB_READ_YOUR_WRITES_SECONDS > 0:
+                _track_writes(session, response)
+            request.state.db = session
+            try:
+                yield session
+            finally:
+                request.state.db = None
+    finally:
+        await connection.close()
+
+
+async def get_db(request: Request, response: Response) -> AsyncIterator[AsyncSession]:
+    """Сессия текущего запроса, общая для всех сервисов"""
+    session = getattr(request.state, "db", None)
+    if session is not None:
+        yield session
+        return
+
+    async with request_session(request, response=response) as session:
+        yield session
+
+
+async def read_only_for_get(request: Request) -> AsyncIterator[None]:
+    """Для GET/HEAD открывает единицу работы запроса в read-only транзакции"""
+    if request.method not in ("GET", "HEAD") or getattr(request.state, "db", None) is not None:
+        yield
+        return
+
+    async with request_session(request, read_only=True):
+        yield
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, BigInteger, Index, DDL, JSON, Sequence, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -36,7 +37,15 @@ class Artist(Base):
     image_url = Column(String(500))
     spotify_id = Column(String(100), unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Денормализованные счетчики, сбрасываются пачками из app.services.play_counters
+    play_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    popularity_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    score_updated_at = Column(DateTime)
     
+    __table_args__ = (
+        Index("ix_artists_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_artists_popularity_score", popularity_score.desc()),
+    )
     
     user = relationship("User", back_populates="artist_profile") 
     albums = relationship("Album", back_populates="artist")
@@ -52,7 +61,17 @@ class Album(Base):
     cover_image_url = Column(String(500))
     spotify_id = Column(String(100), unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Денормализованные счетчики, сбрасываются пачками из app.services.play_counters
+    play_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    popularity_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    score_updated_at = Column(DateTime)
     
+    __table_args__ = (
+        Index("ix_albums_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_albums_artist_id_release_date", artist_id, release_date.desc()),
+        Index("ix_albums_release_date", release_date.desc()),
+        Index("ix_albums_popularity_score", popularity_score.desc()),
+    )
     
     artist = relationship("Artist", back_populates="albums")
     tracks = relationship("Track", back_populates="album")
@@ -64,6 +83,9 @@ class Genre(Base):
     name = Column(String(100), unique=True, nullable=False, index=True)
     description = Column(Text)
     
+    __table_args__ = (
+        Index("ix_genres_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
     
     tracks = relationship("Track", back_populates="genre")
 
@@ -87,7 +109,22 @@ class Track(Base):
     valence = Column(Float)  
     danceability = Column(Float)  
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Денормализованные счетчики, сбрасываются пачками из app.services.play_counters
+    play_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    popularity_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    score_updated_at = Column(DateTime)
+    # Заполняется триггером: title + artist + album + genre (см. миграцию 5d2f7a9c1e04)
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text(), "sqlite")))
     
+    __table_args__ = (
+        Index("ix_tracks_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_tracks_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_tracks_artist_id_popularity", artist_id, popularity.desc()),
+        Index("ix_tracks_album_id", album_id),
+        Index("ix_tracks_genre_id", genre_id),
+        Index("ix_tracks_popularity_id", popularity.desc(), id.desc()),
+        Index("ix_tracks_popularity_score", popularity_score.desc()),
+    )
     
     artist = relationship("Artist", back_populates="tracks")
     album = relationship("Album", back_populates="tracks")
@@ -120,6 +157,9 @@ class PlaylistTrack(Base):
     position = Column(Integer, nullable=False)  
     added_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_playlist_tracks_playlist_id_position", playlist_id, position),
+    )
     
     playlist = relationship("Playlist", back_populates="tracks")
     track = relationship("Track", back_populates="playlist_tracks")
@@ -128,15 +168,21 @@ class ListeningHistory(Base):
     """Модель для отслеживания истории прослушивания - для аналитики в ClickHouse"""
     __tablename__ = "listening_history"
     
-    id = Column(BigInteger, primary_key=True, index=True)
+    # Таблица партиционирована по месяцам played_at, поэтому played_at входит в первичный ключ.
+    # id берется из последовательности (в PostgreSQL), SQLite ее игнорирует
+    id = Column(BigInteger, Sequence("listening_history_id_seq"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
-    played_at = Column(DateTime, default=datetime.utcnow, index=True)
+    played_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     play_duration_ms = Column(Integer)  
     completion_percentage = Column(Float)  
     source = Column(String(50))  
     device_type = Column(String(50))  
     
+    __table_args__ = (
+        Index("ix_listening_history_user_id_played_at", user_id, played_at.desc()),
+        {"postgresql_partition_by": "RANGE (played_at)"},
+    )
     
     user = relationship("User", back_populates="listening_history")
     track = relationship("Track", back_populates="listening_history")
@@ -155,3 +201,122 @@ class UserPreference(Base):
     
     
     user = relationship("User", back_populates="user_preferences")
+
+
+class StorageBlob(Base):
+    """Содержимое файла в S3 под ключом blobs/{sha256}, общее для всех одинаковых загрузок"""
+    __tablename__ = "storage_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100))
+    refcount = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Когда пропала последняя ссылка; сборщик мусора удаляет объект после паузы
+    unreferenced_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_storage_blobs_unreferenced_at", unreferenced_at, postgresql_where=(refcount == 0)),
+    )
+    
+    references = relationship("BlobReference", back_populates="blob")
+
+class BlobReference(Base):
+    """Загрузка пользователя, ссылающаяся на блоб; может быть привязана к треку"""
+    __tablename__ = "blob_references"
+    
+    id = Column(Integer, primary_key=True)
+    blob_sha256 = Column(String(64), ForeignKey("storage_blobs.sha256"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    track_id = Column(Integer, ForeignKey("tracks.id", ondelete="SET NULL"))
+    filename = Column(String(255))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_blob_references_blob_sha256_user_id", blob_sha256, user_id),
+        Index("ix_blob_references_track_id", track_id),
+        Index("ix_blob_references_user_id_created_at", user_id, created_at),
+    )
+    
+    blob = relationship("StorageBlob", back_populates="references")
+
+class StoredObject(Base):
+    """Каталог объектов со старыми ключами users/{user_id}/...; листинг читает его вместо head_object"""
+    __tablename__ = "stored_objects"
+    
+    s3_key = Column(String(1024), primary_key=True)
+    # Без внешнего ключа: сверка с S3 может найти объекты удаленных пользователей
+    user_id = Column(Integer, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    etag = Column(String(100))
+    content_type = Column(String(100))
+    filename = Column(String(255))
+    last_modified = Column(DateTime)
+    # Время последней сверки; строки, не увиденные при полной сверке, удаляются
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_stored_objects_user_id_last_modified", user_id, last_modified),
+    )
+
+class StorageInventoryEntry(Base):
+    """Число объектов и объем под префиксом верхнего уровня bucket"""
+    __tablename__ = "storage_inventory"
+    
+    bucket = Column(String(63), primary_key=True)
+    # Первый сегмент ключа со слешем ("blobs/"); "" — объекты в корне bucket
+    prefix = Column(String(255), primary_key=True)
+    object_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    total_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Время начала последней полной сверки с S3; между сверками значения меняют приращения
+    scanned_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MaintenanceCheckpoint(Base):
+    """Позиция обхода и отчет последнего прохода фоновой задачи обслуживания"""
+    __tablename__ = "maintenance_checkpoints"
+    
+    name = Column(String(100), primary_key=True)
+    # Ключ, после которого продолжается обход; NULL — следующий проход с начала
+    position = Column(String(1024))
+    report = Column(JSONB().with_variant(JSON(), "sqlite"))
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ResumableUpload(Base):
+    """Незавершенная возобновляемая загрузка: multipart upload во временном bucket"""
+    __tablename__ = "resumable_uploads"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    track_id = Column(Integer, ForeignKey("tracks.id", ondelete="SET NULL"))
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    expected_sha256 = Column(String(64))
+    staging_key = Column(String(255), nullable=False)
+    s3_upload_id = Column(String(1024), nullable=False)
+    part_size = Column(Integer, nullable=False)
+    # Принятые байты растут на целые части part_size (последняя часть может быть меньше)
+    received_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # [{"PartNumber": 1, "ETag": "..."}, ...] для complete_multipart_upload
+    parts = Column(JSONB().with_variant(JSON(), "sqlite"), nullable=False, default=list, server_default="[]")
+    # Аренда на время PATCH или сборки: второй запрос к той же загрузке получает 409
+    locked_until = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_resumable_uploads_expires_at", expires_at),
+        Index("ix_resumable_uploads_user_id", user_id),
+    )
+
+
+# Для create_all: без партиций вставки в партиционированную таблицу невозможны,
+# DEFAULT-партиция принимает строки, пока обслуживание не создаст месячные
+event.listen(
+    ListeningHistory.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS listening_history_default PARTITION OF listening_history DEFAULT").execute_if(dialect="postgresql")
+)
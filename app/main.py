@@ -4,10 +4,13 @@ from starlette.staticfiles import StaticFiles
 from starlette.routing import Mount
 from fastapi.responses import JSONResponse
 import uvicorn
+import asyncio
+import contextlib
 import logging
 
 from app.api.v1 import api_router as api_router_v1
 from app.core.config import settings
+from app.core.responses import FastJSONResponse
 from app.services.clickhouse_service import ClickHouseService
 from app.core.analytics_middleware import AnalyticsMiddleware
 
@@ -17,7 +20,8 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Онлайн музыкальный сервис с аналитикой и рекомендациями",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -26,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -45,10 +50,153 @@ async def initialize_clickhouse():
     except Exception as e:
         logger.error(f"Failed to initialize ClickHouse: {e}")
         
+async def initialize_suggest_index():
+    """Загрузка индекса автодополнения из снимка, совпадающего с каталогом, или сборка из PostgreSQL."""
+    try:
+        from app.services.suggest_index import read_catalog_state, suggest_index
+        from app.db.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            catalog_state = await read_catalog_state(session)
+            if suggest_index.load_snapshot(
+                settings.SUGGEST_SNAPSHOT_PATH, catalog_state, settings.SUGGEST_MAX_AGE_SECONDS
+            ):
+                logger.info(f"Suggest index loaded from snapshot: {len(suggest_index)} entries")
+                return
+
+            await suggest_index.build_from_db(session, catalog_state)
+        suggest_index.save_snapshot(settings.SUGGEST_SNAPSHOT_PATH)
+        logger.info(f"Suggest index built from database: {len(suggest_index)} entries")
+    except Exception as e:
+        logger.error(f"Failed to initialize suggest index: {e}")
+
+
+def start_suggest_refresh():
+    """Фоновая пересборка индекса автодополнения при изменении каталога."""
+    from app.services.suggest_index import suggest_refresh_loop
+
+    app.state.suggest_refresh = asyncio.create_task(suggest_refresh_loop())
+
+
+def start_partition_maintenance():
+    """Фоновое обслуживание партиций listening_history (только PostgreSQL)."""
+    from sqlalchemy.engine import make_url
+    from app.services.partition_service import partition_maintenance_loop
+
+    if make_url(settings.DATABASE_URL).get_driver_name() != "asyncpg":
+        return
+    app.state.partition_maintenance = asyncio.create_task(partition_maintenance_loop())
+
+
+def start_play_counters():
+    """Фоновый сброс счетчиков прослушиваний (только PostgreSQL)."""
+    from sqlalchemy.engine import make_url
+    from app.services.play_counters import play_counters_loop
+
+    if make_url(settings.DATABASE_URL).get_driver_name() != "asyncpg":
+        return
+    app.state.play_counters = asyncio.create_task(play_counters_loop())
+
+
+async def stop_play_counters():
+    """Останавливает фоновый сброс и записывает остаток счетчиков."""
+    from app.db.database import AsyncSessionLocal
+    from app.services.play_counters import play_counters
+
+    task = getattr(app.state, "play_counters", None)
+    if task is None:
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await play_counters.flush(session)
+    except Exception as e:
+        logger.error(f"Failed to flush play counters: {e}")
+
+
+def start_storage_inventory():
+    """Фоновый сброс приращений инвентаря хранилища и его сверка (только PostgreSQL)."""
+    from sqlalchemy.engine import make_url
+    from app.services.storage_inventory import storage_inventory_loop
+
+    if make_url(settings.DATABASE_URL).get_driver_name() != "asyncpg":
+        return
+    app.state.storage_inventory = asyncio.create_task(storage_inventory_loop())
+
+
+async def stop_storage_inventory():
+    """Останавливает фоновую задачу и записывает остаток приращений."""
+    from app.db.database import AsyncSessionLocal
+    from app.services.storage_inventory import storage_inventory
+
+    task = getattr(app.state, "storage_inventory", None)
+    if task is None:
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await storage_inventory.flush(session)
+    except Exception as e:
+        logger.error(f"Failed to flush storage inventory: {e}")
+
+
+def start_temp_cleanup():
+    """Периодическая очистка bucket temp с продолжением прерванного прохода (только PostgreSQL)."""
+    from sqlalchemy.engine import make_url
+    from app.services.temp_cleanup import temp_cleanup_loop
+
+    if make_url(settings.DATABASE_URL).get_driver_name() != "asyncpg":
+        return
+    app.state.temp_cleanup = asyncio.create_task(temp_cleanup_loop())
+
+
 @app.on_event("startup")
 async def startup_event():
     """События при запуске приложения."""
     await initialize_clickhouse()
+    await initialize_suggest_index()
+    start_suggest_refresh()
+    start_partition_maintenance()
+    start_play_counters()
+    start_storage_inventory()
+    start_temp_cleanup()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """События при остановке приложения."""
+    for name in ("suggest_refresh", "partition_maintenance", "temp_cleanup"):
+        maintenance = getattr(app.state, name, None)
+        if maintenance is not None:
+            maintenance.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await maintenance
+
+    await stop_play_counters()
+    await stop_storage_inventory()
+
+    from app.services.suggest_index import suggest_index
+
+    if suggest_index.ready:
+        try:
+            suggest_index.save_snapshot(settings.SUGGEST_SNAPSHOT_PATH)
+        except Exception as e:
+            logger.error(f"Failed to save suggest index snapshot: {e}")
+
+    from app.db.database import engine, replica_engines
+
+    for db_engine in [engine, *replica_engines]:
+        await db_engine.dispose()
+
+    from app.services.s3_async import shutdown_s3_executor
+
+    shutdown_s3_executor()
 
 app.include_router(api_router_v1, prefix=settings.API_V1_STR)
 
@@ -83,5 +231,16 @@ async def health_check():
         }
     )
 
+@app.get("/health/db-pool", summary="Состояние пула соединений PostgreSQL")
+async def db_pool_health():
+    """Метрики пулов primary и реплик для подбора размера под число воркеров"""
+    from app.db.database import engine, replica_router
+    from app.db.pool import pool_status
+
+    return {
+        "primary": pool_status(engine.sync_engine.pool),
+        "replicas": replica_router.status()
+    }
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,19 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.schemas.track import TrackWithDetails
+from app.schemas.artist import Artist
+from app.schemas.album import Album
+
+
+class Suggestion(BaseModel):
+    text: str = Field(..., description="Текст подсказки")
+    type: str = Field(..., description="Тип сущности: track или artist")
+    id: int = Field(..., description="ID сущности")
+
+
+class MultiSearchResult(BaseModel):
+    tracks: List[TrackWithDetails] = []
+    artists: List[Artist] = []
+    albums: List[Album] = []
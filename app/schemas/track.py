@@ -72,12 +72,15 @@ class TrackSearchQuery(BaseModel):
     duration_to: Optional[int] = Field(None, description="Максимальная длительность в мс")
     limit: int = Field(20, ge=1, le=100, description="Количество результатов")
     offset: int = Field(0, ge=0, description="Смещение для пагинации")
+    cursor: Optional[str] = Field(None, description="Курсор следующей страницы (вместо offset)")
 
 class TrackSearchResponse(BaseModel):
     tracks: list[TrackWithDetails]
     total: int
+    total_is_estimate: bool = False
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class TrackUploadFromURL(BaseModel):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class ListeningEvent(BaseModel):
@@ -12,6 +12,29 @@ class ListeningEvent(BaseModel):
     device_type: str = Field("web", description="Тип устройства")
     timestamp: Optional[datetime] = Field(default_factory=datetime.utcnow)
 
+# Ограничение размера пачки офлайн-прослушиваний в одном запросе
+MAX_LISTEN_BATCH = 1000
+
+class ListenBatchItem(BaseModel):
+    """Прослушивание в пачке; played_at — момент на устройстве, по умолчанию время приема"""
+    track_id: int = Field(..., ge=1, description="ID трека")
+    played_at: Optional[datetime] = None
+    play_duration_ms: int = Field(0, ge=0, description="Длительность прослушивания в мс")
+    completion_percentage: float = Field(0.0, ge=0.0, le=100.0, description="Процент прослушивания")
+    source: str = Field("unknown", max_length=50)
+    device_type: str = Field("mobile", max_length=50)
+    session_id: Optional[str] = None
+
+class ListenBatch(BaseModel):
+    """Пачка прослушиваний одного пользователя"""
+    user_id: int = Field(..., ge=1, description="ID пользователя")
+    events: List[ListenBatchItem] = Field(..., min_length=1, max_length=MAX_LISTEN_BATCH)
+
+class ListenBatchResult(BaseModel):
+    """Итог приема пачки: события с неизвестными треками пропускаются"""
+    accepted: int
+    unknown_track_ids: List[int] = []
+
 class PlaylistInteraction(BaseModel):
     """Взаимодействие с плейлистом"""
     user_id: int
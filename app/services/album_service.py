@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from sqlalchemy.orm import selectinload
 
+from app.core.pagination import apply_keyset
 from app.db.models import Album, Track, Artist
 from app.schemas.album import AlbumCreate, AlbumUpdate
 
@@ -11,9 +12,12 @@ class AlbumService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_albums(self, skip: int = 0, limit: int = 100) -> List[Album]:
-        """Получить список альбомов с пагинацией."""
-        query = select(Album).options(selectinload(Album.artist)).offset(skip).limit(limit)
+    async def get_albums(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Album]:
+        """Получить список альбомов: по курсору или со смещением skip."""
+        query = apply_keyset(select(Album).options(selectinload(Album.artist)), [Album.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
 
@@ -107,14 +111,12 @@ class AlbumService:
         return result.scalars().all()
 
     async def get_popular_albums(self, limit: int = 20) -> List[Album]:
-        """Получить популярные альбомы на основе количества треков и прослушиваний."""
+        """Получить популярные альбомы по затухающему счету прослушиваний."""
         
         query = (
             select(Album)
             .options(selectinload(Album.artist))
-            .join(Track)
-            .group_by(Album.id)
-            .order_by(func.count(Track.id).desc())
+            .order_by(Album.popularity_score.desc(), Album.id)
             .limit(limit)
         )
         
@@ -0,0 +1,108 @@
+"""
+Загрузка альбома на диск
+Файлы запроса к моменту вызова обработчика уже приняты Starlette во временные файлы,
+поэтому загрузка сводится к их копированию в каталог треков: копии идут в потоках
+параллельно (не больше ALBUM_UPLOAD_CONCURRENCY) с буфером ALBUM_UPLOAD_BUFFER_SIZE.
+При ошибке любой копии уже записанные файлы удаляются.
+"""
+
+import asyncio
+import logging
+import shutil
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataMismatch(ValueError):
+    """Файлы запроса и метаданные треков не соответствуют друг другу"""
+
+
+class WrittenFile(NamedTuple):
+    source_name: str
+    path: Path
+    size: int
+
+
+def match_metadata(filenames: Sequence[str], tracks_metadata: Sequence) -> List:
+    """Метаданные в порядке файлов; сопоставление по file_name через словарь"""
+    by_name: Dict[str, object] = {}
+    for meta in tracks_metadata:
+        if meta.file_name in by_name:
+            raise MetadataMismatch(f"Метаданные для файла {meta.file_name} указаны дважды.")
+        by_name[meta.file_name] = meta
+
+    matched = []
+    for filename in filenames:
+        meta = by_name.get(filename)
+        if meta is None:
+            raise MetadataMismatch(f"Метаданные для файла {filename} не найдены.")
+        matched.append(meta)
+    return matched
+
+
+def stored_filename(filename: Optional[str]) -> str:
+    """Уникальное имя файла на диске с расширением исходного"""
+    return f"{uuid.uuid4().hex}{Path(filename or '').suffix.lower()}"
+
+
+def _copy_file(source: BinaryIO, destination: Path, buffer_size: int) -> int:
+    source.seek(0)
+    with open(destination, "wb", buffering=0) as out_file:
+        shutil.copyfileobj(source, out_file, buffer_size)
+        return out_file.tell()
+
+
+def _remove(paths: List[Path]):
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to remove {path}: {e}")
+
+
+async def remove_files(paths: List[Path]):
+    await asyncio.to_thread(_remove, paths)
+
+
+async def write_files(
+    sources: Sequence[Tuple[str, BinaryIO]],
+    directory: Path,
+    concurrency: Optional[int] = None,
+    buffer_size: Optional[int] = None
+) -> List[WrittenFile]:
+    """
+    Копирует (имя, файл) в directory параллельно; результат в порядке sources.
+    Если какая-то копия не удалась, остальные отменяются, записанное удаляется
+    """
+    concurrency = concurrency or settings.ALBUM_UPLOAD_CONCURRENCY
+    buffer_size = buffer_size or settings.ALBUM_UPLOAD_BUFFER_SIZE
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.to_thread(directory.mkdir, parents=True, exist_ok=True)
+
+    destinations = [directory / stored_filename(name) for name, _ in sources]
+
+    async def copy(source: BinaryIO, destination: Path) -> int:
+        async with semaphore:
+            return await asyncio.to_thread(_copy_file, source, destination, buffer_size)
+
+    tasks = [asyncio.ensure_future(copy(source, destination))
+             for (_, source), destination in zip(sources, destinations)]
+    try:
+        sizes = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Поток копирования не прерывается отменой: удаляем после завершения всех копий
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await remove_files(destinations)
+        raise
+
+    return [
+        WrittenFile(name, destination, size)
+        for (name, _), destination, size in zip(sources, destinations, sizes)
+    ]
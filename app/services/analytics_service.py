@@ -2,21 +2,25 @@
 Сервис аналитики с интеграцией ClickHouse
 """
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, desc, text
+from sqlalchemy import select, func, and_, desc, text, insert
 
 from app.schemas.user_activity import (
     ListeningEvent, 
+    ListenBatchItem,
+    ListenBatchResult,
     TrackAnalytics, 
     UserAnalytics, 
     PlatformAnalytics,
     AnalyticsQuery
 )
-from app.db.models import Track, Artist, User, ListeningHistory, Album, Genre
+from app.db.models import Track, Artist, User, ListeningHistory
 from app.core.config import settings
 from app.services.clickhouse_service import clickhouse_service
+from app.services.play_counters import play_counters
+from app.services.track_metadata import resolve_track_refs
 
 
 class AnalyticsService:
@@ -48,21 +52,13 @@ class AnalyticsService:
                 session_id = str(uuid.uuid4())
             
            
-            track_query = (
-                select(Track, Artist.id.label("artist_id"), Album.id.label("album_id"), Genre.id.label("genre_id"))
-                .outerjoin(Artist, Track.artist_id == Artist.id)
-                .outerjoin(Album, Track.album_id == Album.id)
-                .outerjoin(Genre, Track.genre_id == Genre.id)
-                .where(Track.id == track_id)
-            )
-            track_result = await self.db.execute(track_query)
-            track_data = track_result.first()
+            refs = (await resolve_track_refs(self.db, [track_id])).get(track_id)
             
-            if not track_data:
+            if not refs:
                 print(f"Track {track_id} not found")
                 return False
             
-            track, artist_id, album_id, genre_id = track_data
+            artist_id, album_id, genre_id = refs
             
             
             db_event = ListeningHistory(
@@ -76,6 +72,7 @@ class AnalyticsService:
             )
             self.db.add(db_event)
             await self.db.commit()
+            play_counters.record(track_id, album_id=album_id, artist_id=artist_id)
             
             
             clickhouse_event = {
@@ -106,6 +103,79 @@ class AnalyticsService:
             print(f"Error recording listening event: {e}")
             return False
     
+    async def record_listening_events(
+        self,
+        user_id: int,
+        events: List[ListenBatchItem],
+        ip_address: str = None,
+        user_agent: str = None
+    ) -> Optional[ListenBatchResult]:
+        """
+        Записывает пачку прослушиваний: один multi-row INSERT в PostgreSQL и один INSERT в ClickHouse.
+        Возвращает None, если пользователя нет.
+        """
+        user_exists = await self.db.scalar(select(User.id).where(User.id == user_id))
+        if user_exists is None:
+            return None
+        
+        refs = await resolve_track_refs(self.db, [event.track_id for event in events])
+        now = datetime.utcnow()
+        
+        rows = []
+        clickhouse_events = []
+        unknown_track_ids = set()
+        for event in events:
+            track_refs = refs.get(event.track_id)
+            if track_refs is None:
+                unknown_track_ids.add(event.track_id)
+                continue
+            
+            played_at = event.played_at or now
+            if played_at.tzinfo is not None:
+                played_at = played_at.astimezone(timezone.utc).replace(tzinfo=None)
+            # Часы устройства могут спешить
+            played_at = min(played_at, now)
+            
+            rows.append({
+                'user_id': user_id,
+                'track_id': event.track_id,
+                'played_at': played_at,
+                'play_duration_ms': event.play_duration_ms,
+                'completion_percentage': event.completion_percentage,
+                'source': event.source,
+                'device_type': event.device_type
+            })
+            clickhouse_events.append({
+                'user_id': user_id,
+                'track_id': event.track_id,
+                'artist_id': track_refs.artist_id or 0,
+                'album_id': track_refs.album_id or 0,
+                'genre_id': track_refs.genre_id or 0,
+                'played_at': played_at,
+                'play_duration_ms': event.play_duration_ms,
+                'completion_percentage': event.completion_percentage,
+                'source': event.source,
+                'device_type': event.device_type,
+                'session_id': event.session_id or '',
+                'ip_address': ip_address or '',
+                'user_agent': user_agent or ''
+            })
+        
+        if rows:
+            # executemany по insert() драйвер собирает в INSERT ... VALUES с множеством строк
+            await self.db.execute(insert(ListeningHistory), rows)
+            await self.db.commit()
+            
+            for event in clickhouse_events:
+                play_counters.record(
+                    event['track_id'],
+                    album_id=event['album_id'],
+                    artist_id=event['artist_id']
+                )
+            await self.clickhouse.insert_listening_events(clickhouse_events)
+        
+        return ListenBatchResult(accepted=len(rows), unknown_track_ids=sorted(unknown_track_ids))
+    
     async def record_search_event(
         self,
         query: str,
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
+from app.core.pagination import apply_keyset
 from app.db.models import Artist, Track, Album
 from app.schemas.artist import ArtistCreate, ArtistUpdate
 
@@ -11,9 +12,12 @@ class ArtistService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_artists(self, skip: int = 0, limit: int = 100) -> List[Artist]:
-        """Получить список исполнителей с пагинацией."""
-        query = select(Artist).offset(skip).limit(limit)
+    async def get_artists(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Artist]:
+        """Получить список исполнителей: по курсору или со смещением skip."""
+        query = apply_keyset(select(Artist), [Artist.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
 
@@ -87,9 +91,9 @@ class ArtistService:
         result = await self.db.execute(search_query)
         return result.scalars().all()
 
-    async def get_artist_tracks(self, artist_id: int, limit: int = 20) -> List[Track]:
-        """Получить треки исполнителя."""
-        query = select(Track).where(Track.artist_id == artist_id).limit(limit)
+    async def get_artist_tracks(self, artist_id: int, limit: int = 20, cursor: Optional[str] = None) -> List[Track]:
+        """Получить треки исполнителя (keyset-пагинация по курсору)."""
+        query = apply_keyset(select(Track).where(Track.artist_id == artist_id), [Track.id], cursor).limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
 
@@ -100,13 +104,11 @@ class ArtistService:
         return result.scalars().all()
 
     async def get_popular_artists(self, limit: int = 20) -> List[Artist]:
-        """Получить популярных исполнителей на основе количества прослушиваний их треков."""
+        """Получить популярных исполнителей по затухающему счету прослушиваний их треков."""
        
         query = (
             select(Artist)
-            .join(Track)
-            .group_by(Artist.id)
-            .order_by(func.count(Track.id).desc())
+            .order_by(Artist.popularity_score.desc(), Artist.id)
             .limit(limit)
         )
         
@@ -0,0 +1,321 @@
+"""
+Хранилище треков с адресацией по содержимому
+Файл хранится один раз под ключом blobs/{sha256}; каждая загрузка — строка blob_references,
+storage_blobs.refcount — число ссылок. Блоб без ссылок удаляет сборщик мусора после паузы,
+чтобы повторная загрузка вскоре после удаления не перезаписывала объект.
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import case, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Artist, StorageBlob, BlobReference, Track, User
+from app.services.s3_service import async_s3_service
+from app.services.storage_inventory import storage_inventory
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs/"
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ChecksumMismatch(ValueError):
+    """SHA-256 загруженного содержимого не совпал с заявленным клиентом"""
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    size: int
+    content_type: Optional[str]
+    reference_id: int
+    deduplicated: bool
+
+
+def blob_key(sha256: str) -> str:
+    return f"{BLOB_PREFIX}{sha256}"
+
+
+def normalize_sha256(value: Optional[str]) -> Optional[str]:
+    """Хэш в нижнем регистре или None, если строка не похожа на SHA-256"""
+    if not value:
+        return None
+    value = value.strip().lower()
+    return value if _SHA256_RE.match(value) else None
+
+
+def parse_blob_key(s3_key: str) -> Optional[str]:
+    """SHA-256 из ключа blobs/{sha256}; для остальных ключей None"""
+    if not s3_key.startswith(BLOB_PREFIX):
+        return None
+    return normalize_sha256(s3_key[len(BLOB_PREFIX):])
+
+
+def _owned_track_references(*columns):
+    """
+    Ссылки, привязанные к треку исполнителем трека или администратором.
+    Ссылки других пользователей не меняют файл, который слушают все
+    """
+    return (
+        select(*columns)
+        .join(Track, Track.id == BlobReference.track_id)
+        .join(Artist, Artist.id == Track.artist_id)
+        .join(User, User.id == BlobReference.user_id)
+        .where(or_(BlobReference.user_id == Artist.user_id, User.role == "admin"))
+    )
+
+
+class BlobStorageService:
+    """Загрузка, ссылки и сборка мусора блобов"""
+
+    def __init__(self, db: AsyncSession, storage=async_s3_service):
+        self.db = db
+        self.storage = storage
+
+    async def reference_existing(
+        self,
+        sha256: str,
+        user_id: int,
+        filename: str,
+        track_id: Optional[int] = None
+    ) -> Optional[StoredBlob]:
+        """
+        Еще одна ссылка пользователя на блоб, который он уже загружал, без передачи содержимого.
+        Знание хэша чужого файла не доказывает обладание им: для блобов без ссылок пользователя
+        возвращается None (как и для отсутствующих), и файл загружается целиком
+        """
+        # Блокировка строки ждет сборщик мусора, если тот как раз удаляет этот блоб
+        blob = await self.db.scalar(
+            select(StorageBlob)
+            .where(
+                StorageBlob.sha256 == sha256,
+                select(BlobReference.id)
+                .where(BlobReference.blob_sha256 == sha256, BlobReference.user_id == user_id)
+                .exists()
+            )
+            .with_for_update(of=StorageBlob)
+        )
+        if blob is None:
+            await self.db.rollback()
+            return None
+
+        reference = await self._add_reference(blob.sha256, user_id, filename, track_id)
+        await self.db.commit()
+        return StoredBlob(blob.sha256, blob.size, blob.content_type, reference.id, deduplicated=True)
+
+    async def store_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        user_id: int,
+        filename: str,
+        content_type: str,
+        max_size: Optional[int] = None,
+        expected_sha256: Optional[str] = None,
+        track_id: Optional[int] = None
+    ) -> StoredBlob:
+        """
+        Сохраняет поток как блоб. Если клиент заранее прислал хэш блоба, который уже загружал,
+        содержимое не читается. Иначе поток загружается во временный bucket с подсчетом
+        SHA-256 и копируется в blobs/{sha256} на стороне S3, только если такого блоба еще нет.
+        """
+        if expected_sha256:
+            stored = await self.reference_existing(expected_sha256, user_id, filename, track_id)
+            if stored is not None:
+                return stored
+
+        staged = await self.storage.stage_stream(chunks, content_type, max_size)
+        return await self.store_staged(
+            staged.key, staged.sha256, staged.size, user_id, filename, content_type, expected_sha256, track_id
+        )
+
+    async def store_staged(
+        self,
+        staging_key: str,
+        sha256: str,
+        size: int,
+        user_id: int,
+        filename: str,
+        content_type: str,
+        expected_sha256: Optional[str] = None,
+        track_id: Optional[int] = None
+    ) -> StoredBlob:
+        """
+        Сохраняет объект временного bucket с известным SHA-256 как блоб и добавляет ссылку.
+        Изменения сессии вызывающего кода фиксируются той же транзакцией; временный объект удаляется.
+        """
+        try:
+            if expected_sha256 and sha256 != expected_sha256:
+                raise ChecksumMismatch(f"Content SHA-256 is {sha256}, expected {expected_sha256}")
+
+            created = await self._lock_or_create(sha256, size, content_type)
+            if created:
+                await self.storage.promote_blob(staging_key, sha256, content_type)
+
+            reference = await self._add_reference(sha256, user_id, filename, track_id)
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+        finally:
+            await self._discard_staged(staging_key)
+
+        if created:
+            storage_inventory.record(settings.S3_TRACKS_BUCKET, blob_key(sha256), size)
+
+        return StoredBlob(sha256, size, content_type, reference.id, deduplicated=not created)
+
+    async def has_reference(self, sha256: str, user_id: int) -> bool:
+        return await self.db.scalar(
+            select(BlobReference.id)
+            .where(BlobReference.blob_sha256 == sha256, BlobReference.user_id == user_id)
+            .limit(1)
+        ) is not None
+
+    async def can_attach(self, track_id: int, user_id: int, is_admin: bool = False) -> Optional[bool]:
+        """Может ли пользователь привязать файл к треку: исполнитель трека или администратор; None — трека нет"""
+        owner = await self.db.execute(
+            select(Artist.user_id).select_from(Track).outerjoin(Artist, Artist.id == Track.artist_id)
+            .where(Track.id == track_id)
+        )
+        row = owner.first()
+        if row is None:
+            return None
+        return is_admin or (row.user_id is not None and row.user_id == user_id)
+
+    async def track_blob(self, track_id: int) -> Optional[str]:
+        """SHA-256 последнего файла, привязанного к треку его владельцем"""
+        return await self.db.scalar(
+            _owned_track_references(BlobReference.blob_sha256)
+            .where(BlobReference.track_id == track_id)
+            .order_by(BlobReference.id.desc())
+            .limit(1)
+        )
+
+    async def track_blobs(self, track_ids: List[int]) -> Dict[int, str]:
+        """SHA-256 последних файлов для списка треков одним запросом"""
+        if not track_ids:
+            return {}
+        result = await self.db.execute(
+            _owned_track_references(BlobReference.track_id, BlobReference.blob_sha256)
+            .where(BlobReference.track_id.in_(track_ids))
+            .distinct(BlobReference.track_id)
+            .order_by(BlobReference.track_id, BlobReference.id.desc())
+        )
+        return {track_id: sha256 for track_id, sha256 in result.all()}
+
+    async def accessible_blobs(self, sha256s: List[str], user_id: Optional[int]) -> Set[str]:
+        """Блобы из списка, на которые у пользователя есть ссылка; при user_id=None — все существующие"""
+        if not sha256s:
+            return set()
+        if user_id is None:
+            query = select(StorageBlob.sha256).where(StorageBlob.sha256.in_(sha256s))
+        else:
+            query = (
+                select(BlobReference.blob_sha256)
+                .where(BlobReference.blob_sha256.in_(sha256s), BlobReference.user_id == user_id)
+                .distinct()
+            )
+        return set((await self.db.scalars(query)).all())
+
+    async def blob_exists(self, sha256: str) -> bool:
+        return await self.db.scalar(select(StorageBlob.sha256).where(StorageBlob.sha256 == sha256)) is not None
+
+    async def release(self, sha256: str, user_id: int) -> bool:
+        """Удаляет одну ссылку пользователя на блоб; объект удалит сборщик мусора"""
+        reference_id = await self.db.scalar(
+            select(BlobReference.id)
+            .where(BlobReference.blob_sha256 == sha256, BlobReference.user_id == user_id)
+            .order_by(BlobReference.id.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        if reference_id is None:
+            await self.db.rollback()
+            return False
+
+        await self.db.execute(delete(BlobReference).where(BlobReference.id == reference_id))
+        await self.db.execute(
+            update(StorageBlob)
+            .where(StorageBlob.sha256 == sha256)
+            .values(
+                refcount=StorageBlob.refcount - 1,
+                unreferenced_at=case((StorageBlob.refcount <= 1, datetime.utcnow()), else_=StorageBlob.unreferenced_at)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return True
+
+    async def collect_garbage(self, grace_hours: Optional[float] = None, limit: int = 500) -> int:
+        """Удаляет блобы без ссылок старше паузы: сначала объект в S3, затем строку"""
+        grace = grace_hours if grace_hours is not None else settings.BLOB_GC_GRACE_HOURS
+        cutoff = datetime.utcnow() - timedelta(hours=grace)
+        removed = 0
+
+        for _ in range(limit):
+            # SKIP LOCKED: строки, которые сейчас получают новую ссылку, не трогаем
+            row = (await self.db.execute(
+                select(StorageBlob.sha256, StorageBlob.size)
+                .where(StorageBlob.refcount == 0, StorageBlob.unreferenced_at < cutoff)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).first()
+            if row is None:
+                break
+            sha256, size = row
+
+            if not await self.storage.delete_blob(sha256):
+                await self.db.rollback()
+                break
+
+            await self.db.execute(delete(StorageBlob).where(StorageBlob.sha256 == sha256))
+            await self.db.commit()
+            storage_inventory.record(settings.S3_TRACKS_BUCKET, blob_key(sha256), -size, objects=-1)
+            removed += 1
+
+        await self.db.commit()
+        if removed:
+            logger.info(f"Blob GC removed {removed} unreferenced blobs")
+        return removed
+
+    async def _discard_staged(self, staging_key: str):
+        # Неудаленный временный объект уберет очистка bucket temp (temp_cleanup)
+        try:
+            await self.storage.delete_temp_object(staging_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete staged upload {staging_key}: {e}")
+
+    async def _lock_or_create(self, sha256: str, size: int, content_type: str) -> bool:
+        """Блокирует строку блоба, создавая ее при отсутствии; True, если блоб новый"""
+        inserted = await self.db.scalar(
+            pg_insert(StorageBlob)
+            .values(sha256=sha256, size=size, content_type=content_type, refcount=0, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[StorageBlob.sha256])
+            .returning(StorageBlob.sha256)
+        )
+        if inserted is None:
+            await self.db.execute(select(StorageBlob.sha256).where(StorageBlob.sha256 == sha256).with_for_update())
+        return inserted is not None
+
+    async def _add_reference(
+        self,
+        sha256: str,
+        user_id: int,
+        filename: str,
+        track_id: Optional[int]
+    ) -> BlobReference:
+        await self.db.execute(
+            update(StorageBlob)
+            .where(StorageBlob.sha256 == sha256)
+            .values(refcount=StorageBlob.refcount + 1, unreferenced_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        reference = BlobReference(blob_sha256=sha256, user_id=user_id, track_id=track_id, filename=filename)
+        self.db.add(reference)
+        await self.db.flush()
+        return reference
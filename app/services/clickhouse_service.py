@@ -2,6 +2,7 @@
 ClickHouse сервис для аналитики
 """
 import asyncio
+import threading
 import uuid
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
@@ -17,7 +18,21 @@ class ClickHouseService:
     
     def __init__(self):
         self.client = None
+        # Client драйвера не потокобезопасен: пакетная вставка идет в пуле потоков на своем
+        # клиенте, и пачки выполняются по одной под блокировкой
+        self.batch_client = None
+        self._batch_lock = threading.Lock()
         self._initialize_client()
+
+    @staticmethod
+    def _new_client() -> Client:
+        return Client(
+            host=settings.CLICKHOUSE_HOST,
+            port=settings.CLICKHOUSE_PORT,
+            user=settings.CLICKHOUSE_USER,
+            password=settings.CLICKHOUSE_PASSWORD,
+            database=settings.CLICKHOUSE_DATABASE
+        )
     
     def _initialize_client(self):
         """Инициализация клиента ClickHouse"""
@@ -31,18 +46,14 @@ class ClickHouseService:
             print(f"   DATABASE: {settings.CLICKHOUSE_DATABASE}")
             
             
-            self.client = Client(
-                host=settings.CLICKHOUSE_HOST,
-                port=settings.CLICKHOUSE_PORT,
-                user=settings.CLICKHOUSE_USER,
-                password=settings.CLICKHOUSE_PASSWORD,
-                database=settings.CLICKHOUSE_DATABASE
-            )
+            self.client = self._new_client()
+            self.batch_client = self._new_client()
             
             print(f"✅ ClickHouse client configured for {settings.CLICKHOUSE_HOST}:{settings.CLICKHOUSE_PORT} as {settings.CLICKHOUSE_USER}")
         except Exception as e:
             print(f"❌ Failed to configure ClickHouse client: {e}")
             self.client = None
+            self.batch_client = None
     
     async def test_connection(self):
         """Тестируем подключение к ClickHouse"""
@@ -260,7 +271,48 @@ class ClickHouseService:
             self.client.execute(query, data)
         except Exception as e:
             print(f"Failed to log track action: {e}")
-    
+
+    async def insert_listening_events(self, events: List[Dict[str, Any]]) -> int:
+        """Пакетная вставка прослушиваний в track_analytics одним INSERT"""
+        if not self.batch_client or not events:
+            return 0
+
+        query = """
+        INSERT INTO track_analytics
+        (timestamp, track_id, artist_id, user_id, action, duration_played_ms,
+         platform, device_type, location, session_id)
+        VALUES
+        """
+
+        data = [(
+            event['played_at'],
+            event['track_id'],
+            event.get('artist_id') or 0,
+            event['user_id'],
+            'play',
+            event.get('play_duration_ms') or 0,
+            event.get('source') or 'web',
+            event.get('device_type') or 'unknown',
+            event.get('country') or '',
+            event.get('session_id') or ''
+        ) for event in events]
+
+        try:
+            # Блокирующий драйвер: пачка уходит в отдельном потоке, чтобы не держать event loop
+            await asyncio.to_thread(self._execute_batch, query, data)
+            return len(data)
+        except Exception as e:
+            print(f"Failed to insert listening events: {e}")
+            return 0
+
+    def _execute_batch(self, query: str, data: List[tuple]):
+        with self._batch_lock:
+            self.batch_client.execute(query, data)
+
+    async def insert_listening_event(self, event: Dict[str, Any]) -> bool:
+        """Вставка одного прослушивания через пакетный путь"""
+        return await self.insert_listening_events([event]) == 1
+
     
     async def log_search_action(self,
                                query: str,
@@ -508,6 +560,13 @@ class ClickHouseService:
             except:
                 pass
             self.client = None
+        if self.batch_client:
+            with self._batch_lock:
+                try:
+                    self.batch_client.disconnect()
+                except Exception:
+                    pass
+            self.batch_client = None
     
     async def execute_query(self, query: str, parameters: list = None):
         """Выполняем произвольный запрос"""
@@ -2,8 +2,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
 from typing import List, Optional
 
+from app.core.pagination import apply_keyset
+from app.core.responses import payload_cache
 from app.db.models import Genre, Track
 from app.schemas.genre import GenreCreate, GenreUpdate, GenreWithStats
+from app.services.search_hydration import search_hydrator
+
+# Тег сериализованных списков жанров в payload_cache
+GENRES_TAG = "genres"
 
 
 class GenreService:
@@ -19,6 +25,7 @@ class GenreService:
         self.db.add(db_genre)
         await self.db.commit()
         await self.db.refresh(db_genre)
+        payload_cache.invalidate(GENRES_TAG)
         return db_genre
 
     async def get_by_id(self, genre_id: int) -> Optional[Genre]:
@@ -31,9 +38,12 @@ class GenreService:
         result = await self.db.execute(select(Genre).filter(Genre.name == name))
         return result.scalar_one_or_none()
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[Genre]:
-        """Получить все жанры"""
-        result = await self.db.execute(select(Genre).offset(skip).limit(limit))
+    async def get_all(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Genre]:
+        """Получить все жанры: по курсору или со смещением skip"""
+        query = apply_keyset(select(Genre), [Genre.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        result = await self.db.execute(query.limit(limit))
         return result.scalars().all()
 
     async def update(self, genre_id: int, genre_data: GenreUpdate) -> Genre:
@@ -49,6 +59,9 @@ class GenreService:
 
         await self.db.commit()
         await self.db.refresh(db_genre)
+        payload_cache.invalidate(GENRES_TAG)
+        # Название жанра скопировано в закэшированные результаты поиска треков
+        search_hydrator.cache.invalidate("genre", db_genre.id)
         return db_genre
 
     async def delete(self, genre_id: int) -> bool:
@@ -60,6 +73,8 @@ class GenreService:
 
         await self.db.delete(db_genre)
         await self.db.commit()
+        payload_cache.invalidate(GENRES_TAG)
+        search_hydrator.cache.invalidate("genre", genre_id)
         return True
 
     async def get_with_stats(self, genre_id: int) -> Optional[GenreWithStats]:
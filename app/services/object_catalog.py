@@ -0,0 +1,161 @@
+"""
+Каталог треков пользователя в PostgreSQL
+Загрузки в blobs/{sha256} уже описаны строками blob_references и storage_blobs; объекты
+со старыми ключами users/{user_id}/... описывает таблица stored_objects. Библиотека
+пользователя читается из этих таблиц без запросов к S3. Сверка проходит bucket постранично
+по continuation token и исправляет каталог, если объекты меняли в обход API.
+"""
+
+import logging
+import mimetypes
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import BlobReference, StorageBlob, StoredObject
+from app.services.blob_storage import blob_key
+from app.services.s3_service import async_s3_service
+from app.services.storage_inventory import storage_inventory
+
+logger = logging.getLogger(__name__)
+
+USER_PREFIX = "users/"
+# users/{user_id}/{yyyy}/{mm}/{dd}/{hash8}_{filename}
+_USER_KEY_RE = re.compile(r"^users/(\d+)/(?:.*/)?(?:[0-9a-f]{8}_)?([^/]+)$")
+
+
+def parse_user_key(s3_key: str) -> Optional[Tuple[int, str]]:
+    """ID владельца и исходное имя файла из старого ключа; None для чужих ключей"""
+    match = _USER_KEY_RE.match(s3_key)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def _catalog_row(obj: Dict[str, Any], synced_at: datetime) -> Optional[Dict[str, Any]]:
+    parsed = parse_user_key(obj['Key'])
+    if parsed is None:
+        return None
+    user_id, filename = parsed
+    last_modified = obj.get('LastModified')
+    return {
+        's3_key': obj['Key'],
+        'user_id': user_id,
+        'size': obj['Size'],
+        'etag': obj.get('ETag'),
+        'content_type': mimetypes.guess_type(filename)[0] or 'audio/mpeg',
+        'filename': filename,
+        # S3 отдает время с часовым поясом, в базе хранится наивное UTC
+        'last_modified': last_modified.replace(tzinfo=None) if last_modified else None,
+        'synced_at': synced_at
+    }
+
+
+class ObjectCatalogService:
+    """Чтение библиотеки пользователя и сверка каталога с S3"""
+
+    def __init__(self, db: AsyncSession, storage=async_s3_service):
+        self.db = db
+        self.storage = storage
+
+    async def list_user_tracks(self, user_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Последние загрузки пользователя, новые первыми; S3 не запрашивается"""
+        blob_rows = (await self.db.execute(
+            select(
+                BlobReference.blob_sha256,
+                BlobReference.filename,
+                BlobReference.created_at,
+                StorageBlob.size,
+                StorageBlob.content_type
+            )
+            .join(StorageBlob, StorageBlob.sha256 == BlobReference.blob_sha256)
+            .where(BlobReference.user_id == user_id)
+            .order_by(BlobReference.created_at.desc())
+            .limit(limit)
+        )).all()
+        legacy_rows = (await self.db.scalars(
+            select(StoredObject)
+            .where(StoredObject.user_id == user_id)
+            .order_by(StoredObject.last_modified.desc())
+            .limit(limit)
+        )).all()
+
+        entries = [
+            (blob_key(row.blob_sha256), row.size, row.created_at, row.content_type, row.filename)
+            for row in blob_rows
+        ] + [
+            (row.s3_key, row.size, row.last_modified, row.content_type, row.filename)
+            for row in legacy_rows
+        ]
+        entries.sort(key=lambda entry: entry[2] or datetime.min, reverse=True)
+        entries = entries[:limit]
+
+        urls = await self.storage.get_track_urls([entry[0] for entry in entries])
+        return [
+            {
+                'key': s3_key,
+                'size': size,
+                'last_modified': last_modified,
+                'content_type': content_type,
+                'url': urls.get(s3_key, ""),
+                'metadata': {'user-id': str(user_id), 'original-filename': filename}
+            }
+            for s3_key, size, last_modified, content_type, filename in entries
+        ]
+
+    async def forget(self, s3_key: str):
+        """Удаляет объект из каталога после удаления из S3"""
+        size = await self.db.scalar(
+            delete(StoredObject).where(StoredObject.s3_key == s3_key).returning(StoredObject.size)
+        )
+        await self.db.commit()
+        if size is not None:
+            storage_inventory.record(self.storage.tracks_bucket, s3_key, -size, objects=-1)
+
+    async def reconcile(self, user_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Сверяет каталог с bucket треков: постранично обходит users/ (или users/{user_id}/),
+        обновляет строки и удаляет те, чьих объектов в S3 больше нет
+        """
+        prefix = f"{USER_PREFIX}{user_id}/" if user_id is not None else USER_PREFIX
+        started_at = datetime.utcnow()
+        scanned = 0
+        token = None
+
+        while True:
+            objects, token = await self.storage.list_objects_page(
+                self.storage.tracks_bucket, prefix, token, settings.OBJECT_CATALOG_PAGE_SIZE
+            )
+            rows = [row for row in (_catalog_row(obj, started_at) for obj in objects) if row is not None]
+            if rows:
+                await self._upsert(rows)
+                await self.db.commit()
+            scanned += len(objects)
+            if token is None:
+                break
+
+        stale = delete(StoredObject).where(StoredObject.synced_at < started_at)
+        if user_id is not None:
+            stale = stale.where(StoredObject.user_id == user_id)
+        removed = (await self.db.execute(stale)).rowcount
+        await self.db.commit()
+
+        logger.info(f"Object catalog reconciled for {prefix}: {scanned} objects, {removed} stale rows removed")
+        return {'scanned': scanned, 'removed': removed}
+
+    async def _upsert(self, rows: List[Dict[str, Any]]):
+        statement = pg_insert(StoredObject).values(rows)
+        await self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[StoredObject.s3_key],
+                set_={
+                    column: statement.excluded[column]
+                    for column in ('size', 'etag', 'last_modified', 'synced_at')
+                }
+            )
+        )
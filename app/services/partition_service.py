@@ -0,0 +1,265 @@
+"""
+Обслуживание месячных партиций listening_history
+Создает партиции на несколько месяцев вперед, а партиции старше срока хранения
+отсоединяет, выгружает в S3 сжатым CSV и удаляет.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import logging
+import re
+import tempfile
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.s3_service import async_s3_service
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "listening_history"
+DEFAULT_PARTITION = "listening_history_default"
+PARTITION_NAME = re.compile(r"^listening_history_p(\d{4})(\d{2})$")
+COLUMNS = ["id", "user_id", "track_id", "played_at", "play_duration_ms", "completion_percentage", "source", "device_type"]
+
+# Ключ advisory lock: обслуживание выполняет один воркер из всех
+MAINTENANCE_LOCK_KEY = 0x6A71_6C68
+
+ARCHIVE_SPOOL_BYTES = 16 * 1024 * 1024
+STREAM_BATCH_SIZE = 5000
+
+ATTACHED_PARTITIONS_QUERY = text("""
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'listening_history'::regclass
+""")
+
+# Партиции, отсоединенные прошлым запуском, который не успел их архивировать
+DETACHED_PARTITIONS_QUERY = text("""
+    SELECT c.relname FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r' AND NOT c.relispartition
+      AND n.nspname = current_schema()
+      AND c.relname ~ '^listening_history_p[0-9]{6}$'
+""")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    match = PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def archive_key(month: date) -> str:
+    return f"{PARENT_TABLE}/{month:%Y}/{month:%m}.csv.gz"
+
+
+class ListeningHistoryPartitionService:
+    """Сервис для управления партициями истории прослушиваний"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _partition_months(self, query) -> Dict[date, str]:
+        result = await self.db.execute(query)
+        months = {}
+        for name in result.scalars():
+            month = parse_partition_name(name)
+            if month is not None:
+                months[month] = name
+        return months
+
+    async def list_partitions(self) -> List[date]:
+        """Месяцы, для которых есть подключенная партиция"""
+        return sorted(await self._partition_months(ATTACHED_PARTITIONS_QUERY))
+
+    async def create_partition(self, month: date) -> str:
+        """
+        Создает партицию месяца. Строки этого месяца, уже попавшие в DEFAULT-партицию,
+        переносятся в новую таблицу до ATTACH, иначе PostgreSQL отклонит подключение.
+        """
+        name = partition_name(month)
+        start, end = month, add_months(month, 1)
+        bounds = {"start": datetime(start.year, start.month, 1), "end": datetime(end.year, end.month, 1)}
+
+        await self.db.execute(text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        await self.db.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE played_at >= :start AND played_at < :end
+                RETURNING {", ".join(COLUMNS)}
+            )
+            INSERT INTO {name} ({", ".join(COLUMNS)}) SELECT {", ".join(COLUMNS)} FROM moved
+        """), bounds)
+        # CHECK с границами партиции позволяет ATTACH не сканировать таблицу повторно
+        await self.db.execute(text(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds "
+            f"CHECK (played_at >= '{start.isoformat()}' AND played_at < '{end.isoformat()}')"
+        ))
+        await self.db.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        await self.db.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+        await self.db.commit()
+
+        logger.info(f"Created partition {name}")
+        return name
+
+    async def ensure_future_partitions(self, months_ahead: Optional[int] = None) -> List[str]:
+        """Создает недостающие партиции с текущего месяца на months_ahead месяцев вперед"""
+        if months_ahead is None:
+            months_ahead = settings.LISTENING_HISTORY_PARTITIONS_AHEAD
+
+        existing = set(await self.list_partitions())
+        current = month_start(datetime.utcnow().date())
+
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(await self.create_partition(month))
+        return created
+
+    async def _write_archive(self, name: str, fileobj) -> int:
+        """Потоково пишет строки партиции в gzip CSV, возвращает число строк"""
+        rows = 0
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as archive:
+            stream = io.TextIOWrapper(archive, encoding="utf-8", newline="", write_through=True)
+            writer = csv.writer(stream)
+            writer.writerow(COLUMNS)
+
+            result = await self.db.stream(
+                text(f"SELECT {', '.join(COLUMNS)} FROM {name} ORDER BY played_at, id"),
+                execution_options={"yield_per": STREAM_BATCH_SIZE}
+            )
+            async for batch in result.partitions(STREAM_BATCH_SIZE):
+                writer.writerows(batch)
+                rows += len(batch)
+            stream.detach()
+        await self.db.commit()
+        return rows
+
+    async def archive_partition(self, month: date, attached: bool = True) -> bool:
+        """
+        Отсоединяет партицию, выгружает ее в S3 и удаляет.
+        Если выгрузка не удалась, партиция подключается обратно.
+        """
+        name = partition_name(month)
+        start, end = month, add_months(month, 1)
+
+        if attached:
+            await self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            await self.db.commit()
+
+        with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES) as spool:
+            rows = await self._write_archive(name, spool)
+            size = spool.tell()
+            spool.seek(0)
+
+            result = await async_s3_service.upload_archive(
+                spool,
+                archive_key(month),
+                size,
+                {"rows": rows, "partition": name}
+            )
+
+        if not result["success"]:
+            logger.error(f"Archiving {name} failed, reattaching: {result['error']}")
+            await self.db.execute(text(
+                f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            await self.db.commit()
+            return False
+
+        await self.db.execute(text(f"DROP TABLE {name}"))
+        await self.db.commit()
+
+        logger.info(f"Archived partition {name}: {rows} rows to {archive_key(month)}")
+        return True
+
+    async def archive_old_partitions(self, retention_months: Optional[int] = None) -> List[str]:
+        """Архивирует партиции старше retention_months месяцев"""
+        if retention_months is None:
+            retention_months = settings.LISTENING_HISTORY_RETENTION_MONTHS
+
+        cutoff = add_months(month_start(datetime.utcnow().date()), -retention_months)
+        attached = await self._partition_months(ATTACHED_PARTITIONS_QUERY)
+        detached = await self._partition_months(DETACHED_PARTITIONS_QUERY)
+
+        archived = []
+        for month in sorted(set(attached) | set(detached)):
+            if month >= cutoff:
+                continue
+            if await self.archive_partition(month, attached=month in attached):
+                archived.append(partition_name(month))
+        return archived
+
+
+async def run_partition_maintenance() -> Optional[Dict[str, List[str]]]:
+    """
+    Один проход обслуживания на выделенном соединении под advisory lock.
+    Возвращает None, если обслуживание уже выполняет другой процесс.
+    """
+    from app.db.database import engine
+
+    async with engine.connect() as connection:
+        locked = (await connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+        )).scalar()
+        if not locked:
+            await connection.rollback()
+            return None
+
+        timeout_ms = settings.DB_STATEMENT_TIMEOUTS_MS.get("worker", 0)
+        await connection.execute(text(f"SET statement_timeout = {int(timeout_ms)}"))
+        await connection.commit()
+
+        try:
+            async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+                service = ListeningHistoryPartitionService(session)
+                return {
+                    "created": await service.ensure_future_partitions(),
+                    "archived": await service.archive_old_partitions()
+                }
+        finally:
+            await connection.rollback()
+            await connection.execute(text("RESET statement_timeout"))
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+            await connection.commit()
+
+
+async def partition_maintenance_loop():
+    """Периодическое обслуживание партиций, запускается при старте приложения"""
+    while True:
+        try:
+            result = await run_partition_maintenance()
+            if result and (result["created"] or result["archived"]):
+                logger.info(f"Partition maintenance: {result}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {e}")
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
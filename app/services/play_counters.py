@@ -0,0 +1,216 @@
+"""
+Счетчики прослушиваний с отложенной записью
+Событие прослушивания увеличивает счетчики трека, альбома и исполнителя в памяти процесса,
+фоновая задача раз в несколько секунд сбрасывает накопленные приращения в PostgreSQL
+одним UPDATE ... FROM (VALUES ...) на таблицу.
+
+popularity_score — сумма прослушиваний с экспоненциальным затуханием (период полураспада
+POPULARITY_HALF_LIFE_HOURS). Счет хранится вместе с моментом, к которому он приведен, поэтому
+затухание идемпотентно: его можно применять из любого воркера и в любой момент.
+Track.popularity — логарифм счета. Трек, который еще не считался (score_updated_at пуст),
+получает начальный счет из импортированной popularity, чтобы первое прослушивание ее не обнуляло.
+Затухание переписывает только строки, у которых меняется округленный логарифм счета.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import BigInteger, Integer, case, cast, column, func, literal, or_, text, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.core.config import settings
+from app.core.responses import payload_cache
+from app.db.models import Track, Album, Artist
+from app.services.track_service import POPULAR_TRACKS_TAG
+
+logger = logging.getLogger(__name__)
+
+MODELS = {"track": Track, "album": Album, "artist": Artist}
+
+# Счет ниже порога обнуляется, чтобы затухание не переписывало давно забытые строки
+SCORE_EPSILON = 1e-3
+# power() в PostgreSQL падает на underflow, 0.5^1000 еще представимо
+MAX_HALF_LIVES = 1000
+DECAY_LOCK_KEY = 0x706C_6179
+
+
+def _decayed_score(model, now: datetime) -> ColumnElement:
+    """popularity_score, приведенный к моменту now"""
+    age_seconds = func.extract("epoch", literal(now) - func.coalesce(model.score_updated_at, literal(now)))
+    half_lives = func.least(age_seconds / (settings.POPULARITY_HALF_LIFE_HOURS * 3600), MAX_HALF_LIVES)
+    return model.popularity_score * func.power(0.5, half_lives)
+
+
+def _log_scale(score: ColumnElement) -> ColumnElement:
+    return func.round(settings.POPULARITY_LOG_SCALE * func.ln(1 + score))
+
+
+def _popularity(score: ColumnElement) -> ColumnElement:
+    """Шкала 0-100 для Track.popularity: логарифм затухающего счета"""
+    return cast(func.least(100, _log_scale(score)), Integer)
+
+
+def _seed_score(model) -> ColumnElement:
+    """Счет, которому соответствует импортированная popularity (обратное к _popularity)"""
+    return func.exp(func.coalesce(model.popularity, 0) / settings.POPULARITY_LOG_SCALE) - 1
+
+
+class PlayCounters:
+    """Приращения счетчиков в памяти процесса и их пакетная запись"""
+
+    def __init__(self):
+        self._deltas: Dict[str, Counter] = {kind: Counter() for kind in MODELS}
+        self.recorded = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+        self.last_flush_at: Optional[float] = None
+
+    def record(self, track_id: int, album_id: Optional[int] = None, artist_id: Optional[int] = None, plays: int = 1):
+        """Учитывает прослушивание; запись в базу — при следующем flush"""
+        self._deltas["track"][track_id] += plays
+        if album_id:
+            self._deltas["album"][album_id] += plays
+        if artist_id:
+            self._deltas["artist"][artist_id] += plays
+        self.recorded += plays
+
+    def pending(self) -> int:
+        return sum(len(deltas) for deltas in self._deltas.values())
+
+    def _drain(self) -> Dict[str, Counter]:
+        drained, self._deltas = self._deltas, {kind: Counter() for kind in MODELS}
+        return drained
+
+    def _restore(self, drained: Dict[str, Counter]):
+        for kind, deltas in drained.items():
+            self._deltas[kind].update(deltas)
+
+    async def flush(self, session: AsyncSession) -> int:
+        """Записывает накопленные приращения; при ошибке они возвращаются в очередь"""
+        drained = self._drain()
+        if not any(drained.values()):
+            return 0
+
+        now = datetime.utcnow()
+        rows = 0
+        try:
+            for kind, deltas in drained.items():
+                items = sorted(deltas.items())
+                for start in range(0, len(items), settings.PLAY_COUNTERS_BATCH_SIZE):
+                    batch = items[start:start + settings.PLAY_COUNTERS_BATCH_SIZE]
+                    await session.execute(self._update_statement(MODELS[kind], batch, now))
+                    rows += len(batch)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            self._restore(drained)
+            self.flush_errors += 1
+            raise
+
+        if drained["track"]:
+            payload_cache.invalidate(POPULAR_TRACKS_TAG)
+        self.flushed_rows += rows
+        self.last_flush_at = time.time()
+        return rows
+
+    def _update_statement(self, model, batch, now: datetime):
+        # Отсортированные id задают одинаковый порядок блокировок строк во всех воркерах
+        deltas = values(
+            column("id", Integer),
+            column("delta", BigInteger),
+            name="deltas"
+        ).data(batch)
+
+        score = _decayed_score(model, now)
+        if model is Track:
+            score = case((model.score_updated_at.is_(None), _seed_score(model)), else_=score)
+        score = score + deltas.c.delta
+        assignments = {
+            "play_count": model.play_count + deltas.c.delta,
+            "popularity_score": score,
+            "score_updated_at": now
+        }
+        if model is Track:
+            assignments["popularity"] = _popularity(score)
+
+        return (
+            update(model)
+            .where(model.id == deltas.c.id)
+            .values(**assignments)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def decay(self, session: AsyncSession) -> int:
+        """
+        Приводит счета к текущему моменту, чтобы ранжирование было сопоставимым.
+        Строка переписывается, только если меняется округленный логарифм счета (а с ним
+        Track.popularity) или счет опускается ниже порога; иначе сохраненный счет отличается
+        от точного меньше, чем на шаг шкалы popularity
+        """
+        locked = (await session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": DECAY_LOCK_KEY}
+        )).scalar()
+        if not locked:
+            await session.rollback()
+            return 0
+
+        now = datetime.utcnow()
+        rows = 0
+        for model in MODELS.values():
+            decayed = _decayed_score(model, now)
+            score = func.greatest(decayed, 0) * (decayed >= SCORE_EPSILON).cast(Integer)
+            assignments = {"popularity_score": score, "score_updated_at": now}
+            if model is Track:
+                assignments["popularity"] = _popularity(score)
+
+            result = await session.execute(
+                update(model)
+                .where(
+                    model.popularity_score > 0,
+                    or_(decayed < SCORE_EPSILON, _log_scale(decayed) != _log_scale(model.popularity_score))
+                )
+                .values(**assignments)
+                .execution_options(synchronize_session=False)
+            )
+            rows += result.rowcount or 0
+        await session.commit()
+        if rows:
+            payload_cache.invalidate(POPULAR_TRACKS_TAG)
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_rows": self.pending(),
+            "recorded_plays": self.recorded,
+            "flushed_rows": self.flushed_rows,
+            "flush_errors": self.flush_errors,
+            "last_flush_at": self.last_flush_at
+        }
+
+
+play_counters = PlayCounters()
+
+
+async def play_counters_loop():
+    """Периодический flush счетчиков и затухание популярности"""
+    from app.db.database import AsyncSessionLocal
+
+    last_decay = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.PLAY_COUNTERS_FLUSH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as session:
+                await play_counters.flush(session)
+
+                if time.monotonic() - last_decay >= settings.POPULARITY_DECAY_INTERVAL_SECONDS:
+                    last_decay = time.monotonic()
+                    await play_counters.decay(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Play counters flush failed: {e}")
@@ -0,0 +1,71 @@
+"""
+Кэш presigned URL
+Подписанный URL переиспользуется, пока у него остается заметная часть срока действия:
+запись живет expires_in * ttl_ratio секунд, поэтому клиент всегда получает URL,
+действующий еще не меньше expires_in * (1 - ttl_ratio) секунд.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+
+class PresignedUrlCache:
+    """LRU-кэш (bucket, key, expires_in) → URL; методы вызываются и из потоков пула s3"""
+
+    def __init__(self, ttl_ratio: float, max_entries: int):
+        self.ttl_ratio = ttl_ratio
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, bucket: str, keys: Iterable[str], expires_in: int) -> Tuple[Dict[str, str], List[str]]:
+        """Возвращает найденные URL и ключи, которые нужно подписать"""
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                cache_key = (bucket, key, expires_in)
+                entry = self._entries.get(cache_key)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(cache_key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                else:
+                    if entry:
+                        del self._entries[cache_key]
+                    missing.append(key)
+                    self.misses += 1
+
+        return found, missing
+
+    def put_many(self, bucket: str, urls: Dict[str, str], expires_in: int):
+        # Время отсчитывается от момента подписи, поэтому запись не переживет URL
+        refresh_at = time.monotonic() + expires_in * self.ttl_ratio
+        with self._lock:
+            for key, url in urls.items():
+                cache_key = (bucket, key, expires_in)
+                self._entries[cache_key] = (refresh_at, url)
+                self._entries.move_to_end(cache_key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket: str, key: str):
+        """Удаляет URL объекта для всех сроков действия"""
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == bucket and k[1] == key]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
@@ -0,0 +1,368 @@
+"""
+Возобновляемые загрузки (по образцу протокола tus)
+Клиент создает загрузку с объявленным размером, шлет байты запросами PATCH с указанием
+смещения, после обрыва узнает принятое смещение и продолжает с него, затем завершает загрузку.
+Каждой загрузке соответствует multipart upload во временном bucket: тело PATCH режется на части
+фиксированного размера, смещение растет только на целые части, подтвержденные S3.
+Хвост PATCH короче части не сохраняется — клиент повторяет его со смещения из ответа.
+Запрос пишет под арендой (locked_until). Каждое сохранение части условно: строка обновляется,
+только если смещение и аренда те же, что запрос видел. Если медленный PATCH пережил аренду
+и ее взял повторный запрос, опоздавший получает UploadConflict и не затирает чужие ETag.
+В памяти находятся не больше S3_MULTIPART_CONCURRENCY + 1 частей, файл целиком не буферизуется.
+Завершение собирает объект и сохраняет его как блоб blobs/{sha256}.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import ResumableUpload
+from app.services.blob_storage import BlobStorageService, StoredBlob
+from app.services.s3_multipart import MIN_PART_SIZE, UploadTooLarge
+from app.services.s3_service import async_s3_service
+
+logger = logging.getLogger(__name__)
+
+# Предел числа частей multipart upload в S3
+MAX_PARTS = 10000
+
+# SHA-256 принятого префикса загрузки: (принятые байты, хэш). Состояние hashlib не сериализуется,
+# поэтому живет в памяти процесса; если PATCH пришел в другой процесс, хэш считается при завершении
+# повторным чтением собранного объекта
+_hash_states: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+
+
+class UploadNotFound(LookupError):
+    """Загрузки нет, она чужая или истекла"""
+
+
+class UploadConflict(ValueError):
+    """Смещение не совпало с принятым, загрузка занята другим запросом или еще не дописана"""
+
+
+def part_size_for(total_size: int) -> int:
+    """Размер части: не меньше S3_MULTIPART_PART_SIZE и такой, чтобы частей было не больше MAX_PARTS"""
+    size = max(settings.S3_MULTIPART_PART_SIZE, MIN_PART_SIZE, math.ceil(total_size / MAX_PARTS))
+    return math.ceil(size / (1024 * 1024)) * 1024 * 1024
+
+
+class ResumableUploadService:
+    """Создание, дозапись, завершение и отмена возобновляемых загрузок"""
+
+    def __init__(self, db: AsyncSession, storage=async_s3_service):
+        self.db = db
+        self.storage = storage
+
+    async def create(
+        self,
+        user_id: int,
+        filename: str,
+        content_type: str,
+        total_size: int,
+        expected_sha256: Optional[str] = None,
+        track_id: Optional[int] = None
+    ) -> ResumableUpload:
+        staging_key = self.storage.new_staging_key()
+        s3_upload_id = await self.storage.create_staging_upload(staging_key, content_type)
+        upload = ResumableUpload(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            track_id=track_id,
+            filename=filename,
+            content_type=content_type,
+            total_size=total_size,
+            expected_sha256=expected_sha256,
+            staging_key=staging_key,
+            s3_upload_id=s3_upload_id,
+            part_size=part_size_for(total_size),
+            received_bytes=0,
+            parts=[],
+            expires_at=self._expires_at()
+        )
+        self.db.add(upload)
+        try:
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            await self._abort_staging(staging_key, s3_upload_id)
+            raise
+        return upload
+
+    async def get(self, upload_id: str, user_id: int) -> ResumableUpload:
+        upload = await self.db.scalar(
+            select(ResumableUpload).where(
+                ResumableUpload.id == upload_id,
+                ResumableUpload.user_id == user_id,
+                ResumableUpload.expires_at > datetime.utcnow()
+            )
+        )
+        if upload is None:
+            raise UploadNotFound(upload_id)
+        return upload
+
+    async def append(self, upload_id: str, user_id: int, offset: int,
+                     chunks: AsyncIterator[bytes]) -> ResumableUpload:
+        """
+        Дописывает поток, начиная с offset. Части уходят в S3 параллельно, смещение и ETag
+        сохраняются по порядку частей. При обрыве потока уже отправленные части дожидаются
+        и засчитываются. Возвращает загрузку с новым смещением.
+        """
+        upload = await self._lease(upload_id, user_id)
+        try:
+            if upload.received_bytes != offset:
+                raise UploadConflict(f"Upload offset is {upload.received_bytes}, got {offset}")
+            await self._receive(upload, chunks)
+        finally:
+            await self._release(upload)
+        return upload
+
+    async def complete(self, upload_id: str, user_id: int) -> Tuple[ResumableUpload, StoredBlob]:
+        """
+        Собирает объект из частей и сохраняет его как блоб. После сборки multipart upload
+        больше не существует, поэтому при любой ошибке загрузка удаляется и начинается заново.
+        """
+        upload = await self._lease(upload_id, user_id)
+        if upload.received_bytes != upload.total_size:
+            await self._release(upload)
+            raise UploadConflict(f"Upload has {upload.received_bytes} of {upload.total_size} bytes")
+
+        try:
+            await self.storage.complete_staging_upload(upload.staging_key, upload.s3_upload_id, upload.parts)
+        except BaseException:
+            await self._release(upload)
+            raise
+
+        try:
+            state = _hash_states.pop(upload_id, None)
+            if state is not None and state[0] == upload.total_size:
+                sha256 = state[1].hexdigest()
+            else:
+                sha256 = await self.storage.hash_temp_object(upload.staging_key)
+
+            # Строка загрузки удаляется в транзакции, которая добавляет ссылку на блоб
+            deleted = await self.db.execute(
+                delete(ResumableUpload).where(
+                    ResumableUpload.id == upload_id,
+                    ResumableUpload.locked_until == upload.locked_until
+                )
+            )
+            if deleted.rowcount == 0:
+                raise UploadConflict("Upload lease expired")
+            stored = await BlobStorageService(self.db, self.storage).store_staged(
+                upload.staging_key, sha256, upload.total_size, upload.user_id, upload.filename,
+                upload.content_type, upload.expected_sha256, upload.track_id
+            )
+        except BaseException:
+            await self.db.rollback()
+            await self._forget(upload_id)
+            await self.storage.delete_temp_object(upload.staging_key)
+            raise
+        return upload, stored
+
+    async def abort(self, upload_id: str, user_id: int):
+        upload = await self._lease(upload_id, user_id)
+        await self._abort_staging(upload.staging_key, upload.s3_upload_id)
+        await self._forget(upload_id)
+
+    async def expire(self, limit: int = 100) -> int:
+        """Отменяет multipart upload истекших загрузок и удаляет их строки"""
+        now = datetime.utcnow()
+        uploads = (await self.db.scalars(
+            select(ResumableUpload)
+            .where(
+                ResumableUpload.expires_at < now,
+                or_(ResumableUpload.locked_until.is_(None), ResumableUpload.locked_until < now)
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )).all()
+        for upload in uploads:
+            await self._abort_staging(upload.staging_key, upload.s3_upload_id)
+            _hash_states.pop(upload.id, None)
+        if uploads:
+            await self.db.execute(
+                delete(ResumableUpload).where(ResumableUpload.id.in_([upload.id for upload in uploads]))
+            )
+        await self.db.commit()
+        if uploads:
+            logger.info(f"Expired {len(uploads)} resumable uploads")
+        return len(uploads)
+
+    async def _receive(self, upload: ResumableUpload, chunks: AsyncIterator[bytes]):
+        state = _hash_states.pop(upload.id, None)
+        if state is not None and state[0] == upload.received_bytes:
+            sha256 = state[1]
+        elif upload.received_bytes == 0:
+            sha256 = hashlib.sha256()
+        else:
+            sha256 = None
+
+        position = upload.received_bytes
+        buffer = bytearray()
+        in_flight: Deque[Tuple[bytes, asyncio.Future]] = deque()
+        concurrency = settings.S3_MULTIPART_CONCURRENCY
+
+        async def commit_oldest():
+            part, task = in_flight.popleft()
+            etag = await task
+            await self._save_progress(
+                upload,
+                upload.received_bytes + len(part),
+                upload.parts + [{'PartNumber': len(upload.parts) + 1, 'ETag': etag}]
+            )
+            if sha256 is not None:
+                sha256.update(part)
+
+        async def submit(part: bytes):
+            number = len(upload.parts) + len(in_flight) + 1
+            in_flight.append((part, asyncio.ensure_future(
+                self.storage.upload_staging_part(upload.staging_key, upload.s3_upload_id, number, part)
+            )))
+            while len(in_flight) >= concurrency:
+                await commit_oldest()
+
+        try:
+            async for chunk in chunks:
+                if position + len(chunk) > upload.total_size:
+                    raise UploadTooLarge(upload.total_size)
+                position += len(chunk)
+                buffer += chunk
+                while len(buffer) >= upload.part_size:
+                    part = bytes(buffer[:upload.part_size])
+                    del buffer[:upload.part_size]
+                    await submit(part)
+
+            if buffer and position == upload.total_size:
+                await submit(bytes(buffer))
+                buffer.clear()
+            while in_flight:
+                await commit_oldest()
+        except asyncio.CancelledError:
+            self._cancel(in_flight)
+            raise
+        except UploadConflict:
+            # Аренду взял другой запрос: его части, смещение и хэш главнее
+            self._cancel(in_flight)
+            sha256 = None
+            raise
+        except Exception:
+            # Части, уже ушедшие в S3, засчитываются по порядку до первой неудачной
+            try:
+                while in_flight:
+                    await commit_oldest()
+            except Exception as e:
+                logger.warning(f"Resumable upload {upload.id}: part failed after stream error: {e}")
+                self._cancel(in_flight)
+            raise
+        finally:
+            if sha256 is not None:
+                _hash_states[upload.id] = (upload.received_bytes, sha256)
+
+    @staticmethod
+    def _cancel(in_flight: Deque[Tuple[bytes, asyncio.Future]]):
+        for _, task in in_flight:
+            task.cancel()
+        in_flight.clear()
+
+    async def _lease(self, upload_id: str, user_id: int) -> ResumableUpload:
+        """Берет аренду загрузки; UploadNotFound или UploadConflict, если взять нельзя"""
+        now = datetime.utcnow()
+        upload = await self.db.scalar(
+            update(ResumableUpload)
+            .where(
+                ResumableUpload.id == upload_id,
+                ResumableUpload.user_id == user_id,
+                ResumableUpload.expires_at > now,
+                or_(ResumableUpload.locked_until.is_(None), ResumableUpload.locked_until < now)
+            )
+            .values(locked_until=self._lease_until())
+            .returning(ResumableUpload)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if upload is None:
+            await self.get(upload_id, user_id)
+            raise UploadConflict("Upload is being written by another request")
+        # Состояние меняется только явными UPDATE; отсоединенный объект не перечитывается после rollback
+        self.db.expunge(upload)
+        return upload
+
+    async def _save_progress(self, upload: ResumableUpload, received_bytes: int, parts: List[Dict]):
+        """
+        Сохраняет принятую часть, продлевает аренду и срок жизни загрузки.
+        UploadConflict, если смещение или аренда в строке уже не те, что у этого запроса
+        """
+        locked_until = self._lease_until()
+        expires_at = self._expires_at()
+        result = await self.db.execute(
+            update(ResumableUpload)
+            .where(
+                ResumableUpload.id == upload.id,
+                ResumableUpload.received_bytes == upload.received_bytes,
+                ResumableUpload.locked_until == upload.locked_until
+            )
+            .values(
+                received_bytes=received_bytes,
+                parts=parts,
+                locked_until=locked_until,
+                expires_at=expires_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if result.rowcount == 0:
+            raise UploadConflict("Upload lease expired and was taken by another request")
+        upload.received_bytes = received_bytes
+        upload.parts = parts
+        upload.locked_until = locked_until
+        upload.expires_at = expires_at
+
+    async def _release(self, upload: ResumableUpload):
+        """Снимает аренду, если она все еще принадлежит этому запросу"""
+        try:
+            await self.db.rollback()
+            await self.db.execute(
+                update(ResumableUpload)
+                .where(ResumableUpload.id == upload.id, ResumableUpload.locked_until == upload.locked_until)
+                .values(locked_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+        except Exception as e:
+            # Аренда истечет сама через RESUMABLE_UPLOAD_LEASE_SECONDS
+            logger.error(f"Failed to release resumable upload {upload.id}: {e}")
+
+    async def _forget(self, upload_id: str):
+        _hash_states.pop(upload_id, None)
+        await self.db.execute(delete(ResumableUpload).where(ResumableUpload.id == upload_id))
+        await self.db.commit()
+
+    async def _abort_staging(self, staging_key: str, s3_upload_id: str):
+        try:
+            await self.storage.abort_staging_upload(staging_key, s3_upload_id)
+        except Exception as e:
+            logger.warning(f"Failed to abort multipart upload {staging_key}: {e}")
+
+    @staticmethod
+    def _lease_until() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.RESUMABLE_UPLOAD_LEASE_SECONDS)
+
+    @staticmethod
+    def _expires_at() -> datetime:
+        return datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+
+
+async def expire_resumable_uploads() -> int:
+    from app.db.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        return await ResumableUploadService(session).expire()
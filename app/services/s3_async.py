@@ -0,0 +1,169 @@
+"""
+Асинхронный фасад над S3Service
+Блокирующие вызовы boto3 выполняются на общем ограниченном пуле потоков, размер которого
+согласован с пулом соединений botocore (max_pool_connections). Медленный MinIO занимает
+потоки пула, но не event loop; запросы метаданных ограничены по времени.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.services.s3_multipart import StreamedObject
+    from app.services.s3_service import S3Service
+
+logger = logging.getLogger(__name__)
+
+# Сколько URL подписывать прямо в event loop; больше — на пуле s3
+INLINE_SIGN_LIMIT = 16
+
+s3_executor = ThreadPoolExecutor(
+    max_workers=settings.S3_EXECUTOR_WORKERS,
+    thread_name_prefix="s3"
+)
+
+
+async def run_s3(fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Выполняет блокирующий вызов S3 на пуле s3_executor.
+    По таймауту вызывающий получает asyncio.TimeoutError; поток дорабатывает сам,
+    его ограничивают connect/read таймауты botocore.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(s3_executor, functools.partial(fn, *args, **kwargs))
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout)
+
+
+class AsyncS3Service:
+    """Асинхронные версии методов S3Service"""
+
+    def __init__(self, service: "S3Service", operation_timeout: Optional[float] = None):
+        self.service = service
+        self.operation_timeout = operation_timeout or settings.S3_OPERATION_TIMEOUT_SECONDS
+
+    @property
+    def endpoint_url(self) -> str:
+        return self.service.endpoint_url
+
+    @property
+    def tracks_bucket(self) -> str:
+        return self.service.tracks_bucket
+
+    @property
+    def buckets(self) -> List[str]:
+        return self.service.buckets
+
+    @property
+    def temp_bucket(self) -> str:
+        return self.service.temp_bucket
+
+    # Загрузки: время зависит от размера, зависания ловит read_timeout botocore
+
+    async def upload_track(self, file_content: BinaryIO, filename: str,
+                           user_id: int, metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        return await run_s3(self.service.upload_track, file_content, filename, user_id, metadata)
+
+    async def stage_stream(self, chunks: AsyncIterator[bytes], content_type: str,
+                           max_size: Optional[int] = None) -> "StreamedObject":
+        return await self.service.stage_stream(chunks, content_type, max_size)
+
+    async def promote_blob(self, staging_key: str, sha256: str, content_type: str):
+        await run_s3(self.service.promote_blob, staging_key, sha256, content_type)
+
+    # Возобновляемые загрузки: части multipart upload во временном bucket
+
+    def new_staging_key(self) -> str:
+        return self.service.new_staging_key()
+
+    async def create_staging_upload(self, staging_key: str, content_type: str) -> str:
+        return await run_s3(self.service.create_staging_upload, staging_key, content_type, timeout=self.operation_timeout)
+
+    async def upload_staging_part(self, staging_key: str, upload_id: str, part_number: int, body: bytes) -> str:
+        return await run_s3(self.service.upload_staging_part, staging_key, upload_id, part_number, body)
+
+    async def complete_staging_upload(self, staging_key: str, upload_id: str, parts: List[Dict]):
+        await run_s3(self.service.complete_staging_upload, staging_key, upload_id, parts)
+
+    async def abort_staging_upload(self, staging_key: str, upload_id: str):
+        await run_s3(self.service.abort_staging_upload, staging_key, upload_id, timeout=self.operation_timeout)
+
+    async def hash_temp_object(self, staging_key: str) -> str:
+        return await run_s3(self.service.hash_temp_object, staging_key)
+
+    async def upload_cover(self, file_content: BinaryIO, filename: str,
+                           track_id: Optional[int] = None, album_id: Optional[int] = None) -> Dict[str, Any]:
+        return await run_s3(self.service.upload_cover, file_content, filename, track_id, album_id)
+
+    async def upload_archive(self, file_content: BinaryIO, s3_key: str, size: int,
+                             metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        return await run_s3(self.service.upload_archive, file_content, s3_key, size, metadata)
+
+    # Потоковое чтение: таймаут только до первого байта, дальше чтение ограничивает read_timeout
+
+    async def open_track_object(self, s3_key: str, byte_range: Optional[str] = None,
+                                if_match: Optional[str] = None, if_none_match: Optional[str] = None) -> Dict[str, Any]:
+        return await run_s3(
+            self.service.open_track_object, s3_key, byte_range, if_match, if_none_match,
+            timeout=self.operation_timeout
+        )
+
+    async def read_body(self, body, size: int) -> bytes:
+        return await run_s3(body.read, size)
+
+    # Подпись URL — локальное вычисление без обращения к S3
+
+    def get_track_url(self, s3_key: str, expires_in: int = 3600) -> str:
+        return self.service.get_track_url(s3_key, expires_in)
+
+    async def get_track_urls(self, s3_keys: List[str], expires_in: int = 3600) -> Dict[str, str]:
+        """URL из кэша сразу; если не хватает многих, подпись уходит в пул, чтобы не держать event loop"""
+        cache = self.service.url_cache
+        urls, missing = cache.get_many(self.service.tracks_bucket, s3_keys, expires_in)
+        if len(missing) > INLINE_SIGN_LIMIT:
+            signed = await run_s3(self.service.sign_track_urls, missing, expires_in)
+        else:
+            signed = self.service.sign_track_urls(missing, expires_in)
+        cache.put_many(self.service.tracks_bucket, signed, expires_in)
+        urls.update(signed)
+        return {s3_key: urls[s3_key] for s3_key in s3_keys if s3_key in urls}
+
+    def get_cover_url(self, s3_key: str) -> str:
+        return self.service.get_cover_url(s3_key)
+
+    # Запросы метаданных и обслуживание
+
+    async def get_track_metadata(self, s3_key: str) -> Optional[Dict]:
+        return await run_s3(self.service.get_track_metadata, s3_key, timeout=self.operation_timeout)
+
+    async def delete_track(self, s3_key: str) -> bool:
+        return await run_s3(self.service.delete_track, s3_key, timeout=self.operation_timeout)
+
+    async def list_objects_page(self, bucket: str, prefix: str = "", continuation_token: Optional[str] = None,
+                                max_keys: int = 1000, start_after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        return await run_s3(
+            self.service.list_objects_page, bucket, prefix, continuation_token, max_keys, start_after,
+            timeout=self.operation_timeout
+        )
+
+    async def delete_objects_batch(self, bucket: str, s3_keys: List[str]) -> List[str]:
+        return await run_s3(self.service.delete_objects_batch, bucket, s3_keys, timeout=self.operation_timeout)
+
+    async def list_top_level(self, bucket: str) -> Tuple[List[str], int, int]:
+        return await run_s3(self.service.list_top_level, bucket, timeout=self.operation_timeout)
+
+    async def delete_temp_object(self, s3_key: str) -> bool:
+        return await run_s3(self.service.delete_temp_object, s3_key, timeout=self.operation_timeout)
+
+    async def delete_blob(self, sha256: str) -> bool:
+        return await run_s3(self.service.delete_blob, sha256, timeout=self.operation_timeout)
+
+
+def shutdown_s3_executor():
+    s3_executor.shutdown(wait=False, cancel_futures=True)
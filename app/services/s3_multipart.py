@@ -0,0 +1,184 @@
+"""
+Потоковая загрузка в S3 через multipart upload
+Данные приходят кусками, хэшируются на лету и уходят частями параллельно; в памяти
+одновременно находятся не больше S3_MULTIPART_CONCURRENCY + 1 частей. Вызовы boto3
+выполняются на общем пуле s3_executor, event loop не блокируется.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.s3_async import run_s3
+
+logger = logging.getLogger(__name__)
+
+# Минимальный размер части, кроме последней, по спецификации S3
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Поток превысил допустимый размер; multipart-загрузка уже отменена"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class StreamedObject(NamedTuple):
+    bucket: str
+    key: str
+    size: int
+    md5: str
+    sha256: str
+    etag: str
+
+
+class MultipartUpload:
+    """Одна потоковая загрузка: write() кусками, затем complete() или abort()"""
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        extra_args: Optional[Dict[str, Any]] = None,
+        max_size: Optional[int] = None,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = extra_args or {}
+        self.max_size = max_size
+        self.part_size = max(part_size or settings.S3_MULTIPART_PART_SIZE, MIN_PART_SIZE)
+        self.size = 0
+        self.upload_id: Optional[str] = None
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._slots = asyncio.Semaphore(concurrency or settings.S3_MULTIPART_CONCURRENCY)
+        self._tasks: List[asyncio.Task] = []
+        self._etags: Dict[int, str] = {}
+
+    async def write(self, chunk: bytes):
+        """Добавляет кусок; заполненные части отправляются в фоне"""
+        if self.max_size is not None and self.size + len(chunk) > self.max_size:
+            raise UploadTooLarge(self.max_size)
+
+        self.size += len(chunk)
+        self._md5.update(chunk)
+        self._sha256.update(chunk)
+        self._buffer += chunk
+
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._submit(part)
+
+    async def complete(self) -> StreamedObject:
+        """Досылает остаток и собирает объект; файл меньше части уходит одним PUT"""
+        if self.upload_id is None:
+            response = await run_s3(
+                self.client.put_object,
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.extra_args
+            )
+            self._buffer.clear()
+            return self._result(response['ETag'])
+
+        if self._buffer:
+            await self._submit(bytes(self._buffer))
+            self._buffer.clear()
+
+        await asyncio.gather(*self._tasks)
+        response = await run_s3(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': number, 'ETag': etag} for number, etag in sorted(self._etags.items())
+            ]}
+        )
+        return self._result(response['ETag'])
+
+    async def abort(self):
+        """Отменяет части в полете и multipart-загрузку, чтобы S3 не хранил обрывки"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._buffer.clear()
+
+        if self.upload_id is not None:
+            try:
+                await run_s3(
+                    self.client.abort_multipart_upload,
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+                )
+            except Exception as e:
+                logger.error(f"Failed to abort multipart upload {self.key}: {e}")
+
+    async def _submit(self, part: bytes):
+        if self.upload_id is None:
+            response = await run_s3(
+                self.client.create_multipart_upload,
+                Bucket=self.bucket, Key=self.key, **self.extra_args
+            )
+            self.upload_id = response['UploadId']
+
+        # Ожидание слота ограничивает память: читатель не обгоняет отправку
+        await self._slots.acquire()
+        for task in self._tasks:
+            if task.done() and task.exception() is not None:
+                self._slots.release()
+                raise task.exception()
+
+        number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._upload_part(number, part)))
+
+    async def _upload_part(self, number: int, part: bytes):
+        try:
+            response = await run_s3(
+                self.client.upload_part,
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=part
+            )
+            self._etags[number] = response['ETag']
+        finally:
+            self._slots.release()
+
+    def _result(self, etag: str) -> StreamedObject:
+        return StreamedObject(
+            bucket=self.bucket,
+            key=self.key,
+            size=self.size,
+            md5=self._md5.hexdigest(),
+            sha256=self._sha256.hexdigest(),
+            etag=etag.strip('"')
+        )
+
+
+async def stream_upload(
+    client,
+    bucket: str,
+    key: str,
+    chunks: AsyncIterator[bytes],
+    extra_args: Optional[Dict[str, Any]] = None,
+    max_size: Optional[int] = None,
+    part_size: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> StreamedObject:
+    """Загружает поток кусков в bucket/key; при любой ошибке загрузка отменяется"""
+    upload = MultipartUpload(
+        client, bucket, key,
+        extra_args=extra_args, max_size=max_size, part_size=part_size, concurrency=concurrency
+    )
+    try:
+        async for chunk in chunks:
+            await upload.write(chunk)
+        return await upload.complete()
+    except BaseException:
+        await upload.abort()
+        raise
@@ -7,13 +7,20 @@ import boto3
 import os
 import hashlib
 import mimetypes
-from typing import Optional, List, Dict, Any, BinaryIO
+from typing import Optional, List, Dict, Any, BinaryIO, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError, NoCredentialsError
 from botocore.config import Config
 import logging
+import uuid
 from io import BytesIO
 
+from app.core.config import settings
+from app.services.s3_async import AsyncS3Service
+from app.services.s3_multipart import StreamedObject, stream_upload
+from app.services.presigned_urls import PresignedUrlCache
+from app.services.storage_inventory import storage_inventory
+
 logger = logging.getLogger(__name__)
 
 class S3Service:
@@ -28,7 +35,10 @@ class S3Service:
         config = Config(
             region_name=self.region,
             retries={'max_attempts': 3, 'mode': 'adaptive'},
-            s3={'addressing_style': 'path'}
+            s3={'addressing_style': 'path'},
+            max_pool_connections=max(settings.S3_MAX_POOL_CONNECTIONS, settings.S3_EXECUTOR_WORKERS),
+            connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=settings.S3_READ_TIMEOUT_SECONDS
         )
         
         self.client = boto3.client(
@@ -44,12 +54,19 @@ class S3Service:
         self.covers_bucket = 'covers'
         self.playlists_bucket = 'playlists'
         self.temp_bucket = 'temp'
+        self.archive_bucket = 'archive'
+        self.buckets = [self.tracks_bucket, self.covers_bucket, self.playlists_bucket, self.temp_bucket, self.archive_bucket]
+        
+        self.url_cache = PresignedUrlCache(
+            ttl_ratio=settings.PRESIGNED_URL_CACHE_TTL_RATIO,
+            max_entries=settings.PRESIGNED_URL_CACHE_SIZE
+        )
         
         self._ensure_buckets_exist()
     
     def _ensure_buckets_exist(self):
         """Создает buckets если они не существуют"""
-        buckets = [self.tracks_bucket, self.covers_bucket, self.playlists_bucket, self.temp_bucket]
+        buckets = [self.tracks_bucket, self.covers_bucket, self.playlists_bucket, self.temp_bucket, self.archive_bucket]
         
         try:
             existing_buckets = [bucket['Name'] for bucket in self.client.list_buckets()['Buckets']]
@@ -114,6 +131,7 @@ class S3Service:
             
             response = self.client.head_object(Bucket=self.tracks_bucket, Key=s3_key)
             file_size = response['ContentLength']
+            storage_inventory.record(self.tracks_bucket, s3_key, file_size)
             
             logger.info(f"Track uploaded successfully: {s3_key}")
             
@@ -134,12 +152,102 @@ class S3Service:
                 'error': str(e)
             }
     
+    async def stage_stream(self, chunks: AsyncIterator[bytes], content_type: str,
+                           max_size: Optional[int] = None) -> StreamedObject:
+        """
+        Загружает поток во временный bucket под случайным ключом
+        
+        Хэши содержимого известны только после загрузки; постоянный ключ
+        назначает вызывающий код через promote_blob. Ошибки пробрасываются.
+        """
+        return await stream_upload(
+            self.client,
+            self.temp_bucket,
+            self.new_staging_key(),
+            chunks,
+            extra_args={'ContentType': content_type},
+            max_size=max_size
+        )
+    
+    def new_staging_key(self) -> str:
+        return f"staging/{datetime.now().strftime('%Y/%m/%d')}/{uuid.uuid4().hex}"
+    
+    def create_staging_upload(self, staging_key: str, content_type: str) -> str:
+        """Начинает multipart upload во временном bucket; возвращает UploadId"""
+        response = self.client.create_multipart_upload(
+            Bucket=self.temp_bucket, Key=staging_key, ContentType=content_type
+        )
+        return response['UploadId']
+    
+    def upload_staging_part(self, staging_key: str, upload_id: str, part_number: int, body: bytes) -> str:
+        """Загружает часть multipart upload; возвращает ETag части"""
+        response = self.client.upload_part(
+            Bucket=self.temp_bucket, Key=staging_key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        return response['ETag']
+    
+    def complete_staging_upload(self, staging_key: str, upload_id: str, parts: List[Dict]):
+        """Собирает объект из частей [{'PartNumber', 'ETag'}]"""
+        self.client.complete_multipart_upload(
+            Bucket=self.temp_bucket, Key=staging_key, UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    
+    def abort_staging_upload(self, staging_key: str, upload_id: str):
+        """Отменяет multipart upload; S3 удаляет уже загруженные части"""
+        self.client.abort_multipart_upload(Bucket=self.temp_bucket, Key=staging_key, UploadId=upload_id)
+    
+    def hash_temp_object(self, staging_key: str, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 объекта временного bucket, прочитанного потоком"""
+        body = self.client.get_object(Bucket=self.temp_bucket, Key=staging_key)['Body']
+        sha256 = hashlib.sha256()
+        try:
+            for chunk in iter(lambda: body.read(chunk_size), b""):
+                sha256.update(chunk)
+        finally:
+            body.close()
+        return sha256.hexdigest()
+    
+    def promote_blob(self, staging_key: str, sha256: str, content_type: str):
+        """Копирует загруженный файл из временного bucket в blobs/{sha256} на стороне S3"""
+        self.client.copy_object(
+            Bucket=self.tracks_bucket,
+            Key=f"blobs/{sha256}",
+            CopySource={'Bucket': self.temp_bucket, 'Key': staging_key},
+            ContentType=content_type,
+            Metadata={'sha256': sha256},
+            MetadataDirective='REPLACE',
+            ServerSideEncryption='AES256'
+        )
+        logger.info(f"Blob stored: {sha256}")
+    
+    def delete_temp_object(self, s3_key: str) -> bool:
+        """Удаляет объект из временного bucket"""
+        try:
+            self.client.delete_object(Bucket=self.temp_bucket, Key=s3_key)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting temp object {s3_key}: {e}")
+            return False
+    
+    def delete_blob(self, sha256: str) -> bool:
+        """Удаляет объект блоба; вызывается только сборщиком мусора"""
+        try:
+            self.client.delete_object(Bucket=self.tracks_bucket, Key=f"blobs/{sha256}")
+            self.url_cache.invalidate(self.tracks_bucket, f"blobs/{sha256}")
+            logger.info(f"Blob deleted: {sha256}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting blob {sha256}: {e}")
+            return False
+    
     def upload_cover(self, file_content: BinaryIO, filename: str, 
                     track_id: Optional[int] = None, album_id: Optional[int] = None) -> Dict[str, Any]:
         """Загружает обложку в S3"""
         try:
             timestamp = datetime.now().strftime('%Y/%m/%d')
             file_hash = hashlib.md5(file_content.read()).hexdigest()[:8]
+            file_size = file_content.tell()
             file_content.seek(0)
             
             
@@ -172,6 +280,7 @@ class S3Service:
                     'ACL': 'public-read'  
                 }
             )
+            storage_inventory.record(self.covers_bucket, s3_key, file_size)
             
             return {
                 'success': True,
@@ -187,18 +296,94 @@ class S3Service:
                 'error': str(e)
             }
     
-    def get_track_url(self, s3_key: str, expires_in: int = 3600) -> str:
-        """Генерирует presigned URL для трека"""
+    def upload_archive(self, file_content: BinaryIO, s3_key: str, size: int,
+                       metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Загружает архив (gzip CSV) и сверяет размер загруженного объекта
+
+        Args:
+            file_content: Содержимое файла, позиция в начале
+            s3_key: Ключ в bucket архивов
+            size: Ожидаемый размер в байтах
+            metadata: Дополнительные метаданные
+
+        Returns:
+            Dict с информацией о загруженном файле
+        """
         try:
-            url = self.client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.tracks_bucket, 'Key': s3_key},
-                ExpiresIn=expires_in
+            self.client.upload_fileobj(
+                file_content,
+                self.archive_bucket,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': 'text/csv',
+                    'ContentEncoding': 'gzip',
+                    'Metadata': {k: str(v) for k, v in (metadata or {}).items()}
+                }
             )
-            return url
+
+            response = self.client.head_object(Bucket=self.archive_bucket, Key=s3_key)
+            if response['ContentLength'] != size:
+                raise ValueError(f"Archive size mismatch: expected {size}, got {response['ContentLength']}")
+            storage_inventory.record(self.archive_bucket, s3_key, size)
+
+            logger.info(f"Archive uploaded: {s3_key}")
+            return {
+                'success': True,
+                'bucket': self.archive_bucket,
+                's3_key': s3_key,
+                'size': size
+            }
+
         except Exception as e:
-            logger.error(f"Error generating track URL: {e}")
-            return ""
+            logger.error(f"Error uploading archive: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def get_track_url(self, s3_key: str, expires_in: int = 3600) -> str:
+        """Генерирует presigned URL для трека"""
+        return self.get_track_urls([s3_key], expires_in).get(s3_key, "")
+    
+    def get_track_urls(self, s3_keys: List[str], expires_in: int = 3600) -> Dict[str, str]:
+        """Presigned URL для списка треков; подписываются только ключи, которых нет в кэше"""
+        urls, missing = self.url_cache.get_many(self.tracks_bucket, s3_keys, expires_in)
+        if missing:
+            signed = self.sign_track_urls(missing, expires_in)
+            self.url_cache.put_many(self.tracks_bucket, signed, expires_in)
+            urls.update(signed)
+        return urls
+    
+    def sign_track_urls(self, s3_keys: List[str], expires_in: int) -> Dict[str, str]:
+        """Подпись без кэша; ключи, которые не удалось подписать, пропускаются"""
+        urls = {}
+        for s3_key in s3_keys:
+            try:
+                urls[s3_key] = self.client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.tracks_bucket, 'Key': s3_key},
+                    ExpiresIn=expires_in
+                )
+            except Exception as e:
+                logger.error(f"Error generating track URL: {e}")
+        return urls
+    
+    def open_track_object(self, s3_key: str, byte_range: Optional[str] = None,
+                          if_match: Optional[str] = None, if_none_match: Optional[str] = None) -> Dict[str, Any]:
+        """
+        GetObject трека с необязательным Range и условиями; тело читается потоком из Body
+        
+        Ошибки (ClientError с кодами 304, 404, 412, 416) пробрасываются вызывающему коду
+        """
+        params = {'Bucket': self.tracks_bucket, 'Key': s3_key}
+        if byte_range:
+            params['Range'] = byte_range
+        if if_match:
+            params['IfMatch'] = if_match
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        return self.client.get_object(**params)
     
     def get_cover_url(self, s3_key: str) -> str:
         """Генерирует публичный URL для обложки"""
@@ -208,6 +393,7 @@ class S3Service:
         """Удаляет трек из S3"""
         try:
             self.client.delete_object(Bucket=self.tracks_bucket, Key=s3_key)
+            self.url_cache.invalidate(self.tracks_bucket, s3_key)
             logger.info(f"Track deleted: {s3_key}")
             return True
         except Exception as e:
@@ -238,27 +424,65 @@ class S3Service:
                 MaxKeys=limit
             )
             
-            tracks = []
-            for obj in response.get('Contents', []):
-                
-                metadata = self.get_track_metadata(obj['Key'])
-                if metadata:
-                    tracks.append({
-                        'key': obj['Key'],
-                        'size': obj['Size'],
-                        'last_modified': obj['LastModified'],
-                        'url': self.get_track_url(obj['Key']),
-                        'metadata': metadata.get('metadata', {})
-                    })
-            
-            return tracks
+            objects = response.get('Contents', [])
+            urls = self.get_track_urls([obj['Key'] for obj in objects])
+            
+            # Без head_object на каждый ключ: все нужное есть в ответе листинга
+            return [
+                {
+                    'key': obj['Key'],
+                    'size': obj['Size'],
+                    'last_modified': obj['LastModified'],
+                    'url': urls.get(obj['Key'], ""),
+                    'metadata': {'user-id': str(user_id)}
+                }
+                for obj in objects
+            ]
             
         except Exception as e:
             logger.error(f"Error listing user tracks: {e}")
             return []
     
+    def list_objects_page(self, bucket: str, prefix: str = "", continuation_token: Optional[str] = None,
+                          max_keys: int = 1000, start_after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Одна страница list_objects_v2 и токен следующей (None на последней странице)
+        start_after начинает листинг после ключа — для продолжения с сохраненной позиции
+        """
+        params = {'Bucket': bucket, 'Prefix': prefix, 'MaxKeys': max_keys}
+        if continuation_token:
+            params['ContinuationToken'] = continuation_token
+        elif start_after:
+            params['StartAfter'] = start_after
+        response = self.client.list_objects_v2(**params)
+        next_token = response.get('NextContinuationToken') if response.get('IsTruncated') else None
+        return response.get('Contents', []), next_token
+    
+    def delete_objects_batch(self, bucket: str, s3_keys: List[str]) -> List[str]:
+        """Удаляет до 1000 ключей одним запросом; возвращает ключи, которые удалить не удалось"""
+        response = self.client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in s3_keys], 'Quiet': True}
+        )
+        return [error['Key'] for error in response.get('Errors', [])]
+    
+    def list_top_level(self, bucket: str) -> Tuple[List[str], int, int]:
+        """Префиксы первого уровня bucket, число и объем объектов в его корне"""
+        prefixes = []
+        root_objects = root_bytes = 0
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Delimiter='/'):
+            prefixes.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+            contents = page.get('Contents', [])
+            root_objects += len(contents)
+            root_bytes += sum(obj['Size'] for obj in contents)
+        return prefixes, root_objects, root_bytes
+    
     def get_storage_stats(self) -> Dict[str, Any]:
-        """Возвращает статистику использования хранилища"""
+        """
+        Статистика по полному листингу всех bucket; медленно на больших bucket,
+        API отвечает из инвентаря (storage_inventory)
+        """
         try:
             stats = {
                 'buckets': {},
@@ -266,15 +490,16 @@ class S3Service:
                 'total_objects': 0
             }
             
-            buckets = [self.tracks_bucket, self.covers_bucket, self.playlists_bucket, self.temp_bucket]
-            
-            for bucket_name in buckets:
+            for bucket_name in self.buckets:
                 try:
-                    response = self.client.list_objects_v2(Bucket=bucket_name)
-                    objects = response.get('Contents', [])
-                    
-                    bucket_size = sum(obj['Size'] for obj in objects)
-                    bucket_count = len(objects)
+                    bucket_size = bucket_count = 0
+                    token = None
+                    while True:
+                        objects, token = self.list_objects_page(bucket_name, continuation_token=token)
+                        bucket_size += sum(obj['Size'] for obj in objects)
+                        bucket_count += len(objects)
+                        if token is None:
+                            break
                     
                     stats['buckets'][bucket_name] = {
                         'objects': bucket_count,
@@ -299,27 +524,30 @@ class S3Service:
             return {'error': str(e)}
     
     def cleanup_temp_files(self, older_than_hours: int = 24) -> int:
-        """Очищает временные файлы старше указанного времени"""
+        """
+        Очищает временные файлы старше указанного времени: весь bucket постранично,
+        удаление пачками по 1000 ключей. API использует параллельный вариант из temp_cleanup
+        """
         try:
             cutoff_time = datetime.now() - timedelta(hours=older_than_hours)
-            
-            response = self.client.list_objects_v2(Bucket=self.temp_bucket)
-            objects_to_delete = []
-            
-            for obj in response.get('Contents', []):
-                if obj['LastModified'].replace(tzinfo=None) < cutoff_time:
-                    objects_to_delete.append({'Key': obj['Key']})
-            
-            if objects_to_delete:
-                self.client.delete_objects(
-                    Bucket=self.temp_bucket,
-                    Delete={'Objects': objects_to_delete}
-                )
-                
-                logger.info(f"Cleaned up {len(objects_to_delete)} temp files")
-                return len(objects_to_delete)
-            
-            return 0
+            deleted = 0
+            token = None
+            
+            while True:
+                objects, token = self.list_objects_page(self.temp_bucket, continuation_token=token)
+                expired = [obj for obj in objects if obj['LastModified'].replace(tzinfo=None) < cutoff_time]
+                if expired:
+                    failed = set(self.delete_objects_batch(self.temp_bucket, [obj['Key'] for obj in expired]))
+                    for obj in expired:
+                        if obj['Key'] not in failed:
+                            storage_inventory.record(self.temp_bucket, obj['Key'], -obj['Size'], objects=-1)
+                            deleted += 1
+                if token is None:
+                    break
+            
+            if deleted:
+                logger.info(f"Cleaned up {deleted} temp files")
+            return deleted
             
         except Exception as e:
             logger.error(f"Error cleaning up temp files: {e}")
@@ -327,3 +555,4 @@ class S3Service:
 
 
 s3_service = S3Service()
+async_s3_service = AsyncS3Service(s3_service)
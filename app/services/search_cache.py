@@ -0,0 +1,225 @@
+"""
+Кэш ответов поиска
+Ключ — нормализованный запрос и параметры, значение — готовый ответ поиска.
+Записи помечаются сущностями из результата: переиндексация трека, артиста или альбома
+вытесняет все закэшированные ответы, в которых он встречался.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def normalize_query(query: str) -> str:
+    """Нормализация запроса для ключа: NFKC, casefold, схлопнутые пробелы"""
+    if not query:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def make_cache_key(namespace: str, params: Dict[str, Any]) -> str:
+    normalized = {
+        name: normalize_query(value) if isinstance(value, str) else value
+        for name, value in params.items()
+        if value is not None
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return f"search:{namespace}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def entity_tag(kind: str, entity_id: int) -> str:
+    return f"{kind}:{entity_id}"
+
+
+class MemorySearchCacheBackend:
+    """LRU в памяти процесса с TTL и обратным индексом сущность → ключи"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, cost_ms, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value, cost_ms
+
+    async def set(self, key: str, value: Any, cost_ms: float, ttl_seconds: float, tags: Iterable[str]):
+        self._drop(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl_seconds, value, cost_ms, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    async def invalidate(self, tag: str) -> int:
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    async def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisSearchCacheBackend:
+    """Общий для всех воркеров кэш в Redis; обратный индекс хранится в множествах"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        raw = await self.client.get(key)
+        if raw is None:
+            return None
+        envelope = json.loads(raw)
+        return envelope["v"], envelope["ms"]
+
+    async def set(self, key: str, value: Any, cost_ms: float, ttl_seconds: float, tags: Iterable[str]):
+        ttl = max(1, int(ttl_seconds))
+        payload = json.dumps({"ms": cost_ms, "v": value}, ensure_ascii=False, separators=(",", ":"))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(key, payload, ex=ttl)
+            for tag in tags:
+                tag_key = f"search:tag:{tag}"
+                pipe.sadd(tag_key, key)
+                pipe.expire(tag_key, ttl)
+            await pipe.execute()
+
+    async def invalidate(self, tag: str) -> int:
+        tag_key = f"search:tag:{tag}"
+        keys = await self.client.smembers(tag_key)
+        await self.client.delete(tag_key, *keys)
+        return len(keys)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match="search:*", count=1000):
+            await self.client.delete(key)
+
+
+class SearchCache:
+    """Кэш ответов SearchService с учетом попаданий и сэкономленного времени"""
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        model: Type[ModelT],
+        compute: Callable[[], Awaitable[ModelT]],
+        tags: Callable[[ModelT], Iterable[str]]
+    ) -> ModelT:
+        """Возвращает ответ из кэша или вычисляет и сохраняет его"""
+        key = make_cache_key(namespace, params)
+        started = time.perf_counter()
+
+        cached = None
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Search cache read failed: {e}")
+
+        if cached is not None:
+            value, cost_ms = cached
+            result = value if isinstance(value, model) else model.model_validate(value)
+            self.hits += 1
+            self.saved_ms += max(0.0, cost_ms - (time.perf_counter() - started) * 1000)
+            return result
+
+        self.misses += 1
+        computed_at = time.perf_counter()
+        result = await compute()
+        cost_ms = (time.perf_counter() - computed_at) * 1000
+
+        value = result if isinstance(self.backend, MemorySearchCacheBackend) else result.model_dump(mode="json")
+        try:
+            await self.backend.set(key, value, cost_ms, self.ttl_seconds, set(tags(result)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Search cache write failed: {e}")
+        return result
+
+    async def invalidate(self, kind: str, entity_id: int):
+        """Вытесняет ответы, содержащие сущность"""
+        try:
+            self.invalidations += await self.backend.invalidate(entity_tag(kind, entity_id))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Search cache invalidation failed for {kind}:{entity_id}: {e}")
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisSearchCacheBackend) else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.saved_ms, 1),
+            "invalidated_entries": self.invalidations,
+            "errors": self.errors
+        }
+
+
+def _create_backend():
+    if settings.SEARCH_CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+
+            client = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                db=settings.REDIS_DB,
+                decode_responses=True
+            )
+            return RedisSearchCacheBackend(client)
+        except ImportError:
+            logger.warning("redis package is not installed, using in-memory search cache")
+    return MemorySearchCacheBackend(max_entries=settings.SEARCH_CACHE_SIZE)
+
+
+search_cache = SearchCache(_create_backend(), ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS)
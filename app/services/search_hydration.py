@@ -0,0 +1,220 @@
+"""
+Гидратация результатов поиска из PostgreSQL
+Треки, артисты и альбомы, которых нет в кэше, загружаются параллельно: первая выборка идет
+в сессии запроса, остальные — на своих соединениях из пула
+"""
+
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple, Callable, Awaitable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Track, Artist, Album
+from app.db.database import read_session
+from app.services.track_projection import track_details_query, row_to_track_details
+from app.schemas.track import TrackWithDetails
+from app.schemas.artist import Artist as ArtistSchema
+from app.schemas.album import Album as AlbumSchema
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_tracks_with_details(db: AsyncSession, track_ids: List[int]) -> Dict[int, TrackWithDetails]:
+    """Загрузка треков с деталями об исполнителе, альбоме и жанре"""
+    if not track_ids:
+        return {}
+
+    query = track_details_query().where(Track.id.in_(track_ids))
+    result = await db.execute(query)
+
+    tracks = {}
+    for row in result.all():
+        track = row_to_track_details(row)
+        tracks[track.id] = track
+    return tracks
+
+
+async def fetch_artists(db: AsyncSession, artist_ids: List[int]) -> Dict[int, ArtistSchema]:
+    """Загрузка артистов по списку ID"""
+    if not artist_ids:
+        return {}
+
+    result = await db.execute(select(Artist).where(Artist.id.in_(artist_ids)))
+    return {artist.id: ArtistSchema.model_validate(artist) for artist in result.scalars().all()}
+
+
+async def fetch_albums(db: AsyncSession, album_ids: List[int]) -> Dict[int, AlbumSchema]:
+    """Загрузка альбомов по списку ID"""
+    if not album_ids:
+        return {}
+
+    query = (
+        select(Album, Artist.name.label("artist_name"))
+        .outerjoin(Artist, Album.artist_id == Artist.id)
+        .where(Album.id.in_(album_ids))
+    )
+    result = await db.execute(query)
+
+    albums = {}
+    for album, artist_name in result.all():
+        albums[album.id] = AlbumSchema(**album.__dict__, artist_name=artist_name)
+    return albums
+
+
+# Сущности, чьи поля денормализованы в закэшированную запись (имя артиста, название альбома, жанр)
+DEPENDENCIES: Dict[str, Callable[[Any], Iterable[Tuple[str, Optional[int]]]]] = {
+    "track": lambda track: [("artist", track.artist_id), ("album", track.album_id), ("genre", track.genre_id)],
+    "album": lambda album: [("artist", album.artist_id)],
+}
+
+
+class HydrationCache:
+    """
+    Общий LRU-кэш id → сущность для всех выборок гидратации.
+    Изменение артиста, альбома или жанра вытесняет и записи, в которые скопированы их поля
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Any, Tuple[Tuple[str, int], ...]]]" = OrderedDict()
+        # (тип, id) → ключи записей, которые от него зависят
+        self._dependents: Dict[Tuple[str, int], Set[Tuple[str, int]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, kind: str, ids: List[int]) -> Tuple[Dict[int, Any], List[int]]:
+        """Возвращает найденные сущности и список ID, которых нет в кэше"""
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        for entity_id in dict.fromkeys(ids):
+            key = (kind, entity_id)
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                found[entity_id] = entry[1]
+                self.hits += 1
+            else:
+                if entry:
+                    self._remove(key)
+                missing.append(entity_id)
+                self.misses += 1
+
+        return found, missing
+
+    def put_many(self, kind: str, entities: Dict[int, Any]):
+        """Сохраняет сущности в кэш"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        dependencies = DEPENDENCIES.get(kind)
+        for entity_id, entity in entities.items():
+            key = (kind, entity_id)
+            self._remove(key)
+            depends_on = tuple(
+                dependency for dependency in (dependencies(entity) if dependencies else ())
+                if dependency[1] is not None
+            )
+            self._entries[key] = (expires_at, entity, depends_on)
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, kind: str, entity_id: int):
+        """Удаляет сущность и зависящие от нее записи из кэша после изменения"""
+        key = (kind, entity_id)
+        self._remove(key)
+        for dependent in self._dependents.pop(key, set()):
+            self._remove(dependent)
+
+    def clear(self):
+        self._entries.clear()
+        self._dependents.clear()
+
+    def _remove(self, key: Tuple[str, int]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dependency in entry[2]:
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
+
+
+class SearchHydrator:
+    """Параллельная гидратация результатов поиска"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = read_session,
+        cache: Optional[HydrationCache] = None
+    ):
+        self.session_factory = session_factory
+        self.cache = cache or HydrationCache(
+            ttl_seconds=settings.SEARCH_HYDRATION_CACHE_TTL_SECONDS,
+            max_entries=settings.SEARCH_HYDRATION_CACHE_SIZE
+        )
+
+    async def hydrate(
+        self,
+        track_ids: List[int],
+        artist_ids: List[int],
+        album_ids: List[int],
+        db: Optional[AsyncSession] = None
+    ) -> Tuple[List[TrackWithDetails], List[ArtistSchema], List[AlbumSchema]]:
+        """
+        Загружает недостающие в кэше сущности одновременно, сохраняя порядок ID из поиска.
+        Сессия запроса db, если передана, используется для первой выборки вместо новой
+        """
+        requested = [
+            ("track", track_ids, fetch_tracks_with_details),
+            ("artist", artist_ids, fetch_artists),
+            ("album", album_ids, fetch_albums)
+        ]
+        found = {}
+        loads = []
+        for kind, ids, fetcher in requested:
+            found[kind], missing = self.cache.get_many(kind, ids)
+            if missing:
+                loads.append((kind, missing, fetcher))
+
+        loaded = await asyncio.gather(*(
+            self._fetch(kind, missing, fetcher, db if position == 0 else None)
+            for position, (kind, missing, fetcher) in enumerate(loads)
+        ))
+        for (kind, _, _), entities in zip(loads, loaded):
+            found[kind].update(entities)
+
+        tracks, artists, albums = (
+            [found[kind][entity_id] for entity_id in ids if entity_id in found[kind]]
+            for kind, ids, _ in requested
+        )
+        return tracks, artists, albums
+
+    async def _fetch(
+        self,
+        kind: str,
+        ids: List[int],
+        fetcher: Callable[[AsyncSession, List[int]], Awaitable[Dict[int, Any]]],
+        session: Optional[AsyncSession] = None
+    ) -> Dict[int, Any]:
+        if session is not None:
+            loaded = await fetcher(session, ids)
+        else:
+            # Отдельная сессия — отдельное соединение из пула, поэтому выборки идут параллельно
+            async with self.session_factory() as session:
+                loaded = await fetcher(session, ids)
+        self.cache.put_many(kind, loaded)
+        return loaded
+
+
+search_hydrator = SearchHydrator()
@@ -1,18 +1,77 @@
 from typing import List, Optional, Dict, Any, Union
 from elasticsearch import AsyncElasticsearch
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, or_, and_, func, literal, literal_column, tuple_, Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+import json
 import logging
+import re
 
 from app.db.models import Track, Artist, Album, Genre
 from app.schemas.track import TrackWithDetails, TrackSearchQuery, TrackSearchResponse
 from app.schemas.artist import Artist as ArtistSchema
 from app.schemas.album import Album as AlbumSchema
+from app.schemas.search import MultiSearchResult
 from app.core.config import settings
+from app.services.search_hydration import (
+    search_hydrator,
+    fetch_tracks_with_details,
+    fetch_artists,
+    fetch_albums
+)
+from app.services.suggest_index import suggest_index
+from app.services.track_projection import track_details_query, rows_to_track_details, with_track_joins
+from app.services.search_cache import search_cache
+from app.core.pagination import check_cursor_key, encode_cursor, decode_cursor
 
 logger = logging.getLogger(__name__)
 
 
+class ExplainJson(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) запроса; параметры запроса передаются связанными, а не подставляются в текст"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainJson)
+def _compile_explain_json(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+_TSQUERY_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _prefix_tsquery(text: str):
+    """tsquery с префиксным совпадением по каждому слову: 'queen bohem' -> queen:* & bohem:*"""
+    tokens = _TSQUERY_TOKEN.findall(text.lower())
+    if not tokens:
+        return None
+    return func.to_tsquery(literal_column("'simple'"), " & ".join(f"{token}:*" for token in tokens))
+
+
+def _track_tags(track: TrackWithDetails) -> List[str]:
+    tags = [f"track:{track.id}", f"artist:{track.artist_id}"]
+    if track.album_id:
+        tags.append(f"album:{track.album_id}")
+    return tags
+
+
+def _track_response_tags(response: TrackSearchResponse) -> List[str]:
+    return [tag for track in response.tracks for tag in _track_tags(track)]
+
+
+def _multi_result_tags(result: MultiSearchResult) -> List[str]:
+    tags = [tag for track in result.tracks for tag in _track_tags(track)]
+    tags.extend(f"artist:{artist.id}" for artist in result.artists)
+    for album in result.albums:
+        tags.append(f"album:{album.id}")
+        tags.append(f"artist:{album.artist_id}")
+    return tags
+
+
 class SearchService:
     """Сервис для полнотекстового поиска с использованием Elasticsearch"""
     
@@ -36,6 +95,9 @@ class SearchService:
     
     async def index_track(self, track: Track, artist_name: str = None, album_title: str = None, genre_name: str = None):
         """Индексация трека в Elasticsearch"""
+        search_hydrator.cache.invalidate("track", track.id)
+        await search_cache.invalidate("track", track.id)
+        suggest_index.add_track(track.id, track.title, artist_name, track.popularity or 0)
         if not self.es:
             return  
         
@@ -69,6 +131,9 @@ class SearchService:
     
     async def index_artist(self, artist: Artist):
         """Индексация артиста в Elasticsearch"""
+        search_hydrator.cache.invalidate("artist", artist.id)
+        await search_cache.invalidate("artist", artist.id)
+        suggest_index.add_artist(artist.id, artist.name)
         if not self.es:
             return  # Заглушка
 
@@ -92,6 +157,8 @@ class SearchService:
 
     async def index_album(self, album: Album, artist_name: str = None):
         """Индексация альбома в Elasticsearch"""
+        search_hydrator.cache.invalidate("album", album.id)
+        await search_cache.invalidate("album", album.id)
         if not self.es:
             return  
 
@@ -116,6 +183,9 @@ class SearchService:
 
     async def delete_entity(self, index: str, entity_id: int):
         """Удаление сущности из Elasticsearch по ID и индексу"""
+        search_hydrator.cache.invalidate(index.rstrip("s"), entity_id)
+        await search_cache.invalidate(index.rstrip("s"), entity_id)
+        suggest_index.remove(index.rstrip("s"), entity_id)
         if not self.es:
             return  
 
@@ -134,6 +204,25 @@ class SearchService:
         if not self.es:
             return {"tracks": [], "artists": [], "albums": []}
 
+        try:
+            result = await search_cache.get_or_compute(
+                "multi",
+                {"query": query, "limit": limit},
+                MultiSearchResult,
+                lambda: self._multi_entity_search(query, limit),
+                _multi_result_tags
+            )
+        except Exception as e:
+            print(f"Elasticsearch multi-entity search error: {e}")
+            return {"tracks": [], "artists": [], "albums": []}
+
+        return {
+            "tracks": result.tracks,
+            "artists": result.artists,
+            "albums": result.albums
+        }
+
+    async def _multi_entity_search(self, query: str, limit: int) -> MultiSearchResult:
         search_requests = []
 
         track_query = {
@@ -175,77 +264,31 @@ class SearchService:
         search_requests.append({"index": "albums"}) 
         search_requests.append(album_query)
 
-        try:
-            responses = await self.es.msearch(body=search_requests)
-            print(f"Elasticsearch msearch raw response: {responses}") 
-            
-            tracks_data = []
-            artists_data = []
-            albums_data = []
-
-            if responses and responses.get("responses"):
-                track_hits = responses["responses"][0]["hits"]["hits"]
-                print(f"Track hits from Elasticsearch: {track_hits}") 
-                track_ids = [hit["_source"]["id"] for hit in track_hits]
-                print(f"Extracted track IDs: {track_ids}") 
-                tracks_data = await self._get_tracks_with_details(track_ids)
-
-                artist_hits = responses["responses"][1]["hits"]["hits"]
-                print(f"Artist hits from Elasticsearch: {artist_hits}") 
-                artist_ids = [hit["_source"]["id"] for hit in artist_hits]
-                print(f"Extracted artist IDs: {artist_ids}") 
-                artists_data = await self._get_artists_by_ids(artist_ids)
-
-                album_hits = responses["responses"][2]["hits"]["hits"]
-                print(f"Album hits from Elasticsearch: {album_hits}") 
-                album_ids = [hit["_source"]["id"] for hit in album_hits]
-                print(f"Extracted album IDs: {album_ids}") 
-                albums_data = await self._get_albums_by_ids(album_ids)
-
-            return {
-                "tracks": tracks_data,
-                "artists": artists_data,
-                "albums": albums_data
-            }
+        responses = await self.es.msearch(body=search_requests)
 
-        except Exception as e:
-            print(f"Elasticsearch multi-entity search error: {e}")
-            return {"tracks": [], "artists": [], "albums": []}
+        tracks_data = []
+        artists_data = []
+        albums_data = []
+
+        if responses and responses.get("responses"):
+            track_ids = [hit["_source"]["id"] for hit in responses["responses"][0]["hits"]["hits"]]
+            artist_ids = [hit["_source"]["id"] for hit in responses["responses"][1]["hits"]["hits"]]
+            album_ids = [hit["_source"]["id"] for hit in responses["responses"][2]["hits"]["hits"]]
+
+            tracks_data, artists_data, albums_data = await search_hydrator.hydrate(
+                track_ids, artist_ids, album_ids, db=self.db
+            )
+
+        return MultiSearchResult(tracks=tracks_data, artists=artists_data, albums=albums_data)
 
     async def _get_artists_by_ids(self, artist_ids: List[int]) -> List[ArtistSchema]:
         """Получение артистов по списку ID"""
-        if not artist_ids:
-            return []
-        
-        query = select(Artist).where(Artist.id.in_(artist_ids))
-        result = await self.db.execute(query)
-        artists_db = result.scalars().all()
-        
-        artist_dict = {artist.id: ArtistSchema.model_validate(artist) for artist in artists_db}
+        artist_dict = await fetch_artists(self.db, artist_ids)
         return [artist_dict[artist_id] for artist_id in artist_ids if artist_id in artist_dict]
 
     async def _get_albums_by_ids(self, album_ids: List[int]) -> List[AlbumSchema]:
         """Получение альбомов по списку ID"""
-        if not album_ids:
-            return []
-        
-        query = (
-            select(Album, Artist.name.label("artist_name"))
-            .outerjoin(Artist, Album.artist_id == Artist.id)
-            .where(Album.id.in_(album_ids))
-        )
-        result = await self.db.execute(query)
-        rows = result.all()
-        
-        album_dict = {}
-        for row in rows:
-            album, artist_name = row
-            album_with_details = AlbumSchema(
-                **album.__dict__,
-                artist_name=artist_name 
-            )
-            album_dict[album.id] = album_with_details
-
+        album_dict = await fetch_albums(self.db, album_ids)
         return [album_dict[album_id] for album_id in album_ids if album_id in album_dict]
 
     async def create_elasticsearch_mapping(self):
@@ -463,62 +506,101 @@ class SearchService:
                 range_filter["range"]["duration_ms"]["lte"] = search_query.duration_to
             query["bool"]["filter"].append(range_filter)
         
+        # Первая страница идет в индекс без PIT. PIT открывается, только если есть следующая
+        # страница: курсор продолжает ее с from, а дальше по search_after
+        pit_id = None
+        search_after = None
+        start = search_query.offset
+        if search_query.cursor:
+            state = decode_cursor(search_query.cursor)
+            if state.get("src") != "es":
+                raise ValueError("Pagination cursor does not match search backend")
+            pit_id = state.get("pit")
+            search_after = state.get("after")
+            start = state.get("from", 0)
+            if not isinstance(pit_id, str) or not isinstance(search_after, (list, type(None))) \
+                    or not isinstance(start, int) or isinstance(start, bool) or start < 0:
+                raise ValueError("Invalid pagination cursor")
+        
         try:
-            response = await self.es.search(
-                index="tracks",
-                query=query,
-                from_=search_query.offset,
-                size=search_query.limit,
-                sort=[
-                    {"_score": {"order": "desc"}},  
-                    {"popularity": {"order": "desc"}}  
+            params = {
+                "query": query,
+                "size": search_query.limit,
+                "sort": [
+                    {"_score": {"order": "desc"}},
+                    {"popularity": {"order": "desc", "missing": "_last"}}
                 ]
-            )
-            
-            track_ids = [hit["_source"]["id"] for hit in response["hits"]["hits"]]
-            tracks = await self._get_tracks_with_details(track_ids)
-            
-            return TrackSearchResponse(
-                tracks=tracks,
-                total=response["hits"]["total"]["value"],
-                limit=search_query.limit,
-                offset=search_query.offset
-            )
+            }
+            if pit_id is not None:
+                # С PIT индекс не указывается, ES сам добавляет tiebreaker _shard_doc в sort
+                params["pit"] = {"id": pit_id, "keep_alive": settings.SEARCH_PIT_KEEP_ALIVE}
+            else:
+                params["index"] = "tracks"
+            if search_after:
+                params["search_after"] = search_after
+            elif start:
+                params["from_"] = start
             
+            response = await self.es.search(**params)
         except Exception as e:
+            if search_query.cursor:
+                # Курсор привязан к PIT в Elasticsearch, продолжить его в PostgreSQL нельзя
+                logger.warning(f"Elasticsearch cursor search error: {e}")
+                raise ValueError("Pagination cursor expired")
             print(f"Elasticsearch search error: {e}")
             # Fallback к поиску через PostgreSQL
             return await self.search_tracks_fallback(search_query)
+        
+        hits = response["hits"]["hits"]
+        total = response["hits"]["total"]
+        
+        next_cursor = None
+        if pit_id is not None:
+            pit_id = response.get("pit_id", pit_id)
+            if len(hits) == search_query.limit:
+                next_cursor = encode_cursor({"src": "es", "pit": pit_id, "after": hits[-1]["sort"]})
+        elif len(hits) == search_query.limit and (
+            total["value"] > start + len(hits) or total.get("relation") == "gte"
+        ):
+            # PIT из курсора может быть общим для клиентов (первая страница кэшируется),
+            # поэтому он не закрывается, а истекает сам по keep_alive
+            try:
+                pit = await self.es.open_point_in_time(index="tracks", keep_alive=settings.SEARCH_PIT_KEEP_ALIVE)
+                next_cursor = encode_cursor({"src": "es", "pit": pit["id"], "from": start + len(hits)})
+            except Exception as e:
+                logger.warning(f"Failed to open point in time: {e}")
+        
+        track_ids = [hit["_source"]["id"] for hit in hits]
+        tracks = await self._get_tracks_with_details(track_ids)
+        
+        return TrackSearchResponse(
+            tracks=tracks,
+            total=total["value"],
+            limit=search_query.limit,
+            offset=search_query.offset,
+            next_cursor=next_cursor
+        )
     
     async def search_tracks_fallback(self, search_query: TrackSearchQuery) -> TrackSearchResponse:
-        """Fallback поиск через PostgreSQL"""
-        base_query = (
-            select(
-                Track,
-                Artist.name.label("artist_name"),
-                Artist.image_url.label("artist_image_url"),
-                Album.title.label("album_title"),
-                Album.cover_image_url.label("album_cover_url"),
-                Genre.name.label("genre_name")
-            )
-            .outerjoin(Artist, Track.artist_id == Artist.id)
-            .outerjoin(Album, Track.album_id == Album.id)
-            .outerjoin(Genre, Track.genre_id == Genre.id)
-        )
-        
+        """Fallback поиск через PostgreSQL: полнотекстовый индекс + триграммы"""
         conditions = []
+        rank = literal(0.0)
         
         if search_query.query:
-            search_term = f"%{search_query.query}%"
-            conditions.append(
-                or_(
-                    Track.title.ilike(search_term),
-                    Artist.name.ilike(search_term),
-                    Album.title.ilike(search_term),
-                    Genre.name.ilike(search_term)
+            ts_query = _prefix_tsquery(search_query.query)
+            if ts_query is not None:
+                conditions.append(
+                    or_(
+                        Track.search_vector.op("@@")(ts_query),
+                        Track.title.op("%")(search_query.query)
+                    )
                 )
-            )
+                rank = func.ts_rank(Track.search_vector, ts_query) + func.similarity(Track.title, search_query.query)
+            else:
+                conditions.append(Track.title.op("%")(search_query.query))
+                rank = func.similarity(Track.title, search_query.query)
         
+        # ILIKE '%x%' обслуживается GIN-индексами gin_trgm_ops
         if search_query.artist:
             conditions.append(Artist.name.ilike(f"%{search_query.artist}%"))
         
@@ -534,86 +616,88 @@ class SearchService:
         if search_query.duration_to:
             conditions.append(Track.duration_ms <= search_query.duration_to)
         
-        if conditions:
-            base_query = base_query.where(and_(*conditions))
+        popularity = func.coalesce(Track.popularity, 0)
         
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(
-            base_query.subquery()
-        )
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
+        query = track_details_query(rank.label("search_rank"))
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        # Keyset-пагинация по (rank, popularity, id): страница 500 стоит как первая
+        if search_query.cursor:
+            state = decode_cursor(search_query.cursor)
+            after = state.get("after")
+            if state.get("src") != "pg" or not isinstance(after, list) or len(after) != 3:
+                raise ValueError("Pagination cursor does not match search backend")
+            check_cursor_key(after, [Float(), popularity.type, Track.id.type])
+            query = query.where(tuple_(rank, popularity, Track.id) < tuple_(*after))
+        else:
+            query = query.offset(search_query.offset)
         
         query = (
-            base_query
-            .order_by(Track.popularity.desc())  
-            .offset(search_query.offset)
-            .limit(search_query.limit)
+            query
+            .order_by(rank.desc(), popularity.desc(), Track.id.desc())
+            .limit(search_query.limit + 1)
         )
         
         result = await self.db.execute(query)
         rows = result.all()
         
-        tracks = []
-        for row in rows:
-            track = row[0]
-            track_with_details = TrackWithDetails(
-                **track.__dict__,
-                artist_name=row.artist_name,
-                artist_image_url=row.artist_image_url,
-                album_title=row.album_title,
-                album_cover_url=row.album_cover_url,
-                genre_name=row.genre_name
-            )
-            tracks.append(track_with_details)
+        next_cursor = None
+        if len(rows) > search_query.limit:
+            rows = rows[:search_query.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor({
+                "src": "pg",
+                "after": [float(last.search_rank), last.popularity, last.id]
+            })
+        
+        tracks = rows_to_track_details(rows)
+        
+        total, is_estimate = await self._count_tracks(conditions)
         
         return TrackSearchResponse(
             tracks=tracks,
             total=total,
+            total_is_estimate=is_estimate,
             limit=search_query.limit,
-            offset=search_query.offset
+            offset=search_query.offset,
+            next_cursor=next_cursor
         )
     
-    async def _get_tracks_with_details(self, track_ids: List[int]) -> List[TrackWithDetails]:
-        """Получение треков с деталями по списку ID"""
-        if not track_ids:
-            return []
-        
-        query = (
-            select(
-                Track,
-                Artist.name.label("artist_name"),
-                Artist.image_url.label("artist_image_url"),
-                Album.title.label("album_title"),
-                Album.cover_image_url.label("album_cover_url"),
-                Genre.name.label("genre_name")
-            )
-            .outerjoin(Artist, Track.artist_id == Artist.id)
-            .outerjoin(Album, Track.album_id == Album.id)
-            .outerjoin(Genre, Track.genre_id == Genre.id)
-            .where(Track.id.in_(track_ids))
-        )
+    async def _count_tracks(self, conditions: list) -> tuple[int, bool]:
+        """Точный подсчет до SEARCH_FALLBACK_COUNT_CAP, дальше — оценка планировщика"""
+        cap = settings.SEARCH_FALLBACK_COUNT_CAP
         
-        result = await self.db.execute(query)
-        rows = result.all()
+        matching = with_track_joins(select(Track.id))
+        if conditions:
+            matching = matching.where(and_(*conditions))
         
-        track_dict = {}
-        for row in rows:
-            track = row[0]
-            track_with_details = TrackWithDetails(
-                **track.__dict__,
-                artist_name=row.artist_name,
-                artist_image_url=row.artist_image_url,
-                album_title=row.album_title,
-                album_cover_url=row.album_cover_url,
-                genre_name=row.genre_name
-            )
-            track_dict[track.id] = track_with_details
+        capped = select(func.count()).select_from(matching.limit(cap + 1).subquery())
+        total = (await self.db.execute(capped)).scalar() or 0
+        if total <= cap:
+            return total, False
         
+        try:
+            connection = await self.db.connection()
+            result = await connection.execute(ExplainJson(matching))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return max(int(plan[0]["Plan"]["Plan Rows"]), total), True
+        except Exception as e:
+            logger.warning(f"Failed to estimate search result count: {e}")
+            return total, True
+    
+    async def _get_tracks_with_details(self, track_ids: List[int]) -> List[TrackWithDetails]:
+        """Получение треков с деталями по списку ID"""
+        track_dict = await fetch_tracks_with_details(self.db, track_ids)
         return [track_dict[track_id] for track_id in track_ids if track_id in track_dict]
     
     async def suggest_tracks(self, query: str, limit: int = 5) -> List[str]:
         """Автодополнение для поиска треков"""
+        if suggest_index.ready:
+            return [entry.text for entry in suggest_index.suggest(query, limit=limit, kind="track")]
+
         if not self.es:
             return await self._suggest_tracks_fallback(query, limit)
         
@@ -665,7 +749,8 @@ class SearchService:
         return [f"{row.title} - {row.artist_name}" for row in rows]
     
     async def search_tracks(self, query: str, genre: str = None, year: int = None, 
-                           artist: str = None, album: str = None, limit: int = 10, offset: int = 0) -> TrackSearchResponse:
+                           artist: str = None, album: str = None, limit: int = 10, offset: int = 0,
+                           cursor: Optional[str] = None) -> TrackSearchResponse:
         """Поиск треков с простыми параметрами (для совместимости с API endpoint)"""
         from app.schemas.track import TrackSearchQuery
         
@@ -675,12 +760,23 @@ class SearchService:
             artist=artist,
             album=album,
             limit=limit,
-            offset=offset 
+            offset=offset,
+            cursor=cursor
         )
         
-        if self.es:
-            result = await self.search_tracks_elasticsearch(search_query)
-        else:
-            result = await self.search_tracks_fallback(search_query)
+        # Страницы по курсору привязаны к PIT/keyset конкретного клиента и не кэшируются
+        if cursor:
+            return await self._search_tracks(search_query)
         
-        return result 
+        return await search_cache.get_or_compute(
+            "tracks",
+            search_query.model_dump(),
+            TrackSearchResponse,
+            lambda: self._search_tracks(search_query),
+            _track_response_tags
+        )
+    
+    async def _search_tracks(self, search_query: TrackSearchQuery) -> TrackSearchResponse:
+        if self.es:
+            return await self.search_tracks_elasticsearch(search_query)
+        return await self.search_tracks_fallback(search_query)
@@ -0,0 +1,332 @@
+"""
+Инвентаризация хранилища
+Число объектов и объем по каждому префиксу верхнего уровня (blobs/, users/, tracks/ ...)
+хранятся в таблице storage_inventory. Загрузки и удаления учитываются приращениями в памяти
+процесса (как счетчики прослушиваний), фоновая задача сбрасывает их в PostgreSQL.
+Периодическая полная сверка листает bucket параллельно по префиксам и перезаписывает
+абсолютные значения, исправляя расхождения. Временные объекты загрузок в bucket temp
+приращениями не учитываются: они живут секунды, их остатки видны после сверки.
+
+Сверка записывает в scanned_at момент начала листинга. Приращение помнит время первого
+вошедшего в него события; приращения, начатые до scanned_at, при сбросе пропускаются —
+листинг их уже учел, в том числе накопленные в других воркерах. Объекты, загруженные
+во время листинга, могут попасть и в листинг, и в приращение; это исправит следующая сверка.
+"""
+
+import asyncio
+import logging
+import string
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, literal, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import StorageInventoryEntry
+
+logger = logging.getLogger(__name__)
+
+RESCAN_LOCK_KEY = 0x696E_7631
+# Префиксы с ключами вида {prefix}{sha256}: листинг делится на 16 частей по первому символу хэша
+HASHED_PREFIXES = {"blobs/"}
+
+
+def inventory_prefix(s3_key: str) -> str:
+    """Префикс верхнего уровня ключа; для ключей без "/" — пустая строка"""
+    head, sep, _ = s3_key.partition("/")
+    return f"{head}/" if sep else ""
+
+
+def _listing_shards(prefixes: List[str]) -> List[Tuple[str, str]]:
+    """(префикс инвентаря, префикс листинга) для параллельного обхода"""
+    shards = []
+    for prefix in prefixes:
+        if prefix in HASHED_PREFIXES:
+            shards.extend((prefix, f"{prefix}{char}") for char in string.hexdigits[:16])
+        else:
+            shards.append((prefix, prefix))
+    return shards
+
+
+def _size_mb(size: int) -> float:
+    return round(size / (1024 * 1024), 2)
+
+
+def _default_storage():
+    # S3Service сам вызывает хуки инвентаря, поэтому импорт отложен до первого использования
+    from app.services.s3_service import async_s3_service
+    return async_s3_service
+
+
+class StorageInventory:
+    """Приращения инвентаря в памяти процесса, их запись и полная сверка"""
+
+    def __init__(self):
+        # Хуки вызываются и из потоков пула s3
+        self._lock = threading.Lock()
+        self._deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+        # Время первого события в каждом приращении
+        self._since: Dict[Tuple[str, str], datetime] = {}
+        self.flush_errors = 0
+        self.last_flush_at: Optional[float] = None
+
+    def record(self, bucket: str, s3_key: str, size: int, objects: int = 1):
+        """Учитывает загрузку (objects=1) или удаление (objects=-1, size отрицательный)"""
+        key = (bucket, inventory_prefix(s3_key))
+        with self._lock:
+            delta = self._deltas[key]
+            delta[0] += objects
+            delta[1] += size
+            self._since.setdefault(key, datetime.utcnow())
+
+    def pending(self) -> int:
+        return len(self._deltas)
+
+    def _drain(self) -> Tuple[Dict[Tuple[str, str], List[int]], Dict[Tuple[str, str], datetime]]:
+        with self._lock:
+            drained, self._deltas = self._deltas, defaultdict(lambda: [0, 0])
+            since, self._since = self._since, {}
+        return drained, since
+
+    def _restore(self, drained: Dict[Tuple[str, str], List[int]], since: Dict[Tuple[str, str], datetime]):
+        with self._lock:
+            for key, (objects, size) in drained.items():
+                delta = self._deltas[key]
+                delta[0] += objects
+                delta[1] += size
+                if key in since:
+                    self._since[key] = min(since[key], self._since.get(key, since[key]))
+
+    async def flush(self, session: AsyncSession) -> int:
+        """
+        Прибавляет накопленные приращения к строкам; при ошибке они возвращаются в очередь.
+        Приращение, начатое раньше последней сверки строки, уже учтено листингом и пропускается
+        """
+        drained, since = self._drain()
+        if not any(objects or size for objects, size in drained.values()):
+            return 0
+
+        now = datetime.utcnow()
+        try:
+            # Строка корня bucket есть после каждой сверки: ее scanned_at отсекает и приращения
+            # префиксов, строки которых сверка удалила
+            bucket_scans = dict((await session.execute(
+                select(StorageInventoryEntry.bucket, StorageInventoryEntry.scanned_at)
+                .where(StorageInventoryEntry.prefix == "")
+            )).all())
+            # В updated_at вставляемой строки передается начало приращения, для сравнения со scanned_at
+            rows = []
+            for (bucket, prefix), (objects, size) in sorted(drained.items()):
+                started = since.get((bucket, prefix), now)
+                scanned_at = bucket_scans.get(bucket)
+                if (objects or size) and (scanned_at is None or scanned_at <= started):
+                    rows.append({'bucket': bucket, 'prefix': prefix, 'object_count': objects,
+                                 'total_bytes': size, 'updated_at': started})
+            if not rows:
+                await session.commit()
+                return 0
+
+            statement = pg_insert(StorageInventoryEntry).values(rows)
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[StorageInventoryEntry.bucket, StorageInventoryEntry.prefix],
+                    set_={
+                        'object_count': StorageInventoryEntry.object_count + statement.excluded.object_count,
+                        'total_bytes': StorageInventoryEntry.total_bytes + statement.excluded.total_bytes,
+                        'updated_at': literal(now)
+                    },
+                    where=or_(
+                        StorageInventoryEntry.scanned_at.is_(None),
+                        StorageInventoryEntry.scanned_at <= statement.excluded.updated_at
+                    )
+                )
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            self._restore(drained, since)
+            self.flush_errors += 1
+            raise
+
+        self.last_flush_at = time.time()
+        return len(rows)
+
+    async def scan_bucket(self, bucket: str, storage=None) -> Dict[str, Tuple[int, int]]:
+        """Полный листинг bucket: префиксы обходятся параллельно, каждый постранично"""
+        storage = storage or _default_storage()
+        prefixes, root_objects, root_bytes = await storage.list_top_level(bucket)
+        # Строка корня есть всегда: по ее scanned_at видно, что пустой bucket тоже сверен
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        totals[""] = [root_objects, root_bytes]
+
+        semaphore = asyncio.Semaphore(settings.STORAGE_INVENTORY_CONCURRENCY)
+
+        async def scan(inventory_key: str, listing_prefix: str):
+            objects = size = 0
+            token = None
+            async with semaphore:
+                while True:
+                    page, token = await storage.list_objects_page(bucket, listing_prefix, token)
+                    objects += len(page)
+                    size += sum(obj['Size'] for obj in page)
+                    if token is None:
+                        break
+            return inventory_key, objects, size
+
+        for inventory_key, objects, size in await asyncio.gather(
+            *(scan(*shard) for shard in _listing_shards(prefixes))
+        ):
+            totals[inventory_key][0] += objects
+            totals[inventory_key][1] += size
+
+        return {prefix: (objects, size) for prefix, (objects, size) in totals.items()}
+
+    async def rescan(self, session: AsyncSession, buckets: Optional[List[str]] = None,
+                     storage=None) -> Dict[str, Any]:
+        """
+        Полная сверка с S3: значения bucket перезаписываются целиком,
+        префиксы без объектов удаляются
+        """
+        storage = storage or _default_storage()
+        result = {}
+        for bucket in buckets or storage.buckets:
+            started = time.monotonic()
+            # Приращения до начала листинга записываются сейчас и затем перезаписываются;
+            # последующие (этого и других воркеров) сбрасываются поверх результата сверки
+            await self.flush(session)
+            scan_started_at = datetime.utcnow()
+            totals = await self.scan_bucket(bucket, storage)
+            await self._replace_bucket(session, bucket, totals, scan_started_at)
+            result[bucket] = {
+                'prefixes': len(totals),
+                'objects': sum(objects for objects, _ in totals.values()),
+                'seconds': round(time.monotonic() - started, 2)
+            }
+        logger.info(f"Storage inventory rescanned: {result}")
+        return result
+
+    async def _replace_bucket(self, session: AsyncSession, bucket: str, totals: Dict[str, Tuple[int, int]],
+                              scanned_at: datetime):
+        now = datetime.utcnow()
+        await session.execute(
+            delete(StorageInventoryEntry).where(
+                StorageInventoryEntry.bucket == bucket,
+                StorageInventoryEntry.prefix.not_in(list(totals))
+            )
+        )
+        statement = pg_insert(StorageInventoryEntry).values([
+            {'bucket': bucket, 'prefix': prefix, 'object_count': objects, 'total_bytes': size,
+             'scanned_at': scanned_at, 'updated_at': now}
+            for prefix, (objects, size) in sorted(totals.items())
+        ])
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[StorageInventoryEntry.bucket, StorageInventoryEntry.prefix],
+                set_={column: statement.excluded[column]
+                      for column in ('object_count', 'total_bytes', 'scanned_at', 'updated_at')}
+            )
+        )
+        await session.commit()
+
+    async def needs_rescan(self, session: AsyncSession) -> bool:
+        """Сверки не было или последняя старше STORAGE_INVENTORY_RESCAN_HOURS"""
+        last_scan = await session.scalar(select(func.min(StorageInventoryEntry.scanned_at)))
+        cutoff = datetime.utcnow() - timedelta(hours=settings.STORAGE_INVENTORY_RESCAN_HOURS)
+        return last_scan is None or last_scan < cutoff
+
+    async def stats(self, session: AsyncSession, buckets: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Статистика из таблицы инвентаря с учетом еще не сброшенных приращений процесса"""
+        totals: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        scanned_at = {}
+        for bucket in buckets or _default_storage().buckets:
+            totals[bucket]
+
+        for row in (await session.scalars(select(StorageInventoryEntry))).all():
+            totals[row.bucket][row.prefix][0] += row.object_count
+            totals[row.bucket][row.prefix][1] += row.total_bytes
+            if row.scanned_at and (row.bucket not in scanned_at or row.scanned_at < scanned_at[row.bucket]):
+                scanned_at[row.bucket] = row.scanned_at
+
+        with self._lock:
+            for (bucket, prefix), (objects, size) in self._deltas.items():
+                totals[bucket][prefix][0] += objects
+                totals[bucket][prefix][1] += size
+
+        stats = {'buckets': {}, 'total_size': 0, 'total_objects': 0}
+        for bucket, prefixes in totals.items():
+            bucket_objects = sum(objects for objects, _ in prefixes.values())
+            bucket_size = sum(size for _, size in prefixes.values())
+            stats['buckets'][bucket] = {
+                'objects': bucket_objects,
+                'size_bytes': bucket_size,
+                'size_mb': _size_mb(bucket_size),
+                'prefixes': {
+                    prefix: {'objects': objects, 'size_bytes': size}
+                    for prefix, (objects, size) in sorted(prefixes.items())
+                    if objects or size
+                },
+                'scanned_at': scanned_at.get(bucket)
+            }
+            stats['total_size'] += bucket_size
+            stats['total_objects'] += bucket_objects
+
+        stats['total_size_mb'] = _size_mb(stats['total_size'])
+        stats['total_size_gb'] = round(stats['total_size'] / (1024 * 1024 * 1024), 2)
+        return stats
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pending_rows': self.pending(),
+            'flush_errors': self.flush_errors,
+            'last_flush_at': self.last_flush_at
+        }
+
+
+storage_inventory = StorageInventory()
+
+
+async def run_storage_rescan(force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Полная сверка на выделенном соединении под advisory lock.
+    Возвращает None, если сверку уже выполняет другой процесс или она не устарела.
+    """
+    from app.db.database import engine
+
+    async with engine.connect() as connection:
+        locked = (await connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": RESCAN_LOCK_KEY}
+        )).scalar()
+        await connection.commit()
+        if not locked:
+            return None
+
+        try:
+            async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+                if not force and not await storage_inventory.needs_rescan(session):
+                    return None
+                return await storage_inventory.rescan(session)
+        finally:
+            await connection.rollback()
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RESCAN_LOCK_KEY})
+            await connection.commit()
+
+
+async def storage_inventory_loop():
+    """Периодический сброс приращений и полная сверка, когда она устарела"""
+    from app.db.database import AsyncSessionLocal
+
+    while True:
+        await asyncio.sleep(settings.STORAGE_INVENTORY_FLUSH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as session:
+                await storage_inventory.flush(session)
+            await run_storage_rescan()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Storage inventory update failed: {e}")
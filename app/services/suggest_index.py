@@ -0,0 +1,423 @@
+"""
+In-process индекс префиксов для автодополнения поиска
+Сжатое префиксное дерево (radix trie) по нормализованным названиям треков и именам артистов.
+В каждом узле хранится top-k записей поддерева по популярности, поэтому ответ на запрос
+стоит O(длина префикса) и не зависит от размера каталога.
+Снимок и индекс в памяти помечаются состоянием каталога на момент сборки (число и максимальные
+id треков и артистов); при расхождении с базой или по возрасту индекс пересобирается.
+"""
+
+import asyncio
+import gzip
+import json
+import heapq
+import logging
+import os
+import time
+import unicodedata
+import uuid
+from bisect import insort
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Any, List, Dict, Optional, Tuple, Iterable
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Track, Artist
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# Сколько начал слов индексировать, чтобы "rhap" находил "Bohemian Rhapsody"
+MAX_WORD_STARTS = 4
+
+
+def normalize_text(value: str) -> str:
+    """Нормализация строки: NFKD без диакритики, casefold, схлопнутые пробелы"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+@dataclass(eq=False)
+class SuggestEntry:
+    kind: str
+    entity_id: int
+    text: str
+    weight: int
+    paths: Tuple[str, ...] = ()
+    rank: Tuple[int, str] = field(init=False)
+
+    def __post_init__(self):
+        self.rank = (-self.weight, self.text)
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.entity_id}"
+
+
+_rank = attrgetter("rank")
+
+
+class _Node:
+    __slots__ = ("label", "children", "entries", "top", "count", "stale")
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.children: Dict[str, "_Node"] = {}
+        self.entries: List[SuggestEntry] = []
+        self.top: List[SuggestEntry] = []
+        self.count = 0
+        self.stale = False
+
+
+class SuggestIndex:
+    """Префиксный индекс с весами по популярности"""
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self._root = _Node()
+        self._entries: Dict[str, SuggestEntry] = {}
+        self.ready = False
+        self.catalog_state: Optional[List[Any]] = None
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, kind: str, entity_id: int, text: str, weight: int = 0):
+        """Добавляет или обновляет запись"""
+        key = f"{kind}:{entity_id}"
+        if key in self._entries:
+            self.remove(kind, entity_id)
+
+        norm = normalize_text(text)
+        if not norm:
+            return
+
+        words = norm.split(" ")
+        paths = tuple(dict.fromkeys(
+            " ".join(words[i:])
+            for i in range(min(len(words), MAX_WORD_STARTS))
+            if i == 0 or words[i][0].isalnum()
+        ))
+        entry = SuggestEntry(kind=kind, entity_id=entity_id, text=text, weight=weight or 0, paths=paths)
+        self._entries[key] = entry
+
+        for path in paths:
+            self._insert(path, entry)
+
+    def add_track(self, track_id: int, title: str, artist_name: Optional[str] = None, popularity: int = 0):
+        """Добавляет трек в формате 'Название - Исполнитель'"""
+        text = f"{title} - {artist_name}" if artist_name else title
+        self.add("track", track_id, text, popularity)
+
+    def add_artist(self, artist_id: int, name: str, weight: Optional[int] = None):
+        """Добавляет артиста; без веса сохраняет ранее известный"""
+        if weight is None:
+            existing = self._entries.get(f"artist:{artist_id}")
+            weight = existing.weight if existing else 0
+        self.add("artist", artist_id, name, weight)
+
+    def remove(self, kind: str, entity_id: int):
+        """Удаляет запись из индекса"""
+        entry = self._entries.pop(f"{kind}:{entity_id}", None)
+        if not entry:
+            return
+
+        for path in entry.paths:
+            self._delete(path, entry)
+
+    def suggest(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[SuggestEntry]:
+        """Лучшие по популярности записи, начинающиеся с префикса"""
+        norm = normalize_text(prefix)
+        if not norm:
+            return []
+
+        node = self._find(norm)
+        if node is None:
+            return []
+
+        if node.stale:
+            self._refresh(node)
+
+        if kind is None:
+            return node.top[:limit]
+        matched = [entry for entry in node.top if entry.kind == kind][:limit]
+        if len(matched) < limit and node.count > len(node.top):
+            # top-k узла занят записями другого типа: нужные ищутся в поддереве
+            return heapq.nsmallest(limit, self._subtree_entries(node, kind), key=_rank)
+        return matched
+
+    def clear(self):
+        self._root = _Node()
+        self._entries.clear()
+
+    def _insert(self, path: str, entry: SuggestEntry):
+        node = self._root
+        offer = self._offer
+        offer(node, entry)
+        rest = path
+
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                child = _Node(rest)
+                node.children[rest[0]] = child
+                node = child
+                offer(node, entry)
+                break
+
+            label = child.label
+            if rest.startswith(label):
+                node = child
+                rest = rest[len(label):]
+                offer(node, entry)
+                continue
+
+            common = _common_prefix_length(label, rest)
+            if common < len(label):
+                # Разбиваем ребро: общий префикс уходит в промежуточный узел
+                middle = _Node(child.label[:common])
+                middle.top = list(child.top)
+                middle.count = child.count
+                middle.stale = child.stale
+                child.label = child.label[common:]
+                middle.children[child.label[0]] = child
+                node.children[rest[0]] = middle
+                child = middle
+
+            node = child
+            rest = rest[common:]
+            self._offer(node, entry)
+
+        node.entries.append(entry)
+
+    def _delete(self, path: str, entry: SuggestEntry):
+        node = self._root
+        trail = [node]
+        rest = path
+
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None or not rest.startswith(child.label):
+                return
+            rest = rest[len(child.label):]
+            node = child
+            trail.append(node)
+
+        if entry in node.entries:
+            node.entries.remove(entry)
+
+        for visited in trail:
+            visited.count -= 1
+            if entry in visited.top:
+                visited.top.remove(entry)
+                # В поддереве могли остаться записи за пределами top-k
+                if visited.count > len(visited.top):
+                    visited.stale = True
+
+        # Убираем опустевшие листья
+        for parent, child in zip(reversed(trail[:-1]), reversed(trail[1:])):
+            if child.entries or child.children:
+                break
+            del parent.children[child.label[0]]
+
+    def _offer(self, node: _Node, entry: SuggestEntry):
+        node.count += 1
+        if node.stale:
+            return
+        top = node.top
+        if len(top) >= self.top_k and entry.rank >= top[-1].rank:
+            return
+        if entry in top:
+            return
+        insort(top, entry, key=_rank)
+        if len(node.top) > self.top_k:
+            node.top.pop()
+
+    def _find(self, prefix: str) -> Optional[_Node]:
+        node = self._root
+        rest = prefix
+
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                return None
+            if child.label.startswith(rest):
+                return child
+            if not rest.startswith(child.label):
+                return None
+            rest = rest[len(child.label):]
+            node = child
+
+        return node
+
+    def _refresh(self, node: _Node):
+        """Пересчитывает top-k узла обходом поддерева (только после удалений)"""
+        node.top = heapq.nsmallest(self.top_k, self._subtree_entries(node), key=_rank)
+        node.stale = False
+
+    @staticmethod
+    def _subtree_entries(node: _Node, kind: Optional[str] = None) -> List[SuggestEntry]:
+        seen = {}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for entry in current.entries:
+                if kind is None or entry.kind == kind:
+                    seen[id(entry)] = entry
+            stack.extend(current.children.values())
+        return list(seen.values())
+
+    def to_snapshot(self) -> Dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "catalog_state": self.catalog_state,
+            "built_at": self.built_at,
+            "entries": [
+                [entry.kind, entry.entity_id, entry.text, entry.weight]
+                for entry in self._entries.values()
+            ]
+        }
+
+    def load_entries(self, entries: Iterable[Tuple[str, int, str, int]]):
+        self.clear()
+        # При вставке в порядке убывания веса top-k узлов заполняются без перестановок
+        for kind, entity_id, text, weight in sorted(entries, key=lambda item: (-(item[3] or 0), item[2])):
+            self.add(kind, entity_id, text, weight)
+        self.ready = True
+
+    def save_snapshot(self, path: str):
+        """Сохраняет компактный снимок индекса (gzip JSON)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Воркеры сохраняют снимок одновременно при остановке: у каждого свой временный файл
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(self.to_snapshot(), f, ensure_ascii=False, separators=(",", ":"))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def load_snapshot(
+        self,
+        path: str,
+        catalog_state: Optional[List[Any]] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> bool:
+        """
+        Загружает индекс из снимка, возвращает False если снимка нет или он устарел:
+        другая версия формата, другое состояние каталога или снимок старше max_age_seconds
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read suggest snapshot {path}: {e}")
+            return False
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return False
+        if catalog_state is not None and snapshot.get("catalog_state") != catalog_state:
+            return False
+        built_at = snapshot.get("built_at") or 0.0
+        if max_age_seconds is not None and time.time() - built_at > max_age_seconds:
+            return False
+
+        self.load_entries(snapshot.get("entries", []))
+        self.catalog_state = snapshot.get("catalog_state")
+        self.built_at = built_at
+        return True
+
+    async def refresh(self, db: AsyncSession, max_age_seconds: float) -> bool:
+        """Пересобирает индекс, если каталог изменился или индекс старше max_age_seconds"""
+        state = await read_catalog_state(db)
+        if state == self.catalog_state and time.time() - self.built_at < max_age_seconds:
+            return False
+        await self.build_from_db(db, state)
+        return True
+
+    async def build_from_db(self, db: AsyncSession, catalog_state: Optional[List[Any]] = None):
+        """
+        Полная сборка индекса из PostgreSQL. Состояние каталога читается до сборки:
+        изменения, сделанные во время нее, заметит следующий refresh
+        """
+        if catalog_state is None:
+            catalog_state = await read_catalog_state(db)
+        built_at = time.time()
+
+        tracks_query = (
+            select(Track.id, Track.title, Track.popularity, Artist.name.label("artist_name"))
+            .outerjoin(Artist, Track.artist_id == Artist.id)
+        )
+        artists_query = (
+            select(Artist.id, Artist.name, func.coalesce(func.max(Track.popularity), 0).label("weight"))
+            .outerjoin(Track, Track.artist_id == Artist.id)
+            .group_by(Artist.id, Artist.name)
+        )
+
+        tracks_result = await db.stream(tracks_query)
+        entries = []
+        async for row in tracks_result:
+            text = f"{row.title} - {row.artist_name}" if row.artist_name else row.title
+            entries.append(("track", row.id, text, row.popularity or 0))
+
+        artists_result = await db.execute(artists_query)
+        for row in artists_result.all():
+            entries.append(("artist", row.id, row.name, row.weight or 0))
+
+        self.load_entries(entries)
+        self.catalog_state = catalog_state
+        self.built_at = built_at
+
+
+async def read_catalog_state(db: AsyncSession) -> List[Any]:
+    """Отпечаток каталога: меняется при добавлении и удалении треков и артистов"""
+    tracks = (await db.execute(
+        select(func.count(Track.id), func.max(Track.id), func.max(Track.created_at))
+    )).one()
+    artists = (await db.execute(select(func.count(Artist.id), func.max(Artist.id)))).one()
+    return [
+        tracks[0], tracks[1], tracks[2].isoformat() if tracks[2] else None,
+        artists[0], artists[1]
+    ]
+
+
+async def suggest_refresh_loop():
+    """Периодическая проверка каталога: треки из других воркеров и переименования попадают в индекс"""
+    from app.db.database import AsyncSessionLocal
+
+    while True:
+        await asyncio.sleep(settings.SUGGEST_REFRESH_INTERVAL_SECONDS)
+        try:
+            async with AsyncSessionLocal() as session:
+                if await suggest_index.refresh(session, settings.SUGGEST_MAX_AGE_SECONDS):
+                    logger.info(f"Suggest index rebuilt: {len(suggest_index)} entries")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Suggest index refresh failed: {e}")
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+suggest_index = SuggestIndex(top_k=settings.SUGGEST_TOP_K)
@@ -0,0 +1,238 @@
+"""
+Очистка bucket temp
+Bucket проходится постранично по порядку ключей, просроченные объекты удаляются пачками
+по 1000 ключей (предел delete_objects), несколько пачек выполняются одновременно.
+После завершения пачки и всех предыдущих позиция (последний покрытый ключ) сохраняется
+в maintenance_checkpoints: прерванный проход продолжается с нее через StartAfter,
+а не с начала bucket. Скорость удаления ограничена, чтобы очистка не вытесняла загрузки.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import MaintenanceCheckpoint
+from app.services.storage_inventory import inventory_prefix, storage_inventory
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "temp_cleanup"
+CLEANUP_LOCK_KEY = 0x746D_7031
+# Предел delete_objects в S3
+DELETE_BATCH_SIZE = 1000
+
+
+class TempCleanup:
+    """Один проход очистки bucket: листинг, пачки удаления, ограничение скорости, позиция"""
+
+    def __init__(
+        self,
+        storage,
+        bucket: str,
+        concurrency: int = 4,
+        max_deletes_per_second: float = 0,
+        batch_size: int = DELETE_BATCH_SIZE
+    ):
+        self.storage = storage
+        self.bucket = bucket
+        self.concurrency = max(1, concurrency)
+        self.max_deletes_per_second = max_deletes_per_second
+        self.batch_size = min(batch_size, DELETE_BATCH_SIZE)
+        self._ready_at = 0.0
+
+    async def run(
+        self,
+        older_than_hours: float,
+        start_after: Optional[str] = None,
+        time_budget_seconds: Optional[float] = None,
+        on_checkpoint: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Удаляет объекты старше older_than_hours, начиная после start_after.
+        По истечении бюджета времени останавливается на границе страницы: completed=False,
+        position — ключ, с которого продолжить
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
+        deadline = time.monotonic() + time_budget_seconds if time_budget_seconds else None
+        report = {'scanned': 0, 'deleted': 0, 'deleted_bytes': 0, 'failed': 0,
+                  'position': start_after, 'completed': False}
+        in_flight: Deque[Tuple[str, asyncio.Future]] = deque()
+
+        async def complete_oldest():
+            last_key, task = in_flight.popleft()
+            deleted, deleted_bytes, failed = await task
+            report['deleted'] += deleted
+            report['deleted_bytes'] += deleted_bytes
+            report['failed'] += failed
+            report['position'] = last_key
+            if on_checkpoint is not None:
+                await on_checkpoint(last_key)
+
+        async def submit(batch: List[Dict], last_key: str):
+            await self._throttle(len(batch))
+            in_flight.append((last_key, asyncio.ensure_future(self._delete(batch))))
+            while len(in_flight) >= self.concurrency:
+                await complete_oldest()
+
+        pending: List[Dict] = []
+        token = None
+        last_listed = start_after
+        try:
+            while True:
+                page, token = await self.storage.list_objects_page(
+                    self.bucket, "", token, DELETE_BATCH_SIZE, start_after if token is None else None
+                )
+                report['scanned'] += len(page)
+                for obj in page:
+                    if obj['LastModified'] < cutoff:
+                        pending.append(obj)
+                        if len(pending) == self.batch_size:
+                            await submit(pending, obj['Key'])
+                            pending = []
+                if page:
+                    last_listed = page[-1]['Key']
+
+                if token is None:
+                    report['completed'] = True
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+
+            if pending:
+                await submit(pending, last_listed)
+            while in_flight:
+                await complete_oldest()
+        except BaseException:
+            for _, task in in_flight:
+                task.cancel()
+            raise
+
+        if report['completed']:
+            report['position'] = None
+        elif report['position'] != last_listed:
+            # Хвост без просроченных объектов тоже пройден
+            report['position'] = last_listed
+            if on_checkpoint is not None:
+                await on_checkpoint(last_listed)
+        return report
+
+    async def _delete(self, batch: List[Dict]) -> Tuple[int, int, int]:
+        failed = set(await self.storage.delete_objects_batch(self.bucket, [obj['Key'] for obj in batch]))
+        objects: Counter = Counter()
+        sizes: Counter = Counter()
+        for obj in batch:
+            if obj['Key'] not in failed:
+                prefix = inventory_prefix(obj['Key'])
+                objects[prefix] += 1
+                sizes[prefix] += obj['Size']
+        for prefix, count in objects.items():
+            storage_inventory.record(self.bucket, prefix, -sizes[prefix], objects=-count)
+        return sum(objects.values()), sum(sizes.values()), len(failed)
+
+    async def _throttle(self, objects: int):
+        """Равномерный темп: пачка ждет, пока не истечет время, отведенное предыдущим"""
+        if not self.max_deletes_per_second:
+            return
+        now = time.monotonic()
+        wait = self._ready_at - now
+        self._ready_at = max(now, self._ready_at) + objects / self.max_deletes_per_second
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def _save_checkpoint(session: AsyncSession, position: Optional[str], report: Optional[Dict] = None):
+    values = {'name': CHECKPOINT_NAME, 'position': position, 'updated_at': datetime.utcnow()}
+    if report is not None:
+        values['report'] = report
+    statement = pg_insert(MaintenanceCheckpoint).values(**values)
+    await session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[MaintenanceCheckpoint.name],
+            set_={column: statement.excluded[column] for column in values if column != 'name'}
+        )
+    )
+    await session.commit()
+
+
+async def run_temp_cleanup(older_than_hours: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Проход очистки на выделенном соединении под advisory lock, с продолжением
+    с сохраненной позиции. Возвращает None, если очистку уже выполняет другой процесс.
+    """
+    from app.db.database import engine
+    from app.services.s3_service import async_s3_service
+
+    hours = older_than_hours if older_than_hours is not None else settings.TEMP_CLEANUP_OLDER_THAN_HOURS
+
+    async with engine.connect() as connection:
+        locked = (await connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": CLEANUP_LOCK_KEY}
+        )).scalar()
+        await connection.commit()
+        if not locked:
+            return None
+
+        try:
+            async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+                checkpoint = await session.get(MaintenanceCheckpoint, CHECKPOINT_NAME)
+                start_after = checkpoint.position if checkpoint else None
+
+                cleanup = TempCleanup(
+                    async_s3_service,
+                    async_s3_service.temp_bucket,
+                    concurrency=settings.TEMP_CLEANUP_CONCURRENCY,
+                    max_deletes_per_second=settings.TEMP_CLEANUP_MAX_DELETES_PER_SECOND
+                )
+                started = time.monotonic()
+                report = await cleanup.run(
+                    hours,
+                    start_after=start_after,
+                    time_budget_seconds=settings.TEMP_CLEANUP_TIME_BUDGET_SECONDS,
+                    on_checkpoint=lambda position: _save_checkpoint(session, position)
+                )
+                report.update(
+                    resumed_from=start_after,
+                    older_than_hours=hours,
+                    seconds=round(time.monotonic() - started, 2),
+                    finished_at=datetime.utcnow().isoformat()
+                )
+                await _save_checkpoint(session, report['position'], report)
+                return report
+        finally:
+            await connection.rollback()
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": CLEANUP_LOCK_KEY})
+            await connection.commit()
+
+
+async def temp_cleanup_loop():
+    """
+    Периодическая очистка; незавершенный проход продолжается сразу, без ожидания периода.
+    Истекшие возобновляемые загрузки хранят части multipart upload, невидимые в листинге,
+    поэтому отменяются здесь же
+    """
+    from app.services.resumable_uploads import expire_resumable_uploads
+
+    while True:
+        try:
+            await expire_resumable_uploads()
+            report = await run_temp_cleanup()
+            if report and report['deleted']:
+                logger.info(
+                    f"Temp cleanup: {report['deleted']} objects, {report['deleted_bytes']} bytes, "
+                    f"completed: {report['completed']}"
+                )
+            if report and not report['completed']:
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Temp cleanup failed: {e}")
+        await asyncio.sleep(settings.TEMP_CLEANUP_INTERVAL_SECONDS)
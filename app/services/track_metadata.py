@@ -0,0 +1,45 @@
+"""
+Кэш ссылок трека на исполнителя, альбом и жанр
+Нужен при записи прослушиваний: событие в ClickHouse и счетчики требуют эти ID,
+а выбирать их заново на каждое событие дорого.
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Track
+from app.services.search_hydration import HydrationCache
+
+CACHE_KIND = "track_refs"
+
+
+class TrackRefs(NamedTuple):
+    artist_id: Optional[int]
+    album_id: Optional[int]
+    genre_id: Optional[int]
+
+
+track_metadata_cache = HydrationCache(
+    ttl_seconds=settings.TRACK_METADATA_CACHE_TTL_SECONDS,
+    max_entries=settings.TRACK_METADATA_CACHE_SIZE
+)
+
+
+async def resolve_track_refs(db: AsyncSession, track_ids: Iterable[int]) -> Dict[int, TrackRefs]:
+    """Ссылки для списка треков; несуществующих треков в результате нет"""
+    found, missing = track_metadata_cache.get_many(CACHE_KIND, list(track_ids))
+    if missing:
+        result = await db.execute(
+            select(Track.id, Track.artist_id, Track.album_id, Track.genre_id).where(Track.id.in_(missing))
+        )
+        loaded = {track_id: TrackRefs(*refs) for track_id, *refs in result.all()}
+        track_metadata_cache.put_many(CACHE_KIND, loaded)
+        found.update(loaded)
+    return found
+
+
+def invalidate_track_refs(track_id: int):
+    track_metadata_cache.invalidate(CACHE_KIND, track_id)
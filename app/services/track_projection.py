@@ -0,0 +1,101 @@
+"""
+Проекция треков с деталями на уровне Core
+Выбираются только колонки схемы TrackWithDetails, без ORM-сущностей и identity map,
+а строки превращаются в схемы предкомпилированным маппером без повторной валидации.
+"""
+
+from operator import itemgetter
+from typing import Callable, Iterable, List, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Select, func, select
+from sqlalchemy.engine import Row
+
+from app.db.models import Track, Artist, Album, Genre
+from app.schemas.track import TrackWithDetails
+
+
+# Порядок колонок совпадает с TRACK_DETAIL_FIELDS. Ограничения схемы, которые
+# могли бы нарушить NULL из базы (explicit: bool, popularity: int), обеспечиваются в SQL
+TRACK_DETAIL_COLUMNS = (
+    Track.id,
+    Track.title,
+    Track.artist_id,
+    Track.album_id,
+    Track.genre_id,
+    Track.duration_ms,
+    func.coalesce(Track.explicit, False).label("explicit"),
+    func.coalesce(Track.popularity, 0).label("popularity"),
+    Track.preview_url,
+    Track.file_path,
+    Track.tempo,
+    Track.energy,
+    Track.valence,
+    Track.danceability,
+    Track.spotify_id,
+    Track.created_at,
+    Artist.name.label("artist_name"),
+    Artist.image_url.label("artist_image_url"),
+    Album.title.label("album_title"),
+    Album.cover_image_url.label("album_cover_url"),
+    Genre.name.label("genre_name"),
+)
+
+TRACK_DETAIL_FIELDS = tuple(column.key for column in TRACK_DETAIL_COLUMNS)
+
+
+def compile_row_mapper(model: Type[BaseModel], fields: Tuple[str, ...]) -> Callable[[Row], BaseModel]:
+    """
+    Строит функцию строка → схема для строк, где заданы все поля модели.
+    Экземпляр собирается напрямую, как это делает model_construct, но без обхода
+    полей модели на каждую строку: в pydantic 2 model_construct медленнее валидации.
+    """
+    if set(fields) != set(model.model_fields):
+        raise ValueError(f"Projection does not cover {model.__name__} fields")
+
+    # Все поля заданы всегда, поэтому множество общее для всех экземпляров
+    fields_set = set(fields)
+    if model.__private_attributes__ or model.model_config.get("extra") == "allow":
+        return lambda row: model.model_construct(_fields_set=fields_set, **dict(zip(fields, row)))
+
+    # __dict__ заполняется в порядке полей модели, от него зависит порядок ключей в JSON
+    names = tuple(model.model_fields)
+    pick = itemgetter(*(fields.index(name) for name in names))
+    new = object.__new__
+    set_attr = object.__setattr__
+
+    def map_row(row: Row) -> BaseModel:
+        instance = new(model)
+        set_attr(instance, "__dict__", dict(zip(names, pick(row))))
+        set_attr(instance, "__pydantic_fields_set__", fields_set)
+        set_attr(instance, "__pydantic_extra__", None)
+        set_attr(instance, "__pydantic_private__", None)
+        return instance
+
+    return map_row
+
+
+_map_track_row = compile_row_mapper(TrackWithDetails, TRACK_DETAIL_FIELDS)
+
+
+def with_track_joins(query: Select) -> Select:
+    return (
+        query
+        .outerjoin(Artist, Track.artist_id == Artist.id)
+        .outerjoin(Album, Track.album_id == Album.id)
+        .outerjoin(Genre, Track.genre_id == Genre.id)
+    )
+
+
+def track_details_query(*extra_columns) -> Select:
+    """SELECT колонок TrackWithDetails с join исполнителя, альбома и жанра; extra_columns идут в конце строки"""
+    return with_track_joins(select(*TRACK_DETAIL_COLUMNS, *extra_columns))
+
+
+def row_to_track_details(row: Row) -> TrackWithDetails:
+    """Строка track_details_query → TrackWithDetails; дополнительные колонки игнорируются"""
+    return _map_track_row(row)
+
+
+def rows_to_track_details(rows: Iterable[Row]) -> List[TrackWithDetails]:
+    return [_map_track_row(row) for row in rows]
@@ -9,9 +9,16 @@ import aiofiles
 from urllib.parse import urlparse
 from pathlib import Path
 
+from app.core.pagination import apply_keyset
+from app.core.responses import payload_cache
+from app.services.track_metadata import invalidate_track_refs
+from app.services.track_projection import track_details_query, row_to_track_details, rows_to_track_details
 from app.db.models import Track, Artist, Album, Genre
 from app.schemas.track import TrackCreate, TrackUpdate, TrackSearchQuery, TrackWithDetails, TrackUploadFromURL, TrackUploadFromFile
 
+# Тег сериализованных списков популярных треков в payload_cache
+POPULAR_TRACKS_TAG = "tracks:popular"
+
 
 class TrackService:
     """Сервис для работы с треками"""
@@ -25,6 +32,7 @@ class TrackService:
         self.db.add(db_track)
         await self.db.commit()
         await self.db.refresh(db_track)
+        payload_cache.invalidate(POPULAR_TRACKS_TAG)
         return db_track
     
     async def get_track(self, track_id: int) -> Optional[Track]:
@@ -35,20 +43,7 @@ class TrackService:
     
     async def get_track_with_details(self, track_id: int) -> Optional[TrackWithDetails]:
         """Получение трека с деталями об исполнителе, альбоме и жанре"""
-        query = (
-            select(
-                Track,
-                Artist.name.label("artist_name"),
-                Artist.image_url.label("artist_image_url"),
-                Album.title.label("album_title"),
-                Album.cover_image_url.label("album_cover_url"),
-                Genre.name.label("genre_name")
-            )
-            .outerjoin(Artist, Track.artist_id == Artist.id)
-            .outerjoin(Album, Track.album_id == Album.id)
-            .outerjoin(Genre, Track.genre_id == Genre.id)
-            .where(Track.id == track_id)
-        )
+        query = track_details_query().where(Track.id == track_id)
         
         result = await self.db.execute(query)
         row = result.first()
@@ -56,19 +51,14 @@ class TrackService:
         if not row:
             return None
         
-        track = row[0]
-        return TrackWithDetails(
-            **track.__dict__,
-            artist_name=row.artist_name,
-            artist_image_url=row.artist_image_url,
-            album_title=row.album_title,
-            album_cover_url=row.album_cover_url,
-            genre_name=row.genre_name
-        )
+        return row_to_track_details(row)
     
-    async def get_tracks(self, skip: int = 0, limit: int = 100) -> List[Track]:
-        """Получение списка треков с пагинацией"""
-        query = select(Track).offset(skip).limit(limit)
+    async def get_tracks(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Track]:
+        """Получение списка треков: по курсору или со смещением skip"""
+        query = apply_keyset(select(Track), [Track.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
     
@@ -84,6 +74,9 @@ class TrackService:
         
         await self.db.commit()
         await self.db.refresh(db_track)
+        payload_cache.invalidate(POPULAR_TRACKS_TAG)
+        # Исполнитель, альбом или жанр могли смениться: прослушивания не должны уходить старым
+        invalidate_track_refs(track_id)
         return db_track
     
     async def delete_track(self, track_id: int) -> bool:
@@ -94,24 +87,14 @@ class TrackService:
         
         await self.db.delete(db_track)
         await self.db.commit()
+        payload_cache.invalidate(POPULAR_TRACKS_TAG)
+        invalidate_track_refs(track_id)
         return True
     
     async def search_tracks(self, search_query: TrackSearchQuery) -> tuple[List[TrackWithDetails], int]:
         """Поиск треков с фильтрацией"""
         
-        base_query = (
-            select(
-                Track,
-                Artist.name.label("artist_name"),
-                Artist.image_url.label("artist_image_url"),
-                Album.title.label("album_title"),
-                Album.cover_image_url.label("album_cover_url"),
-                Genre.name.label("genre_name")
-            )
-            .outerjoin(Artist, Track.artist_id == Artist.id)
-            .outerjoin(Album, Track.album_id == Album.id)
-            .outerjoin(Genre, Track.genre_id == Genre.id)
-        )
+        base_query = track_details_query()
         
         
         conditions = []
@@ -156,32 +139,18 @@ class TrackService:
        
         query = base_query.offset(search_query.offset).limit(search_query.limit)
         result = await self.db.execute(query)
-        rows = result.all()
-        
-       
-        tracks = []
-        for row in rows:
-            track = row[0]
-            track_with_details = TrackWithDetails(
-                **track.__dict__,
-                artist_name=row.artist_name,
-                artist_image_url=row.artist_image_url,
-                album_title=row.album_title,
-                album_cover_url=row.album_cover_url,
-                genre_name=row.genre_name
-            )
-            tracks.append(track_with_details)
+        tracks = rows_to_track_details(result.all())
         
         return tracks, total
     
-    async def get_tracks_by_artist(self, artist_id: int, skip: int = 0, limit: int = 100) -> List[Track]:
-        """Получение треков по исполнителю"""
-        query = (
-            select(Track)
-            .where(Track.artist_id == artist_id)
-            .offset(skip)
-            .limit(limit)
-        )
+    async def get_tracks_by_artist(
+        self, artist_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+    ) -> List[Track]:
+        """Получение треков по исполнителю: по курсору или со смещением skip"""
+        query = apply_keyset(select(Track).where(Track.artist_id == artist_id), [Track.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
     
@@ -194,38 +163,13 @@ class TrackService:
     async def get_popular_tracks(self, limit: int = 50) -> List[TrackWithDetails]:
         """Получение популярных треков"""
         query = (
-            select(
-                Track,
-                Artist.name.label("artist_name"),
-                Artist.image_url.label("artist_image_url"),
-                Album.title.label("album_title"),
-                Album.cover_image_url.label("album_cover_url"),
-                Genre.name.label("genre_name")
-            )
-            .outerjoin(Artist, Track.artist_id == Artist.id)
-            .outerjoin(Album, Track.album_id == Album.id)
-            .outerjoin(Genre, Track.genre_id == Genre.id)
-            .order_by(Track.popularity.desc())
+            track_details_query()
+            .order_by(Track.popularity_score.desc(), Track.popularity.desc(), Track.id)
             .limit(limit)
         )
         
         result = await self.db.execute(query)
-        rows = result.all()
-        
-        tracks = []
-        for row in rows:
-            track = row[0]
-            track_with_details = TrackWithDetails(
-                **track.__dict__,
-                artist_name=row.artist_name,
-                artist_image_url=row.artist_image_url,
-                album_title=row.album_title,
-                album_cover_url=row.album_cover_url,
-                genre_name=row.genre_name
-            )
-            tracks.append(track_with_details)
-        
-        return tracks
+        return rows_to_track_details(result.all())
     
     async def upload_track_from_url(self, track_data: TrackUploadFromURL) -> tuple[bool, str, Optional[Track]]:
         """Загрузка трека по URL"""
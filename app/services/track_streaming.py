@@ -0,0 +1,168 @@
+"""
+Отдача аудио с поддержкой Range, ETag и условных запросов
+Объекты S3 проксируются кусками с чтением на один кусок вперед, поэтому память на запрос
+ограничена двумя кусками; перемотка в плеере запрашивает у S3 только нужный диапазон.
+Локальные файлы отдает FileResponse (Range и If-Range), здесь добавлен If-None-Match.
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+from app.services.s3_service import async_s3_service
+
+logger = logging.getLogger(__name__)
+
+# Каталоги, из которых разрешено отдавать локальные файлы треков
+LOCAL_TRACK_ROOTS = (Path("app/static/tracks"), Path("uploads/tracks"))
+
+_BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Содержимое blobs/{sha256} не меняется никогда; private — ответ выдан после проверки прав
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Ресурс может смениться (трек перезалит), браузер хранит копию и сверяет ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def parse_byte_range(header: Optional[str]) -> Optional[str]:
+    """
+    Нормализованный одиночный диапазон "bytes=a-b" или None, если отдавать файл целиком.
+    Несколько диапазонов и некорректный заголовок по RFC 9110 можно игнорировать.
+    """
+    if not header:
+        return None
+    match = _BYTE_RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(start) > int(end):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """Слабое сравнение для If-None-Match: список тегов или *"""
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    normalized = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == normalized for tag in header.split(","))
+
+
+async def _relay(body, chunk_size: int) -> AsyncIterator[bytes]:
+    """Чтение тела S3 кусками; следующий кусок читается, пока текущий отправляется клиенту"""
+    pending = asyncio.ensure_future(async_s3_service.read_body(body, chunk_size))
+    try:
+        while True:
+            chunk = await pending
+            if not chunk:
+                pending = None
+                return
+            pending = asyncio.ensure_future(async_s3_service.read_body(body, chunk_size))
+            yield chunk
+    finally:
+        # Клиент отключился или перемотал: незавершенное чтение бросается, соединение с S3 закрывается
+        if pending is not None:
+            if pending.done() and not pending.cancelled():
+                pending.exception()
+            else:
+                pending.cancel()
+        body.close()
+
+
+async def _open_s3_object(s3_key: str, byte_range: Optional[str], if_range: Optional[str],
+                          if_none_match: Optional[str]):
+    try:
+        # If-Range с ETag: диапазон только для той же версии объекта, иначе файл целиком
+        if_match = if_range if byte_range and if_range and if_range.strip().startswith(('"', 'W/')) else None
+        if byte_range and if_range and not if_match:
+            byte_range = None
+        try:
+            return await async_s3_service.open_track_object(s3_key, byte_range, if_match, if_none_match)
+        except ClientError as e:
+            if if_match and e.response['ResponseMetadata']['HTTPStatusCode'] == 412:
+                return await async_s3_service.open_track_object(s3_key, None, None, if_none_match)
+            raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Хранилище не ответило вовремя")
+
+
+async def s3_object_response(request: Request, s3_key: str, cache_control: str) -> Response:
+    """Ответ 200/206/304/416 для объекта из bucket треков"""
+    byte_range = parse_byte_range(request.headers.get("range"))
+    if_none_match = request.headers.get("if-none-match")
+
+    try:
+        obj = await _open_s3_object(s3_key, byte_range, request.headers.get("if-range"), if_none_match)
+    except ClientError as e:
+        status = e.response['ResponseMetadata']['HTTPStatusCode']
+        if status == 304:
+            return Response(status_code=304, headers={"ETag": if_none_match, "Cache-Control": cache_control})
+        if status == 416:
+            size = (await async_s3_service.get_track_metadata(s3_key) or {}).get('size')
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}" if size is not None else "bytes */*"})
+        if status == 404:
+            raise HTTPException(status_code=404, detail="Трек не найден")
+        logger.error(f"Error opening {s3_key}: {e}")
+        raise HTTPException(status_code=502, detail="Ошибка чтения из хранилища")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(obj['ContentLength']),
+        "ETag": obj['ETag'],
+        "Cache-Control": cache_control
+    }
+    if obj.get('LastModified') is not None:
+        headers["Last-Modified"] = obj['LastModified'].strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+    status_code = 200
+    if obj.get('ContentRange'):
+        status_code = 206
+        headers["Content-Range"] = obj['ContentRange']
+
+    return StreamingResponse(
+        _relay(obj['Body'], settings.TRACK_STREAM_CHUNK_SIZE),
+        status_code=status_code,
+        media_type=obj.get('ContentType') or 'audio/mpeg',
+        headers=headers,
+        # Если отдача не началась (клиент ушел сразу), соединение с S3 все равно закрывается
+        background=BackgroundTask(obj['Body'].close)
+    )
+
+
+def resolve_local_track(file_path: str) -> Optional[Path]:
+    """Путь к локальному файлу трека внутри LOCAL_TRACK_ROOTS; пути вне этих каталогов отклоняются"""
+    roots = [root.resolve() for root in LOCAL_TRACK_ROOTS]
+    for candidate in (Path(file_path), Path("app") / file_path):
+        resolved = candidate.resolve()
+        if any(resolved.is_relative_to(root) for root in roots) and resolved.is_file():
+            return resolved
+    return None
+
+
+async def local_file_response(request: Request, path: Path) -> Response:
+    """FileResponse с проверкой If-None-Match до чтения файла"""
+    stat_result = await asyncio.to_thread(os.stat, path)
+    response = FileResponse(
+        path,
+        stat_result=stat_result,
+        media_type=mimetypes.guess_type(path.name)[0] or 'audio/mpeg',
+        headers={"Cache-Control": REVALIDATE_CACHE_CONTROL}
+    )
+    etag = response.headers.get("etag")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
+    return response
@@ -4,6 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status 
 
+from app.core.pagination import apply_keyset
 from app.db.models import User, Artist, UserPreference 
 from app.schemas.user import UserCreate, UserUpdate
 
@@ -15,9 +16,12 @@ class UserService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
-        """Получить список пользователей с пагинацией."""
-        query = select(User).offset(skip).limit(limit)
+    async def get_users(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[User]:
+        """Получить список пользователей: по курсору или со смещением skip."""
+        query = apply_keyset(select(User), [User.id], cursor)
+        if cursor is None:
+            query = query.offset(skip)
+        query = query.limit(limit)
         result = await self.db.execute(query)
         return result.scalars().all()
 
@@ -0,0 +1,110 @@
+"""
+Бенчмарк рендеринга больших JSON-ответов: JSONResponse против orjson и готовых байтов
+Запуск: python -m tests.benchmarks.bench_json_responses [--tracks 100] [--rounds 300]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.responses import FastJSONResponse, PayloadCache
+from app.schemas.track import Track, TrackWithDetails
+
+
+def make_tracks(count: int) -> List[TrackWithDetails]:
+    return [
+        TrackWithDetails(
+            id=i, title=f"Track {i}", artist_id=i % 50 + 1, album_id=i % 200 + 1, genre_id=i % 10 + 1,
+            duration_ms=210000, explicit=False, popularity=i % 100, preview_url=f"https://cdn/preview/{i}.mp3",
+            file_path=f"/music/{i}.mp3", tempo=120.0, energy=0.6, valence=0.4, danceability=0.7,
+            spotify_id=f"sp{i}", created_at=datetime(2024, 1, 1) + timedelta(minutes=i),
+            artist_name=f"Artist {i % 50}", album_title=f"Album {i % 200}", genre_name="Rock"
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_user_analytics(days: int = 90) -> dict:
+    """Ответ /analytics/user/{id}: вложенные словари, даты и длинная лента активности"""
+    today = datetime(2024, 6, 1)
+    return {
+        "search_stats": {"total_searches": 1200, "unique_queries": 640, "avg_results_per_search": 17.3, "click_through_rate": 0.412},
+        "listening_stats": {"total_plays": 5400, "total_duration": 1_234_567, "unique_tracks": 870, "avg_session_length": 1830.5},
+        "activity_stats": {"active_days": 80, "total_sessions": 410, "avg_daily_activity": 73.3},
+        "search_history": [
+            {"query": f"query {i}", "timestamp": today - timedelta(hours=i), "results_count": i % 40, "clicked": i % 3 == 0}
+            for i in range(10)
+        ],
+        "top_tracks": [
+            {"track_id": i, "title": f"Track {i}", "artist_name": f"Artist {i}", "play_count": 500 - i,
+             "total_duration": 90000 - i, "percentage": (500 - i) / 5}
+            for i in range(10)
+        ],
+        "activity_timeline": [
+            {"date": (today - timedelta(days=i)).date(), "search_count": i % 17, "listening_count": i % 29}
+            for i in range(days * 8)
+        ]
+    }
+
+
+def build_app(fast: bool, tracks: List[TrackWithDetails], analytics: dict) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse if fast else JSONResponse)
+    cache = PayloadCache(ttl_seconds=3600, max_entries=16)
+    adapter = TypeAdapter(List[Track])
+
+    @app.get("/tracks/", response_model=List[Track])
+    async def read_tracks():
+        return tracks
+
+    @app.get("/tracks/popular/", response_model=List[Track])
+    async def popular_tracks():
+        if not fast:
+            return tracks
+
+        async def compute():
+            return tracks
+        return await cache.get_or_render("popular", compute, adapter)
+
+    @app.get("/analytics/user/{user_id}")
+    async def user_analytics(user_id: int):
+        return FastJSONResponse(analytics) if fast else analytics
+
+    return app
+
+
+async def measure(app: FastAPI, path: str, rounds: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get(path)).raise_for_status()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await client.get(path)
+        return (time.perf_counter() - started) / rounds * 1000
+
+
+async def main(track_count: int, rounds: int):
+    tracks = make_tracks(track_count)
+    analytics = make_user_analytics()
+    baseline = build_app(False, tracks, analytics)
+    fast = build_app(True, tracks, analytics)
+
+    print(f"{track_count} tracks, {rounds} rounds, ms/request (before -> after)")
+    for path in ("/tracks/", "/tracks/popular/", "/analytics/user/1"):
+        before = await measure(baseline, path, rounds)
+        after = await measure(fast, path, rounds)
+        print(f"{path:<22} {before:7.3f} -> {after:7.3f}  x{before / after:4.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.tracks, args.rounds))
@@ -0,0 +1,154 @@
+"""
+Микробенчмарк гидратации TrackWithDetails: ORM-сущности против Core-проекции
+Запуск: python -m tests.benchmarks.bench_track_hydration [--rows 100] [--rounds 200]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.models import Base, Track, Artist, Album, Genre
+from app.schemas.track import TrackWithDetails
+from app.services.track_projection import track_details_query, rows_to_track_details
+
+
+async def orm_listing(session: AsyncSession, limit: int):
+    """Прежний путь: полные ORM-объекты и TrackWithDetails(**track.__dict__)"""
+    query = (
+        select(
+            Track,
+            Artist.name.label("artist_name"),
+            Artist.image_url.label("artist_image_url"),
+            Album.title.label("album_title"),
+            Album.cover_image_url.label("album_cover_url"),
+            Genre.name.label("genre_name")
+        )
+        .outerjoin(Artist, Track.artist_id == Artist.id)
+        .outerjoin(Album, Track.album_id == Album.id)
+        .outerjoin(Genre, Track.genre_id == Genre.id)
+        .order_by(Track.popularity.desc())
+        .limit(limit)
+    )
+    rows = (await session.execute(query)).all()
+    tracks = [
+        TrackWithDetails(
+            **row[0].__dict__,
+            artist_name=row.artist_name,
+            artist_image_url=row.artist_image_url,
+            album_title=row.album_title,
+            album_cover_url=row.album_cover_url,
+            genre_name=row.genre_name
+        )
+        for row in rows
+    ]
+    session.expunge_all()
+    return tracks
+
+
+async def projection_listing(session: AsyncSession, limit: int):
+    """Новый путь: Core-проекция колонок и предкомпилированный маппер"""
+    query = track_details_query().order_by(Track.popularity.desc()).limit(limit)
+    return rows_to_track_details((await session.execute(query)).all())
+
+
+async def seed(session: AsyncSession, rows: int):
+    session.add_all([Genre(id=1, name="Rock"), Artist(id=1, name="Artist", image_url="https://img/a.jpg")])
+    session.add(Album(id=1, title="Album", artist_id=1, cover_image_url="https://img/c.jpg"))
+    session.add_all([
+        Track(
+            id=i, title=f"Track {i}", artist_id=1, album_id=1, genre_id=1, duration_ms=200000,
+            explicit=False, popularity=i % 100, tempo=120.0, energy=0.5, valence=0.5,
+            danceability=0.5, created_at=datetime(2024, 1, 1)
+        )
+        for i in range(1, rows + 1)
+    ])
+    await session.commit()
+
+
+def measure_mapping(orm_rows, core_rows, rounds: int):
+    """Только преобразование строк в схемы, без обращения к базе"""
+    def orm_map():
+        return [
+            TrackWithDetails(
+                **row[0].__dict__,
+                artist_name=row.artist_name,
+                artist_image_url=row.artist_image_url,
+                album_title=row.album_title,
+                album_cover_url=row.album_cover_url,
+                genre_name=row.genre_name
+            )
+            for row in orm_rows
+        ]
+
+    for name, mapper in (("orm map", orm_map), ("mapper", lambda: rows_to_track_details(core_rows))):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            mapper()
+        print(f"{name:<12} {(time.perf_counter() - started) / rounds * 1000:8.3f} ms/call")
+
+
+async def measure(name: str, listing, session: AsyncSession, rows: int, rounds: int):
+    await listing(session, rows)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await listing(session, rows)
+    per_call_ms = (time.perf_counter() - started) / rounds * 1000
+
+    tracemalloc.start()
+    await listing(session, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<12} {per_call_ms:8.2f} ms/call   peak {peak / 1024:8.1f} KiB")
+
+
+async def main(rows: int, rounds: int):
+    path = tempfile.mktemp(suffix=".db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: Base.metadata.create_all(
+                sync_conn, tables=[Genre.__table__, Artist.__table__, Album.__table__, Track.__table__]
+            ))
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await seed(session, rows)
+            print(f"Listing {rows} tracks, {rounds} rounds")
+            await measure("orm", orm_listing, session, rows, rounds)
+            await measure("projection", projection_listing, session, rows, rounds)
+
+            orm_rows = (await session.execute(
+                select(
+                    Track,
+                    Artist.name.label("artist_name"),
+                    Artist.image_url.label("artist_image_url"),
+                    Album.title.label("album_title"),
+                    Album.cover_image_url.label("album_cover_url"),
+                    Genre.name.label("genre_name")
+                )
+                .outerjoin(Artist, Track.artist_id == Artist.id)
+                .outerjoin(Album, Track.album_id == Album.id)
+                .outerjoin(Genre, Track.genre_id == Genre.id)
+                .limit(rows)
+            )).all()
+            core_rows = (await session.execute(track_details_query().limit(rows))).all()
+            measure_mapping(orm_rows, core_rows, rounds)
+    finally:
+        await engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.rounds))
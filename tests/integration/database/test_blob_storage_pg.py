@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.models import Base, BlobReference, StorageBlob
+from app.services.blob_storage import BlobStorageService
+from app.services.storage_inventory import storage_inventory
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+TEST_SCHEMA = "blob_storage_test"
+SHA256 = hashlib.sha256(b"track").hexdigest()
+
+SEED_SQL = [
+    """INSERT INTO users (id, username, email, hashed_password, role, is_active) VALUES
+       (1, 'artist', 'artist@example.com', 'x', 'artist', true),
+       (2, 'listener', 'listener@example.com', 'x', 'listener', true),
+       (3, 'admin', 'admin@example.com', 'x', 'admin', true)""",
+    "INSERT INTO artists (id, user_id, name) VALUES (1, 1, 'Artist')",
+    "INSERT INTO tracks (id, title, artist_id) VALUES (1, 'Track', 1)",
+]
+
+
+class SlowStorage:
+    """S3 в памяти; копирование в blobs/ медленное, чтобы загрузки пересеклись"""
+
+    def __init__(self):
+        self.promotions = 0
+        self.deleted_blobs = []
+
+    async def promote_blob(self, staging_key, sha256, content_type):
+        self.promotions += 1
+        await asyncio.sleep(0.2)
+
+    async def delete_temp_object(self, s3_key):
+        return True
+
+    async def delete_blob(self, sha256):
+        self.deleted_blobs.append(sha256)
+        return True
+
+
+@pytest.mark.integration
+@pytest.mark.database
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+@pytest.mark.asyncio
+class TestBlobStoragePostgres:
+    """Блокировки, счетчик ссылок и сборка мусора блобов на настоящей PostgreSQL"""
+
+    @pytest_asyncio.fixture
+    async def engine(self):
+        """Отдельная схема, удаляется после теста"""
+        engine = create_async_engine(
+            TEST_POSTGRES_URL,
+            connect_args={"server_settings": {"search_path": f"{TEST_SCHEMA}, public"}}
+        )
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            for statement in SEED_SQL:
+                await conn.execute(text(statement))
+
+        yield engine
+
+        storage_inventory._drain()
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        await engine.dispose()
+
+    async def store(self, engine, storage, user_id, track_id=None):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            return await BlobStorageService(session, storage).store_staged(
+                f"staging/{user_id}", SHA256, 5, user_id, "track.mp3", "audio/mpeg", track_id=track_id
+            )
+
+    async def blob_row(self, engine):
+        async with AsyncSession(engine) as session:
+            return await session.get(StorageBlob, SHA256)
+
+    async def test_concurrent_identical_uploads_copy_once(self, engine):
+        """ON CONFLICT + FOR UPDATE: вторая загрузка ждет первую и только добавляет ссылку"""
+        storage = SlowStorage()
+
+        first, second = await asyncio.gather(self.store(engine, storage, 1), self.store(engine, storage, 2))
+
+        assert storage.promotions == 1
+        assert sorted([first.deduplicated, second.deduplicated]) == [False, True]
+        assert (await self.blob_row(engine)).refcount == 2
+        async with AsyncSession(engine) as session:
+            assert await session.scalar(select(func.count()).select_from(BlobReference)) == 2
+
+    async def test_release_marks_unreferenced(self, engine):
+        storage = SlowStorage()
+        await self.store(engine, storage, 1)
+        await self.store(engine, storage, 2)
+
+        async with AsyncSession(engine) as session:
+            assert await BlobStorageService(session, storage).release(SHA256, 1)
+        blob = await self.blob_row(engine)
+        assert (blob.refcount, blob.unreferenced_at) == (1, None)
+
+        async with AsyncSession(engine) as session:
+            assert await BlobStorageService(session, storage).release(SHA256, 2)
+            assert not await BlobStorageService(session, storage).release(SHA256, 2)
+        blob = await self.blob_row(engine)
+        assert blob.refcount == 0
+        assert blob.unreferenced_at is not None
+
+    async def test_gc_skips_locked_blob(self, engine):
+        """SKIP LOCKED: блоб, строка которого заблокирована новой ссылкой, не удаляется"""
+        storage = SlowStorage()
+        await self.store(engine, storage, 1)
+        async with AsyncSession(engine) as session:
+            await BlobStorageService(session, storage).release(SHA256, 1)
+
+        async with AsyncSession(engine) as locker:
+            await locker.execute(select(StorageBlob).where(StorageBlob.sha256 == SHA256).with_for_update())
+            async with AsyncSession(engine) as session:
+                assert await BlobStorageService(session, storage).collect_garbage(grace_hours=0) == 0
+            await locker.rollback()
+
+        async with AsyncSession(engine) as session:
+            assert await BlobStorageService(session, storage).collect_garbage(grace_hours=0) == 1
+        assert storage.deleted_blobs == [SHA256]
+        assert await self.blob_row(engine) is None
+
+    async def test_track_file_ignores_foreign_references(self, engine):
+        """Ссылка постороннего пользователя не подменяет файл трека, ссылка администратора — подменяет"""
+        storage = SlowStorage()
+        other = hashlib.sha256(b"other").hexdigest()
+        await self.store(engine, storage, 1, track_id=1)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(StorageBlob(sha256=other, size=5, refcount=2))
+            await session.flush()
+            session.add(BlobReference(blob_sha256=other, user_id=2, track_id=1, filename="x.mp3"))
+            await session.commit()
+            service = BlobStorageService(session, storage)
+
+            assert await service.track_blob(1) == SHA256
+            assert await service.track_blobs([1]) == {1: SHA256}
+
+            session.add(BlobReference(blob_sha256=other, user_id=3, track_id=1, filename="y.mp3"))
+            await session.commit()
+            assert await service.track_blob(1) == other
+
+            assert await service.can_attach(1, 1) is True
+            assert await service.can_attach(1, 2) is False
+            assert await service.can_attach(1, 3, is_admin=True) is True
+            assert await service.can_attach(999, 1) is None
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.models import Base, PlaylistTrack
+from app.services.track_service import TrackService
+from app.services.album_service import AlbumService
+from app.services.artist_service import ArtistService
+from app.services.analytics_service import AnalyticsService
+from tests.utils.query_audit import QueryPlanAudit
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+AUDIT_SCHEMA = "query_audit"
+LARGE_TABLES = {"tracks", "albums", "playlist_tracks", "listening_history"}
+
+SEED_SQL = [
+    """INSERT INTO users (id, username, email, hashed_password, role, is_active)
+       SELECT i, 'user' || i, 'user' || i || '@example.com', 'x', 'listener', true
+       FROM generate_series(1, 2000) i""",
+    """INSERT INTO artists (id, name) SELECT i, 'Artist ' || i FROM generate_series(1, 2000) i""",
+    """INSERT INTO genres (id, name) SELECT i, 'Genre ' || i FROM generate_series(1, 50) i""",
+    """INSERT INTO albums (id, title, artist_id, release_date)
+       SELECT i, 'Album ' || i, i % 2000 + 1, now() - i * interval '1 hour'
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO tracks (id, title, artist_id, album_id, genre_id, popularity)
+       SELECT i, 'Track ' || i, i % 2000 + 1, i % 20000 + 1, i % 50 + 1, i % 100
+       FROM generate_series(1, 200000) i""",
+    """INSERT INTO playlists (id, name, user_id) SELECT i, 'Playlist ' || i, i % 2000 + 1 FROM generate_series(1, 2000) i""",
+    """INSERT INTO playlist_tracks (id, playlist_id, track_id, position)
+       SELECT i, i % 2000 + 1, i % 200000 + 1, i / 2000 FROM generate_series(1, 100000) i""",
+    """INSERT INTO listening_history (id, user_id, track_id, played_at)
+       SELECT i, i % 2000 + 1, i % 200000 + 1, now() - i * interval '1 minute'
+       FROM generate_series(1, 300000) i""",
+    "ANALYZE",
+]
+
+
+@pytest.mark.integration
+@pytest.mark.database
+@pytest.mark.slow
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+class TestHotQueryPlans:
+    """Аудит планов горячих запросов каталога на засеянной PostgreSQL"""
+
+    @pytest_asyncio.fixture
+    async def seeded_engine(self):
+        """Отдельная схема с большими таблицами, удаляется после теста"""
+        engine = create_async_engine(
+            TEST_POSTGRES_URL,
+            connect_args={"server_settings": {"search_path": f"{AUDIT_SCHEMA}, public"}}
+        )
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {AUDIT_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {AUDIT_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            for statement in SEED_SQL[:-1]:
+                await conn.execute(text(statement))
+
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(SEED_SQL[-1]))
+
+        yield engine
+
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {AUDIT_SCHEMA} CASCADE"))
+        await engine.dispose()
+
+    async def test_hot_queries_use_indexes(self, seeded_engine):
+        """Горячие запросы не читают большие таблицы последовательным сканированием"""
+        audit = QueryPlanAudit(seeded_engine, LARGE_TABLES)
+
+        async with AsyncSession(seeded_engine, expire_on_commit=False) as session:
+            with audit.capture():
+                await TrackService(session).get_tracks_by_artist(42, limit=20)
+                await TrackService(session).get_tracks_by_album(123)
+                await TrackService(session).get_popular_tracks(limit=50)
+                await ArtistService(session).get_artist_tracks(42)
+                await AlbumService(session).get_albums_by_artist(42)
+                await AlbumService(session).get_recent_albums(limit=20)
+                await AnalyticsService(session).get_user_listening_history(7, limit=50)
+                await session.execute(
+                    select(PlaylistTrack).where(PlaylistTrack.playlist_id == 7).order_by(PlaylistTrack.position)
+                )
+
+        assert len(audit.statements) >= 8
+
+        async with seeded_engine.connect() as conn:
+            violations = await audit.seq_scans(conn)
+
+        assert violations == [], "\n".join(f"Seq Scan on {v['table']}: {v['statement']}" for v in violations)
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, select
+from sqlalchemy.dialects import postgresql
+
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor, next_keyset_cursor
+
+
+items = Table("items", MetaData(), Column("id", Integer, primary_key=True), Column("rank", Integer))
+
+
+@pytest.mark.unit
+class TestPaginationCursor:
+    """Тесты непрозрачных курсоров пагинации"""
+
+    def test_roundtrip(self):
+        """Курсор декодируется в исходное состояние"""
+        state = {"src": "pg", "after": [0.125, 42, 1001]}
+        cursor = encode_cursor(state)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == state
+
+    @pytest.mark.parametrize("cursor", ["not a cursor!", "bm90IGpzb24", encode_cursor({"a": 1})[:-2] + "$$"])
+    def test_invalid_cursor(self, cursor):
+        """Поврежденный курсор дает ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.unit
+class TestKeysetPagination:
+    """Тесты keyset-пагинации списков"""
+
+    def _sql(self, query):
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_first_page_is_ordered_without_filter(self):
+        """Без курсора запрос только сортируется по ключу"""
+        sql = self._sql(apply_keyset(select(items), [items.c.id], None))
+        assert "ORDER BY items.id" in sql
+        assert "WHERE" not in sql
+
+    def test_cursor_continues_after_last_key(self):
+        """Курсор превращается в условие строго после ключа, без OFFSET"""
+        page = [SimpleNamespace(id=5), SimpleNamespace(id=9)]
+        cursor = next_keyset_cursor(page, limit=2)
+        sql = self._sql(apply_keyset(select(items), [items.c.id], cursor))
+        assert "WHERE items.id > " in sql
+        assert "OFFSET" not in sql
+        assert decode_cursor(cursor) == {"k": [9]}
+
+    def test_composite_key(self):
+        """Составной ключ сравнивается как кортеж"""
+        cursor = encode_cursor({"k": [3, 7]})
+        sql = self._sql(apply_keyset(select(items), [items.c.rank, items.c.id], cursor))
+        assert "(items.rank, items.id) > (" in sql
+
+    def test_short_page_has_no_next_cursor(self):
+        """Неполная страница — последняя"""
+        assert next_keyset_cursor([SimpleNamespace(id=1)], limit=10) is None
+        assert next_keyset_cursor([], limit=10) is None
+
+    @pytest.mark.parametrize("payload", [{"k": [1, 2]}, {"k": 1}, {"after": [1]}])
+    def test_cursor_shape_mismatch(self, payload):
+        """Курсор с чужим ключом отклоняется"""
+        with pytest.raises(ValueError):
+            apply_keyset(select(items), [items.c.id], encode_cursor(payload))
+
+    @pytest.mark.parametrize("key", [["1"], [True], [None], [1.5], [2 ** 31], [[1]], [{"a": 1}]])
+    def test_cursor_value_type_mismatch(self, key):
+        """Значение курсора, которое не подходит столбцу ключа, отклоняется до запроса"""
+        with pytest.raises(ValueError):
+            apply_keyset(select(items), [items.c.id], encode_cursor({"k": key}))
@@ -0,0 +1,92 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+from uuid import UUID
+
+import orjson
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from app.core.responses import FastJSONResponse, PayloadCache
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+ITEMS = TypeAdapter(List[Item])
+
+
+@pytest.mark.unit
+class TestFastJSONResponse:
+    """Тесты orjson-ответа"""
+
+    def test_renders_non_native_types(self):
+        """datetime, UUID, Decimal и модели сериализуются без jsonable_encoder"""
+        response = FastJSONResponse({
+            "at": datetime(2024, 5, 1, 12, 30),
+            "id": UUID("12345678-1234-5678-1234-567812345678"),
+            "ratio": Decimal("0.25"),
+            "item": Item(id=1, name="a"),
+            1: "int key"
+        })
+        assert orjson.loads(response.body) == {
+            "at": "2024-05-01T12:30:00",
+            "id": "12345678-1234-5678-1234-567812345678",
+            "ratio": 0.25,
+            "item": {"id": 1, "name": "a"},
+            "1": "int key"
+        }
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPayloadCache:
+    """Тесты кэша сериализованных ответов"""
+
+    async def test_hit_returns_cached_bytes_and_headers(self):
+        """Повторный запрос не вызывает compute и отдает те же байты и заголовки"""
+        cache = PayloadCache(ttl_seconds=60, max_entries=10)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return [Item(id=1, name="a")]
+
+        first = await cache.get_or_render("k", compute, ITEMS, headers=lambda items: {"X-Count": str(len(items))})
+        second = await cache.get_or_render("k", compute, ITEMS)
+
+        assert len(calls) == 1
+        assert first.body == second.body == b'[{"id":1,"name":"a"}]'
+        assert second.headers["X-Count"] == "1"
+        assert second.media_type == "application/json"
+        assert cache.stats()["hits"] == 1
+
+    async def test_invalidate_by_tag(self):
+        """Изменение данных вытесняет ответы с тегом"""
+        cache = PayloadCache(ttl_seconds=60, max_entries=10)
+        names = iter(["a", "b"])
+
+        async def compute():
+            return [Item(id=1, name=next(names))]
+
+        await cache.get_or_render("k", compute, ITEMS, tags=["items"])
+        assert cache.invalidate("items") == 1
+        refreshed = await cache.get_or_render("k", compute, ITEMS, tags=["items"])
+        assert orjson.loads(refreshed.body) == [{"id": 1, "name": "b"}]
+
+    async def test_validates_orm_like_objects(self):
+        """Объекты с атрибутами сериализуются по схеме ответа, лишние поля отбрасываются"""
+        class Row:
+            id = 7
+            name = "row"
+            secret = "hidden"
+
+        cache = PayloadCache(ttl_seconds=60, max_entries=10)
+
+        async def compute():
+            return [Row()]
+
+        response = await cache.get_or_render("k", compute, ITEMS)
+        assert orjson.loads(response.body) == [{"id": 7, "name": "row"}]
@@ -0,0 +1,60 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.album_upload import MetadataMismatch, match_metadata, write_files
+
+
+def meta(file_name):
+    return SimpleNamespace(file_name=file_name, title=file_name.upper())
+
+
+class BrokenFile(io.BytesIO):
+    def read(self, size=-1):
+        raise OSError("disk error")
+
+
+@pytest.mark.unit
+class TestMatchMetadata:
+    """Тесты сопоставления файлов и метаданных"""
+
+    def test_order_follows_files(self):
+        matched = match_metadata(["b.mp3", "a.mp3"], [meta("a.mp3"), meta("b.mp3")])
+        assert [m.file_name for m in matched] == ["b.mp3", "a.mp3"]
+
+    def test_missing_metadata(self):
+        with pytest.raises(MetadataMismatch, match="c.mp3"):
+            match_metadata(["a.mp3", "c.mp3"], [meta("a.mp3")])
+
+    def test_duplicate_metadata(self):
+        with pytest.raises(MetadataMismatch, match="дважды"):
+            match_metadata(["a.mp3"], [meta("a.mp3"), meta("a.mp3")])
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestWriteFiles:
+    """Тесты параллельного копирования файлов альбома"""
+
+    async def test_copies_all_files_in_order(self, tmp_path):
+        contents = [bytes([i]) * (100_000 + i) for i in range(20)]
+        sources = [(f"track{i}.MP3", io.BytesIO(data)) for i, data in enumerate(contents)]
+        for _, source in sources:
+            source.seek(0, io.SEEK_END)
+
+        written = await write_files(sources, tmp_path / "tracks", concurrency=4, buffer_size=64 * 1024)
+
+        assert [w.source_name for w in written] == [name for name, _ in sources]
+        assert [w.size for w in written] == [len(data) for data in contents]
+        assert [w.path.read_bytes() for w in written] == contents
+        assert all(w.path.suffix == ".mp3" for w in written)
+        assert len({w.path for w in written}) == 20
+
+    async def test_failure_removes_written_files(self, tmp_path):
+        sources = [("a.mp3", io.BytesIO(b"a" * 10)), ("b.mp3", BrokenFile()), ("c.mp3", io.BytesIO(b"c"))]
+
+        with pytest.raises(OSError):
+            await write_files(sources, tmp_path, concurrency=2)
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,147 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.blob_storage import (
+    BlobStorageService, ChecksumMismatch, StoredBlob, blob_key, normalize_sha256, parse_blob_key
+)
+
+CONTENT = b"ID3" + b"\x00" * 1000
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+class FakeStorage:
+    """S3 в памяти: временные объекты и блобы"""
+
+    def __init__(self):
+        self.staged = {}
+        self.blobs = {}
+        self.promotions = 0
+
+    async def stage_stream(self, chunks, content_type, max_size=None):
+        data = b"".join([chunk async for chunk in chunks])
+        key = f"staging/{len(self.staged)}"
+        self.staged[key] = data
+        return SimpleNamespace(key=key, size=len(data), sha256=hashlib.sha256(data).hexdigest())
+
+    async def promote_blob(self, staging_key, sha256, content_type):
+        self.promotions += 1
+        self.blobs[sha256] = self.staged[staging_key]
+
+    async def delete_temp_object(self, s3_key):
+        self.staged.pop(s3_key, None)
+        return True
+
+
+class FakeSession:
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+class InMemoryBlobStorage(BlobStorageService):
+    """Строки storage_blobs и blob_references в словарях вместо PostgreSQL"""
+
+    def __init__(self, storage):
+        super().__init__(FakeSession(), storage=storage)
+        self.refcounts = {}
+        self.references = []
+
+    async def reference_existing(self, sha256, user_id, filename, track_id=None):
+        if (sha256, user_id) not in self.references:
+            return None
+        reference = await self._add_reference(sha256, user_id, filename, track_id)
+        return StoredBlob(sha256, 0, None, reference.id, deduplicated=True)
+
+    async def _lock_or_create(self, sha256, size, content_type):
+        created = sha256 not in self.refcounts
+        self.refcounts.setdefault(sha256, 0)
+        return created
+
+    async def _add_reference(self, sha256, user_id, filename, track_id):
+        self.refcounts[sha256] += 1
+        self.references.append((sha256, user_id))
+        return SimpleNamespace(id=len(self.references))
+
+
+async def chunks(data: bytes):
+    yield data[:100]
+    yield data[100:]
+
+
+async def untouched():
+    raise AssertionError("body must not be read")
+    yield b""
+
+
+@pytest.mark.unit
+class TestBlobKeys:
+    """Тесты ключей blobs/{sha256}"""
+
+    def test_roundtrip(self):
+        assert parse_blob_key(blob_key(SHA256)) == SHA256
+
+    @pytest.mark.parametrize("key", ["users/1/2026/10/18/ab_track.mp3", "blobs/xyz", "blobs/" + "A" * 63])
+    def test_foreign_keys(self, key):
+        """Ключи старого формата и некорректные хэши не считаются блобами"""
+        assert parse_blob_key(key) is None
+
+    def test_normalize_uppercase(self):
+        assert normalize_sha256(SHA256.upper()) == SHA256
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestBlobStorage:
+    """Тесты дедупликации при загрузке"""
+
+    async def test_duplicate_upload_not_copied(self):
+        """Второй одинаковый файл не копируется в blobs, временный объект удаляется"""
+        storage = FakeStorage()
+        service = InMemoryBlobStorage(storage)
+
+        first = await service.store_stream(chunks(CONTENT), 1, "a.mp3", "audio/mpeg")
+        second = await service.store_stream(chunks(CONTENT), 2, "b.mp3", "audio/mpeg")
+
+        assert first.sha256 == second.sha256 == SHA256
+        assert not first.deduplicated and second.deduplicated
+        assert storage.promotions == 1
+        assert service.refcounts[SHA256] == 2
+        assert storage.staged == {}
+
+    async def test_known_hash_skips_body(self):
+        """С хэшем файла, который пользователь уже загружал, тело запроса не читается"""
+        storage = FakeStorage()
+        service = InMemoryBlobStorage(storage)
+        await service.store_stream(chunks(CONTENT), 1, "a.mp3", "audio/mpeg")
+
+        stored = await service.store_stream(untouched(), 1, "b.mp3", "audio/mpeg", expected_sha256=SHA256)
+        assert stored.deduplicated
+        assert service.refcounts[SHA256] == 2
+
+    async def test_foreign_hash_requires_body(self):
+        """Хэш чужого файла не дает ссылку: тело загружается и хэшируется сервером"""
+        storage = FakeStorage()
+        service = InMemoryBlobStorage(storage)
+        await service.store_stream(chunks(CONTENT), 1, "a.mp3", "audio/mpeg")
+
+        with pytest.raises(AssertionError, match="body must not be read"):
+            await service.store_stream(untouched(), 2, "b.mp3", "audio/mpeg", expected_sha256=SHA256)
+
+        stored = await service.store_stream(chunks(CONTENT), 2, "b.mp3", "audio/mpeg", expected_sha256=SHA256)
+        assert stored.deduplicated
+        assert storage.promotions == 1
+        assert service.references == [(SHA256, 1), (SHA256, 2)]
+
+    async def test_checksum_mismatch(self):
+        """Несовпадение заявленного хэша отклоняет загрузку без записи блоба"""
+        storage = FakeStorage()
+        service = InMemoryBlobStorage(storage)
+
+        with pytest.raises(ChecksumMismatch):
+            await service.store_stream(chunks(CONTENT), 1, "a.mp3", "audio/mpeg", expected_sha256="0" * 64)
+        assert storage.blobs == {}
+        assert storage.staged == {}
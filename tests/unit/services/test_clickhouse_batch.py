@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from app.services.clickhouse_service import ClickHouseService
+
+
+class SingleQueryClient:
+    """Клиент, который, как clickhouse_driver.Client, не допускает одновременных запросов"""
+
+    def __init__(self):
+        self.active = False
+        self.rows = 0
+
+    def execute(self, query, data):
+        if self.active:
+            raise RuntimeError("Simultaneous queries on single connection detected")
+        self.active = True
+        time.sleep(0.02)
+        self.rows += len(data)
+        self.active = False
+
+
+def event(track_id):
+    return {'played_at': datetime(2026, 10, 19), 'track_id': track_id, 'user_id': 1}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestListeningEventsBatch:
+    """Тесты пакетной вставки прослушиваний в ClickHouse"""
+
+    async def test_concurrent_batches_do_not_share_connection(self):
+        """Пачки из разных запросов выполняются на клиенте пакетов по одной"""
+        service = ClickHouseService.__new__(ClickHouseService)
+        service.client = object()
+        service.batch_client = SingleQueryClient()
+        service._batch_lock = threading.Lock()
+
+        inserted = await asyncio.gather(*(service.insert_listening_events([event(i), event(i)]) for i in range(5)))
+
+        assert inserted == [2] * 5
+        assert service.batch_client.rows == 10
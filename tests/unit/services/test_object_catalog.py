@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.object_catalog import ObjectCatalogService, parse_user_key
+
+
+class PagedStorage:
+    """Bucket, отдающий листинг страницами по continuation token"""
+
+    tracks_bucket = "tracks"
+
+    def __init__(self, keys, page_size):
+        self.keys = keys
+        self.page_size = page_size
+        self.calls = []
+
+    async def list_objects_page(self, bucket, prefix, continuation_token, max_keys):
+        self.calls.append(continuation_token)
+        start = int(continuation_token or 0)
+        page = [
+            {'Key': key, 'Size': 10, 'ETag': '"e"', 'LastModified': datetime(2026, 1, 1, tzinfo=timezone.utc)}
+            for key in self.keys[start:start + self.page_size] if key.startswith(prefix)
+        ]
+        end = start + self.page_size
+        return page, str(end) if end < len(self.keys) else None
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    async def execute(self, statement):
+        return SimpleNamespace(rowcount=0)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class RecordingCatalog(ObjectCatalogService):
+    def __init__(self, storage):
+        super().__init__(FakeSession(), storage=storage)
+        self.rows = []
+
+    async def _upsert(self, rows):
+        self.rows.extend(rows)
+
+
+@pytest.mark.unit
+class TestUserKeys:
+    """Тесты разбора старых ключей"""
+
+    def test_parse(self):
+        assert parse_user_key("users/7/2025/06/01/0123abcd_song.mp3") == (7, "song.mp3")
+
+    @pytest.mark.parametrize("key", ["blobs/" + "a" * 64, "users/x/song.mp3", "users/7/"])
+    def test_foreign(self, key):
+        assert parse_user_key(key) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestReconcile:
+    """Тесты сверки каталога с S3"""
+
+    async def test_walks_all_pages(self):
+        """Все страницы проходятся по токену, строки каталога строятся из листинга без head_object"""
+        keys = [f"users/1/2026/01/01/0000000{i}_t{i}.flac" for i in range(5)]
+        storage = PagedStorage(keys, page_size=2)
+        catalog = RecordingCatalog(storage)
+
+        result = await catalog.reconcile()
+
+        assert storage.calls == [None, "2", "4"]
+        assert result == {'scanned': 5, 'removed': 0}
+        assert [row['filename'] for row in catalog.rows] == [f"t{i}.flac" for i in range(5)]
+        assert catalog.rows[0]['content_type'] == "audio/flac"
+        assert catalog.rows[0]['last_modified'].tzinfo is None
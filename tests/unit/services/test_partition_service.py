@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from app.services.partition_service import add_months, archive_key, parse_partition_name, partition_name
+
+
+@pytest.mark.unit
+class TestPartitionNaming:
+    """Тесты имен и границ месячных партиций"""
+
+    @pytest.mark.parametrize("month, offset, expected", [
+        (date(2026, 10, 1), 3, date(2027, 1, 1)),
+        (date(2026, 1, 1), -13, date(2024, 12, 1)),
+        (date(2026, 12, 1), 1, date(2027, 1, 1)),
+    ])
+    def test_add_months(self, month, offset, expected):
+        """Сдвиг по месяцам переходит через границу года"""
+        assert add_months(month, offset) == expected
+
+    def test_name_roundtrip(self):
+        """Имя партиции разбирается обратно в месяц"""
+        name = partition_name(date(2024, 2, 1))
+        assert name == "listening_history_p202402"
+        assert parse_partition_name(name) == date(2024, 2, 1)
+
+    @pytest.mark.parametrize("name", ["listening_history_default", "listening_history", "listening_history_p2024"])
+    def test_foreign_names_ignored(self, name):
+        """DEFAULT-партиция и посторонние таблицы не считаются месячными"""
+        assert parse_partition_name(name) is None
+
+    def test_archive_key(self):
+        """Архив раскладывается по году и месяцу"""
+        assert archive_key(date(2024, 2, 1)) == "listening_history/2024/02.csv.gz"
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.responses import payload_cache
+from app.db.models import Track, Album
+from app.services.play_counters import PlayCounters
+from app.services.track_service import POPULAR_TRACKS_TAG
+
+
+class FakeSession:
+    """Сессия, которая запоминает запросы и может упасть на execute"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.statements = []
+        self.committed = False
+        self.rolled_back = False
+
+    async def execute(self, statement, *args):
+        if self.fail:
+            raise RuntimeError("connection lost")
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.unit
+class TestPlayCounters:
+    """Тесты счетчиков прослушиваний с отложенной записью"""
+
+    def test_record_aggregates(self):
+        """Прослушивания складываются по трекам, альбомам и исполнителям"""
+        counters = PlayCounters()
+        counters.record(1, album_id=10, artist_id=100)
+        counters.record(1, album_id=10, artist_id=100)
+        counters.record(2, album_id=None, artist_id=100)
+
+        assert counters.pending() == 4
+        assert counters.stats()["recorded_plays"] == 3
+
+    @pytest.mark.asyncio
+    async def test_flush_one_statement_per_table(self):
+        """Один UPDATE на таблицу, очередь после flush пуста"""
+        counters = PlayCounters()
+        counters.record(1, album_id=10, artist_id=100)
+        counters.record(2, album_id=10, artist_id=100)
+        session = FakeSession()
+
+        assert await counters.flush(session) == 4
+        assert len(session.statements) == 3
+        assert session.committed
+        assert counters.pending() == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_restores_deltas(self):
+        """При ошибке приращения возвращаются и попадут в следующий flush"""
+        counters = PlayCounters()
+        counters.record(1, album_id=10)
+        with pytest.raises(RuntimeError):
+            await counters.flush(FakeSession(fail=True))
+
+        assert counters.pending() == 2
+        assert counters.stats()["flush_errors"] == 1
+
+        counters.record(1)
+        session = FakeSession()
+        await counters.flush(session)
+        sql = str(session.statements[0].compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        ))
+        assert "(1, 2)" in sql
+
+    def test_update_from_values(self):
+        """Приращения передаются через VALUES, счет трека пересчитывается в popularity"""
+        statement = PlayCounters()._update_statement(Track, [(1, 3), (2, 5)], datetime(2026, 10, 18))
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert "FROM (VALUES" in sql
+        assert "popularity=" in sql.replace(" ", "")
+
+        assert "WHEN (tracks.score_updated_at IS NULL) THEN exp(coalesce(tracks.popularity" in sql
+
+        album_sql = str(PlayCounters()._update_statement(Album, [(1, 3)], datetime(2026, 10, 18))
+                        .compile(dialect=postgresql.dialect()))
+        assert "popularity=" not in album_sql.replace(" ", "")
+
+    @pytest.mark.asyncio
+    async def test_flush_invalidates_popular_tracks(self, monkeypatch):
+        """После записи счетов треков кэш /tracks/popular/ вытесняется"""
+        invalidated = []
+        monkeypatch.setattr(payload_cache, "invalidate", invalidated.append)
+        counters = PlayCounters()
+
+        counters.record(1)
+        await counters.flush(FakeSession())
+        await counters.flush(FakeSession())
+
+        assert invalidated == [POPULAR_TRACKS_TAG]
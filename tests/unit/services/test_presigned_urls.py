@@ -0,0 +1,82 @@
+import pytest
+
+from app.services import presigned_urls
+from app.services.presigned_urls import PresignedUrlCache
+from app.services.s3_async import AsyncS3Service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class SigningS3Service:
+    """Сервис, считающий подписанные URL"""
+
+    tracks_bucket = "tracks"
+
+    def __init__(self):
+        self.url_cache = PresignedUrlCache(ttl_ratio=0.5, max_entries=100)
+        self.signed = []
+
+    def sign_track_urls(self, s3_keys, expires_in):
+        self.signed.extend(s3_keys)
+        return {key: f"https://s3/{key}?expires={expires_in}&n={len(self.signed)}" for key in s3_keys}
+
+
+@pytest.mark.unit
+class TestPresignedUrlCache:
+    """Тесты кэша presigned URL"""
+
+    def test_reuse_until_half_lifetime(self, monkeypatch):
+        """URL переиспользуется только первую половину срока действия"""
+        clock = FakeClock()
+        monkeypatch.setattr(presigned_urls.time, "monotonic", clock)
+        cache = PresignedUrlCache(ttl_ratio=0.5, max_entries=10)
+        cache.put_many("tracks", {"a": "url-a"}, expires_in=3600)
+
+        clock.now += 1799
+        assert cache.get_many("tracks", ["a"], 3600) == ({"a": "url-a"}, [])
+        clock.now += 2
+        assert cache.get_many("tracks", ["a"], 3600) == ({}, ["a"])
+
+    def test_key_includes_expiry_and_bucket(self):
+        cache = PresignedUrlCache(ttl_ratio=0.5, max_entries=10)
+        cache.put_many("tracks", {"a": "url-a"}, expires_in=3600)
+
+        assert cache.get_many("tracks", ["a"], 60)[1] == ["a"]
+        assert cache.get_many("covers", ["a"], 3600)[1] == ["a"]
+
+    def test_invalidate_and_lru(self):
+        cache = PresignedUrlCache(ttl_ratio=0.5, max_entries=2)
+        cache.put_many("tracks", {"a": "1", "b": "2"}, expires_in=3600)
+        cache.put_many("tracks", {"a": "1"}, expires_in=60)
+        cache.invalidate("tracks", "a")
+        cache.put_many("tracks", {"c": "3"}, expires_in=3600)
+
+        found, missing = cache.get_many("tracks", ["a", "b", "c"], 3600)
+        assert found == {"b": "2", "c": "3"}
+        assert missing == ["a"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestBulkSigning:
+    """Тесты подписи URL списком"""
+
+    async def test_only_missing_keys_signed(self):
+        """Повторный запрос альбома не подписывает URL заново"""
+        service = SigningS3Service()
+        facade = AsyncS3Service(service)
+        keys = [f"blobs/{i}" for i in range(40)]
+
+        first = await facade.get_track_urls(keys)
+        second = await facade.get_track_urls(keys[:10] + ["blobs/new"])
+
+        assert list(first) == keys
+        assert len(service.signed) == 41
+        assert second["blobs/3"] == first["blobs/3"]
+        assert list(second) == keys[:10] + ["blobs/new"]
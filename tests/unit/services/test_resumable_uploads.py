@@ -0,0 +1,141 @@
+import hashlib
+
+import pytest
+
+from app.db.models import ResumableUpload
+from app.services import resumable_uploads
+from app.services.resumable_uploads import MAX_PARTS, ResumableUploadService, UploadConflict, part_size_for
+from app.services.s3_multipart import UploadTooLarge
+
+DATA = bytes(range(256)) * 4
+
+
+class FakePartStorage:
+    """Части multipart upload в памяти"""
+
+    def __init__(self):
+        self.parts = {}
+
+    async def upload_staging_part(self, staging_key, upload_id, part_number, body):
+        self.parts[part_number] = body
+        return f'"etag-{part_number}"'
+
+
+class RecordingUploads(ResumableUploadService):
+    def __init__(self, storage):
+        super().__init__(db=None, storage=storage)
+        self.saved = []
+
+    async def _save_progress(self, upload, received_bytes, parts):
+        self.saved.append(received_bytes)
+        upload.received_bytes = received_bytes
+        upload.parts = parts
+
+
+class LeaseLostUploads(RecordingUploads):
+    """Аренду перехватывает другой запрос после lost_after сохраненных частей"""
+
+    def __init__(self, storage, lost_after):
+        super().__init__(storage)
+        self.lost_after = lost_after
+
+    async def _save_progress(self, upload, received_bytes, parts):
+        if len(self.saved) == self.lost_after:
+            raise UploadConflict("Upload lease expired and was taken by another request")
+        await super()._save_progress(upload, received_bytes, parts)
+
+
+def new_upload(total_size=len(DATA), part_size=100):
+    return ResumableUpload(
+        id="u1", staging_key="staging/u1", s3_upload_id="s3-u1",
+        total_size=total_size, part_size=part_size, received_bytes=0, parts=[]
+    )
+
+
+async def chunked(data, size=37, fail_after=None):
+    for start in range(0, len(data), size):
+        if fail_after is not None and start >= fail_after:
+            raise ConnectionResetError("client went away")
+        yield data[start:start + size]
+
+
+@pytest.fixture(autouse=True)
+def clean_hash_states():
+    resumable_uploads._hash_states.clear()
+    yield
+    resumable_uploads._hash_states.clear()
+
+
+@pytest.mark.unit
+def test_part_size_respects_part_limit():
+    assert part_size_for(1024) >= 5 * 1024 * 1024
+    assert part_size_for(200 * 1024 ** 3) * MAX_PARTS >= 200 * 1024 ** 3
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestReceive:
+    """Тесты приема байтов возобновляемой загрузки"""
+
+    async def test_whole_file_in_one_patch(self):
+        """Тело режется на части part_size, последняя часть короче"""
+        storage = FakePartStorage()
+        upload = new_upload()
+
+        await RecordingUploads(storage)._receive(upload, chunked(DATA))
+
+        assert upload.received_bytes == len(DATA)
+        assert [part['PartNumber'] for part in upload.parts] == list(range(1, 12))
+        assert len(storage.parts[11]) == len(DATA) % 100
+        assert b"".join(storage.parts[n] for n in sorted(storage.parts)) == DATA
+        assert resumable_uploads._hash_states["u1"][1].hexdigest() == hashlib.sha256(DATA).hexdigest()
+
+    async def test_resume_after_disconnect(self):
+        """После обрыва засчитаны только целые части; продолжение не пересылает принятое"""
+        storage = FakePartStorage()
+        upload = new_upload()
+        service = RecordingUploads(storage)
+
+        with pytest.raises(ConnectionResetError):
+            await service._receive(upload, chunked(DATA, fail_after=450))
+
+        assert upload.received_bytes == 400
+        assert service.saved == [100, 200, 300, 400]
+
+        await service._receive(upload, chunked(DATA[upload.received_bytes:]))
+
+        assert upload.received_bytes == len(DATA)
+        assert [part['PartNumber'] for part in upload.parts] == list(range(1, 12))
+        assert b"".join(storage.parts[n] for n in sorted(storage.parts)) == DATA
+        assert resumable_uploads._hash_states["u1"][1].hexdigest() == hashlib.sha256(DATA).hexdigest()
+
+    async def test_resume_in_other_process_drops_hash(self):
+        """Без хэша принятого префикса SHA-256 будет посчитан при завершении"""
+        upload = new_upload()
+        upload.received_bytes = 400
+        upload.parts = [{'PartNumber': n, 'ETag': '"e"'} for n in range(1, 5)]
+
+        await RecordingUploads(FakePartStorage())._receive(upload, chunked(DATA[400:]))
+
+        assert upload.received_bytes == len(DATA)
+        assert "u1" not in resumable_uploads._hash_states
+
+    async def test_longer_than_declared(self):
+        upload = new_upload(total_size=150)
+
+        with pytest.raises(UploadTooLarge):
+            await RecordingUploads(FakePartStorage())._receive(upload, chunked(DATA))
+
+        assert upload.received_bytes == 100
+
+    async def test_lost_lease_stops_writing(self):
+        """Опоздавший запрос не сохраняет части и хэш после перехвата аренды"""
+        upload = new_upload()
+        service = LeaseLostUploads(FakePartStorage(), lost_after=2)
+
+        with pytest.raises(UploadConflict):
+            await service._receive(upload, chunked(DATA))
+
+        assert service.saved == [100, 200]
+        assert upload.received_bytes == 200
+        assert "u1" not in resumable_uploads._hash_states
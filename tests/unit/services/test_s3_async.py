@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.s3_async import AsyncS3Service, run_s3
+
+
+class SlowS3Service:
+    """Синхронный сервис, метаданные которого отвечают с задержкой"""
+
+    endpoint_url = "http://minio:9000"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.threads = set()
+
+    def get_track_metadata(self, s3_key):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return {'size': 1, 'metadata': {}}
+
+    def get_track_url(self, s3_key, expires_in=3600):
+        return f"{self.endpoint_url}/tracks/{s3_key}?expires={expires_in}"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAsyncS3Service:
+    """Тесты асинхронного фасада S3"""
+
+    async def test_runs_on_s3_pool(self):
+        """Блокирующий вызов выполняется в потоке пула s3, а не в event loop"""
+        service = SlowS3Service(delay=0.01)
+        result = await AsyncS3Service(service).get_track_metadata("k")
+
+        assert result['size'] == 1
+        assert all(name.startswith("s3") for name in service.threads)
+
+    async def test_operation_timeout(self):
+        """Медленный вызов ограничен таймаутом операции"""
+        facade = AsyncS3Service(SlowS3Service(delay=0.5), operation_timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await facade.get_track_metadata("k")
+
+    async def test_loop_stays_responsive(self):
+        """Пока пул занят, event loop продолжает обслуживать другие задачи"""
+        started = time.monotonic()
+        slow = asyncio.create_task(run_s3(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        assert time.monotonic() - started < 0.2
+        await slow
+
+    async def test_url_signing_inline(self):
+        """Подпись URL не уходит в пул"""
+        facade = AsyncS3Service(SlowS3Service(delay=0))
+        assert facade.get_track_url("a.mp3", 60).endswith("a.mp3?expires=60")
+        assert facade.endpoint_url == "http://minio:9000"
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+
+import pytest
+
+from app.services.s3_multipart import MIN_PART_SIZE, UploadTooLarge, stream_upload
+
+
+class FakeS3Client:
+    """Клиент boto3 в памяти; upload_part может падать на заданной части"""
+
+    def __init__(self, fail_part: int = None):
+        self.fail_part = fail_part
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.parts = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+        return {'ETag': '"put"'}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == self.fail_part:
+            raise ConnectionError("part failed")
+        with self.lock:
+            self.parts[PartNumber] = Body
+        return {'ETag': f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        numbers = [part['PartNumber'] for part in MultipartUpload['Parts']]
+        self.objects[(Bucket, Key)] = b"".join(self.parts[number] for number in numbers)
+        return {'ETag': '"multi-3"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+
+async def chunked(data: bytes, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestStreamUpload:
+    """Тесты потоковой multipart-загрузки"""
+
+    async def test_small_file_single_put(self):
+        """Файл меньше части загружается одним PUT"""
+        client = FakeS3Client()
+        data = b"x" * 1000
+
+        result = await stream_upload(client, "tracks", "k", chunked(data))
+        assert client.objects[("tracks", "k")] == data
+        assert not client.parts
+        assert result.size == 1000
+        assert result.md5 == hashlib.md5(data).hexdigest()
+
+    async def test_parts_reassemble(self):
+        """Части собираются в исходный файл, хэш считается по ходу"""
+        client = FakeS3Client()
+        data = bytes(range(256)) * (MIN_PART_SIZE * 2 // 256 + 100)
+
+        result = await stream_upload(client, "tracks", "k", chunked(data), part_size=MIN_PART_SIZE, concurrency=2)
+        assert len(client.parts) == 3
+        assert client.objects[("tracks", "k")] == data
+        assert result.md5 == hashlib.md5(data).hexdigest()
+        assert result.etag == "multi-3"
+
+    async def test_size_limit_aborts(self):
+        """Превышение лимита отменяет multipart-загрузку"""
+        client = FakeS3Client()
+        data = b"x" * (MIN_PART_SIZE + 10)
+
+        with pytest.raises(UploadTooLarge):
+            await stream_upload(client, "tracks", "k", chunked(data), max_size=MIN_PART_SIZE + 1, part_size=MIN_PART_SIZE)
+        assert client.aborted == ["upload-1"]
+        assert ("tracks", "k") not in client.objects
+
+    async def test_part_failure_aborts(self):
+        """Ошибка части отменяет загрузку и пробрасывается"""
+        client = FakeS3Client(fail_part=1)
+        data = b"x" * (MIN_PART_SIZE * 3)
+
+        with pytest.raises(ConnectionError):
+            await stream_upload(client, "tracks", "k", chunked(data), part_size=MIN_PART_SIZE, concurrency=1)
+        assert client.aborted == ["upload-1"]
@@ -0,0 +1,57 @@
+import pytest
+
+from app.schemas.track import TrackSearchResponse
+from app.services.search_cache import SearchCache, MemorySearchCacheBackend, make_cache_key
+
+
+def _response(*track_ids):
+    return TrackSearchResponse(tracks=[], total=len(track_ids), limit=10, offset=0)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSearchCache:
+    """Тесты кэша ответов поиска"""
+
+    @pytest.fixture
+    def cache(self):
+        return SearchCache(MemorySearchCacheBackend(max_entries=2), ttl_seconds=60)
+
+    async def test_normalized_queries_share_entry(self, cache):
+        """Регистр, пробелы и Unicode-формы дают один ключ"""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return _response(1)
+
+        for query in ["Queen  Bohemian", "queen bohemian", "ＱＵＥＥＮ bohemian"]:
+            await cache.get_or_compute("tracks", {"query": query}, TrackSearchResponse, compute, lambda r: ["track:1"])
+
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["hit_ratio"] == pytest.approx(2 / 3, abs=1e-3)
+
+    async def test_invalidate_by_entity(self, cache):
+        """Обновление сущности вытесняет ответы, где она встречалась"""
+        async def compute():
+            return _response(1)
+
+        await cache.get_or_compute("tracks", {"query": "a"}, TrackSearchResponse, compute, lambda r: ["track:1", "artist:5"])
+        await cache.get_or_compute("tracks", {"query": "b"}, TrackSearchResponse, compute, lambda r: ["track:2"])
+        await cache.invalidate("artist", 5)
+
+        assert await cache.backend.get(make_cache_key("tracks", {"query": "a"})) is None
+        assert await cache.backend.get(make_cache_key("tracks", {"query": "b"})) is not None
+        assert cache.stats()["invalidated_entries"] == 1
+
+    async def test_lru_eviction(self, cache):
+        """При переполнении вытесняется давно не использованный ответ"""
+        async def compute():
+            return _response()
+
+        for query in ["a", "b", "a", "c"]:
+            await cache.get_or_compute("tracks", {"query": query}, TrackSearchResponse, compute, lambda r: [])
+
+        assert await cache.backend.get(make_cache_key("tracks", {"query": "b"})) is None
+        assert await cache.backend.get(make_cache_key("tracks", {"query": "a"})) is not None
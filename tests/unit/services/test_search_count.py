@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.db.models import Track
+from app.services.search_service import ExplainJson
+
+
+@pytest.mark.unit
+class TestExplainJson:
+    """Тесты оценки числа результатов через EXPLAIN"""
+
+    def test_search_text_stays_bound(self):
+        """Текст запроса уходит параметром, а не вставляется в SQL"""
+        text = "o'brien'); DROP TABLE tracks; --"
+        compiled = ExplainJson(select(Track.id).where(Track.title.ilike(f"%{text}%"))).compile(
+            dialect=asyncpg.dialect()
+        )
+
+        assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT tracks.id")
+        assert "DROP" not in str(compiled)
+        assert list(compiled.params.values()) == [f"%{text}%"]
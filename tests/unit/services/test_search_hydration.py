@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import search_hydration
+from app.services.search_hydration import HydrationCache, SearchHydrator
+
+
+def track(track_id, artist_id=1, album_id=None, genre_id=None):
+    return SimpleNamespace(id=track_id, artist_id=artist_id, album_id=album_id, genre_id=genre_id)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class CountingSessions:
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return FakeSession()
+
+
+@pytest.fixture
+def fetchers(monkeypatch):
+    """Выборки отдают сущности в обратном порядке и с задержкой, обратной числу ID"""
+    calls = []
+
+    def fake(kind, build):
+        async def fetch(session, ids):
+            calls.append((kind, session, list(ids)))
+            await asyncio.sleep(0.01 / len(ids))
+            return {entity_id: build(entity_id) for entity_id in reversed(ids)}
+        return fetch
+
+    monkeypatch.setattr(search_hydration, "fetch_tracks_with_details", fake("track", lambda i: track(i, artist_id=i)))
+    monkeypatch.setattr(search_hydration, "fetch_artists", fake("artist", lambda i: SimpleNamespace(id=i)))
+    monkeypatch.setattr(search_hydration, "fetch_albums", fake("album", lambda i: SimpleNamespace(id=i, artist_id=1)))
+    return calls
+
+
+@pytest.mark.unit
+class TestHydrationCache:
+    """Тесты кэша гидратации"""
+
+    def test_artist_update_evicts_dependent_tracks_and_albums(self):
+        """Имя артиста скопировано в треки и альбомы: их записи вытесняются вместе с артистом"""
+        cache = HydrationCache(ttl_seconds=60, max_entries=100)
+        cache.put_many("track", {1: track(1, artist_id=7, album_id=3), 2: track(2, artist_id=8, album_id=3)})
+        cache.put_many("album", {3: SimpleNamespace(id=3, artist_id=7)})
+        cache.put_many("artist", {7: SimpleNamespace(id=7)})
+
+        cache.invalidate("artist", 7)
+
+        found, missing = cache.get_many("track", [1, 2])
+        assert (list(found), missing) == ([2], [1])
+        assert cache.get_many("album", [3])[1] == [3]
+        assert cache.get_many("artist", [7])[1] == [7]
+
+        cache.invalidate("album", 3)
+        assert cache.get_many("track", [2])[1] == [2]
+        assert cache._dependents == {}
+
+    def test_eviction_drops_dependency_links(self):
+        """Вытесненные по LRU записи не остаются в обратном индексе"""
+        cache = HydrationCache(ttl_seconds=60, max_entries=2)
+        cache.put_many("track", {i: track(i, artist_id=i) for i in range(5)})
+
+        assert len(cache._entries) == 2
+        assert set(cache._dependents) == {("artist", 3), ("artist", 4)}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSearchHydrator:
+    """Тесты параллельной гидратации результатов поиска"""
+
+    async def test_results_follow_search_order(self, fetchers):
+        """Порядок ответа — порядок ID из поиска, а не выборок и не завершения задач"""
+        hydrator = SearchHydrator(CountingSessions(), HydrationCache(ttl_seconds=60, max_entries=100))
+        hydrator.cache.put_many("track", {5: track(5)})
+
+        tracks, artists, albums = await hydrator.hydrate([3, 5, 1, 42], [9, 2], [4])
+
+        assert [t.id for t in tracks] == [3, 5, 1, 42]
+        assert [a.id for a in artists] == [9, 2]
+        assert [a.id for a in albums] == [4]
+        assert [ids for kind, _, ids in fetchers if kind == "track"] == [[3, 1, 42]]
+
+    async def test_request_session_used_first(self, fetchers):
+        """Первая выборка идет в сессии запроса; при теплом кэше сессии не открываются"""
+        sessions = CountingSessions()
+        hydrator = SearchHydrator(sessions, HydrationCache(ttl_seconds=60, max_entries=100))
+        request_session = object()
+
+        await hydrator.hydrate([1], [2], [3], db=request_session)
+        assert sessions.opened == 2
+        assert fetchers[0][:2] == ("track", request_session)
+
+        await hydrator.hydrate([1], [2], [3], db=request_session)
+        assert sessions.opened == 2
+        assert len(fetchers) == 3
@@ -0,0 +1,80 @@
+import pytest
+
+from app.core.pagination import decode_cursor
+from app.schemas.track import TrackSearchQuery
+from app.services.search_service import SearchService
+
+
+class FakeElasticsearch:
+    """Индекс из total документов; запоминает запросы и открытые PIT"""
+
+    def __init__(self, total):
+        self.total = total
+        self.searches = []
+        self.opened = 0
+
+    async def open_point_in_time(self, index, keep_alive):
+        self.opened += 1
+        return {"id": f"pit-{self.opened}"}
+
+    async def search(self, size, from_=0, search_after=None, **params):
+        self.searches.append(dict(params, size=size, from_=from_, search_after=search_after))
+        start = search_after[0] + 1 if search_after else from_
+        hits = [
+            {"_source": {"id": i}, "sort": [i]}
+            for i in range(start, min(start + size, self.total))
+        ]
+        response = {"hits": {"hits": hits, "total": {"value": self.total, "relation": "eq"}}}
+        if "pit" in params:
+            response["pit_id"] = params["pit"]["id"]
+        return response
+
+
+def search_service(es):
+    service = SearchService.__new__(SearchService)
+    service.es = es
+
+    async def details(track_ids):
+        return []
+
+    service._get_tracks_with_details = details
+    return service
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSearchPointInTime:
+    """Тесты открытия PIT в поиске через Elasticsearch"""
+
+    async def test_single_page_opens_no_pit(self):
+        """Результат уместился в страницу: PIT не открывается, курсора нет"""
+        es = FakeElasticsearch(total=3)
+
+        response = await search_service(es).search_tracks_elasticsearch(TrackSearchQuery(query="a", limit=3))
+
+        assert response.next_cursor is None
+        assert es.opened == 0
+        assert es.searches[0]["index"] == "tracks"
+
+    async def test_next_page_continues_in_pit(self):
+        """PIT открывается для курсора; вторая страница продолжает с from, третья — по search_after"""
+        es = FakeElasticsearch(total=7)
+        service = search_service(es)
+
+        first = await service.search_tracks_elasticsearch(TrackSearchQuery(query="a", limit=3))
+        assert es.opened == 1
+        assert decode_cursor(first.next_cursor) == {"src": "es", "pit": "pit-1", "from": 3}
+
+        second = await service.search_tracks_elasticsearch(
+            TrackSearchQuery(query="a", limit=3, cursor=first.next_cursor)
+        )
+        assert es.searches[1]["pit"]["id"] == "pit-1"
+        assert es.searches[1]["from_"] == 3
+        assert decode_cursor(second.next_cursor)["after"] == [5]
+
+        third = await service.search_tracks_elasticsearch(
+            TrackSearchQuery(query="a", limit=3, cursor=second.next_cursor)
+        )
+        assert es.searches[2]["search_after"] == [5]
+        assert third.next_cursor is None
+        assert es.opened == 1
@@ -0,0 +1,143 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.storage_inventory import StorageInventory, inventory_prefix
+
+BLOBS = [f"blobs/{char}{i:063d}" for char in "0123456789abcdef" for i in range(3)]
+
+
+class FakeBucketStorage:
+    """Bucket в памяти с листингом по префиксу и страницами по два ключа"""
+
+    buckets = ["tracks"]
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.listed_prefixes = []
+
+    async def list_top_level(self, bucket):
+        prefixes = sorted({key.split("/")[0] + "/" for key in self.objects if "/" in key})
+        root = [size for key, size in self.objects.items() if "/" not in key]
+        return prefixes, len(root), sum(root)
+
+    async def list_objects_page(self, bucket, prefix, continuation_token=None):
+        self.listed_prefixes.append(prefix)
+        keys = sorted(key for key in self.objects if key.startswith(prefix))
+        start = int(continuation_token or 0)
+        page = [{'Key': key, 'Size': self.objects[key]} for key in keys[start:start + 2]]
+        return page, str(start + 2) if start + 2 < len(keys) else None
+
+
+class FakeScalars:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def scalars(self, statement):
+        return FakeScalars(self.rows)
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeScalars([(row.bucket, row.scanned_at) for row in self.rows if row.prefix == ""])
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.unit
+class TestInventoryDeltas:
+    """Тесты приращений инвентаря"""
+
+    @pytest.mark.parametrize("key, prefix", [
+        ("blobs/abc", "blobs/"),
+        ("users/1/2026/a.mp3", "users/"),
+        ("root.mp3", "")
+    ])
+    def test_prefix(self, key, prefix):
+        assert inventory_prefix(key) == prefix
+
+    def test_upload_and_delete_cancel_out(self):
+        inventory = StorageInventory()
+        inventory.record("tracks", "blobs/a", 100)
+        inventory.record("tracks", "blobs/b", 50)
+        inventory.record("tracks", "blobs/a", -100, objects=-1)
+
+        drained, since = inventory._drain()
+        assert drained[("tracks", "blobs/")] == [1, 50]
+        assert inventory.pending() == 0
+
+        inventory._restore(drained, since)
+        assert inventory._deltas[("tracks", "blobs/")] == [1, 50]
+        assert inventory._since[("tracks", "blobs/")] == since[("tracks", "blobs/")]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInventoryScan:
+    """Тесты полного листинга и статистики"""
+
+    async def test_scan_counts_every_page(self):
+        """Больше одной страницы на префикс; blobs/ листается 16 частями"""
+        objects = {key: 10 for key in BLOBS}
+        objects.update({f"users/1/{i}.mp3": 1 for i in range(5)})
+        objects["readme.txt"] = 7
+        storage = FakeBucketStorage(objects)
+
+        totals = await StorageInventory().scan_bucket("tracks", storage)
+
+        assert totals == {"": (1, 7), "blobs/": (48, 480), "users/": (5, 5)}
+        assert {prefix for prefix in storage.listed_prefixes if prefix.startswith("blobs/")} == {
+            f"blobs/{char}" for char in "0123456789abcdef"
+        }
+
+    async def test_stats_include_pending_deltas(self):
+        """Статистика складывает строки таблицы и еще не сброшенные приращения"""
+        scanned_at = datetime(2026, 10, 18)
+        rows = [
+            SimpleNamespace(bucket="tracks", prefix="blobs/", object_count=10, total_bytes=1000, scanned_at=scanned_at),
+            SimpleNamespace(bucket="tracks", prefix="", object_count=0, total_bytes=0, scanned_at=scanned_at),
+        ]
+        inventory = StorageInventory()
+        inventory.record("tracks", "blobs/new", 24)
+
+        stats = await inventory.stats(FakeSession(rows), buckets=["tracks", "covers"])
+
+        assert stats['buckets']['tracks']['objects'] == 11
+        assert stats['buckets']['tracks']['prefixes'] == {"blobs/": {'objects': 11, 'size_bytes': 1024}}
+        assert stats['buckets']['tracks']['scanned_at'] == scanned_at
+        assert stats['buckets']['covers']['objects'] == 0
+        assert stats['total_size'] == 1024
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInventoryFlush:
+    """Тесты сброса приращений относительно сверки"""
+
+    async def test_deltas_before_scan_are_skipped(self):
+        """Приращение, начатое до начала сверки, уже учтено листингом"""
+        inventory = StorageInventory()
+        inventory.record("tracks", "blobs/a", 100)
+        inventory.record("covers", "covers/a", 10)
+        inventory._since[("tracks", "blobs/")] = datetime(2026, 10, 18, 11)
+        inventory._since[("covers", "covers/")] = datetime(2026, 10, 18, 13)
+        rows = [SimpleNamespace(bucket=bucket, prefix="", scanned_at=datetime(2026, 10, 18, 12))
+                for bucket in ("tracks", "covers")]
+        session = FakeSession(rows)
+
+        assert await inventory.flush(session) == 1
+        params = session.statements[-1].compile(dialect=postgresql.dialect()).params
+        assert "covers" in params.values()
+        assert "tracks" not in params.values()
+        assert inventory.pending() == 0
@@ -0,0 +1,83 @@
+import pytest
+
+from app.services.suggest_index import SuggestIndex, normalize_text
+
+
+@pytest.mark.unit
+class TestSuggestIndex:
+    """Тесты индекса префиксов для автодополнения"""
+
+    @pytest.fixture
+    def index(self):
+        index = SuggestIndex(top_k=3)
+        index.add_track(1, "Bohemian Rhapsody", "Queen", popularity=90)
+        index.add_track(2, "Bohemian Like You", "The Dandy Warhols", popularity=60)
+        index.add_track(3, "Boulevard of Broken Dreams", "Green Day", popularity=80)
+        index.add_track(4, "Body Count", "Ice-T", popularity=10)
+        index.add_artist(10, "Björk", weight=70)
+        return index
+
+    def test_normalize_text(self):
+        """Нормализация регистра, пробелов и диакритики"""
+        assert normalize_text("  BJÖRK   Guðmundsdóttir ") == "bjork guðmundsdottir"
+        assert normalize_text("") == ""
+
+    def test_prefix_ranked_by_popularity(self, index):
+        """Подсказки отсортированы по популярности"""
+        ids = [entry.entity_id for entry in index.suggest("bo", limit=10)]
+        assert ids == [1, 3, 2]
+
+    def test_edge_split_and_exact_prefix(self, index):
+        """Префикс, заканчивающийся внутри ребра дерева"""
+        ids = [entry.entity_id for entry in index.suggest("bohemian l")]
+        assert ids == [2]
+        assert index.suggest("bohemian x") == []
+
+    def test_word_start_match_and_kind_filter(self, index):
+        """Поиск по началу слова внутри названия и фильтр по типу"""
+        assert [entry.entity_id for entry in index.suggest("rhap")] == [1]
+        assert [entry.entity_id for entry in index.suggest("bjo", kind="artist")] == [10]
+        assert index.suggest("bjo", kind="track") == []
+
+    def test_remove_refills_top_k(self, index):
+        """После удаления top-k пересчитывается из поддерева"""
+        index.remove("track", 1)
+        ids = [entry.entity_id for entry in index.suggest("bo", limit=10)]
+        assert ids == [3, 2, 4]
+
+    def test_update_changes_weight(self, index):
+        """Повторное добавление обновляет вес записи"""
+        index.add_track(4, "Body Count", "Ice-T", popularity=100)
+        assert index.suggest("bo", limit=1)[0].entity_id == 4
+        assert len(index) == 5
+
+    def test_snapshot_roundtrip(self, index, tmp_path):
+        """Сохранение и загрузка снимка индекса"""
+        path = str(tmp_path / "suggest.json.gz")
+        index.save_snapshot(path)
+
+        restored = SuggestIndex(top_k=3)
+        assert restored.load_snapshot(path)
+        assert restored.ready
+        assert [e.entity_id for e in restored.suggest("bo")] == [e.entity_id for e in index.suggest("bo")]
+
+    def test_kind_filter_beyond_shared_top_k(self, index):
+        """Фильтр по типу добирает записи из поддерева, если top-k узла занят другим типом"""
+        index.add_artist(11, "Bon Jovi", weight=5)
+        assert [entry.entity_id for entry in index.suggest("bo", limit=3)] == [1, 3, 2]
+        assert [entry.entity_id for entry in index.suggest("bo", kind="artist")] == [11]
+        assert [entry.entity_id for entry in index.suggest("bo", limit=4, kind="track")] == [1, 3, 2, 4]
+
+    def test_snapshot_rejected_for_changed_catalog(self, index, tmp_path):
+        """Снимок другого состояния каталога или слишком старый не загружается"""
+        path = str(tmp_path / "suggest.json.gz")
+        index.catalog_state = [4, 4, None, 1, 10]
+        index.built_at = 1000.0
+        index.save_snapshot(path)
+
+        assert not SuggestIndex().load_snapshot(path, [5, 5, None, 1, 10])
+        assert not SuggestIndex().load_snapshot(path, [4, 4, None, 1, 10], max_age_seconds=60)
+        restored = SuggestIndex()
+        assert restored.load_snapshot(path, [4, 4, None, 1, 10])
+        assert restored.catalog_state == [4, 4, None, 1, 10]
+        assert [p.name for p in tmp_path.iterdir()] == ["suggest.json.gz"]
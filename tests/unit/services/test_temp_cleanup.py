@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.storage_inventory import storage_inventory
+from app.services.temp_cleanup import TempCleanup
+
+OLD = datetime.now(timezone.utc) - timedelta(days=3)
+FRESH = datetime.now(timezone.utc)
+
+
+class FakeTempBucket:
+    """Bucket temp в памяти: листинг по порядку ключей со StartAfter, удаление пачками"""
+
+    def __init__(self, objects, page_size=1000, fail_keys=()):
+        self.objects = dict(objects)
+        self.page_size = page_size
+        self.fail_keys = set(fail_keys)
+        self.listings = []
+        self.batches = []
+
+    async def list_objects_page(self, bucket, prefix, continuation_token, max_keys, start_after=None):
+        self.listings.append((continuation_token, start_after))
+        keys = sorted(self.objects)
+        if continuation_token is not None:
+            start = int(continuation_token)
+        else:
+            start = len([key for key in keys if start_after is not None and key <= start_after])
+        end = start + min(self.page_size, max_keys)
+        page = [
+            {'Key': key, 'Size': self.objects[key][1], 'LastModified': self.objects[key][0]}
+            for key in keys[start:end]
+        ]
+        return page, str(end) if end < len(keys) else None
+
+    async def delete_objects_batch(self, bucket, keys):
+        self.batches.append(list(keys))
+        # Первая пачка завершается последней: позиция не должна обгонять незавершенные пачки
+        await asyncio.sleep(0.01 if len(self.batches) == 1 else 0)
+        for key in keys:
+            if key not in self.fail_keys:
+                self.objects.pop(key)
+        return [key for key in keys if key in self.fail_keys]
+
+
+def temp_objects(count, modified=OLD, size=10):
+    return {f"upload/{i:05d}": (modified, size) for i in range(count)}
+
+
+@pytest.fixture(autouse=True)
+def clean_inventory():
+    storage_inventory._drain()
+    yield
+    storage_inventory._drain()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTempCleanup:
+    """Тесты постраничной очистки bucket temp"""
+
+    async def test_deletes_whole_bucket_in_batches(self):
+        """Больше одной страницы; пачки не больше 1000 ключей, свежие объекты не трогаются"""
+        objects = temp_objects(2500)
+        objects.update({f"upload/fresh{i}": (FRESH, 10) for i in range(3)})
+        bucket = FakeTempBucket(objects, page_size=700)
+        checkpoints = []
+
+        async def on_checkpoint(position):
+            checkpoints.append(position)
+
+        report = await TempCleanup(bucket, "temp", concurrency=3).run(24, on_checkpoint=on_checkpoint)
+
+        assert report['completed'] is True
+        assert report['position'] is None
+        assert report['scanned'] == 2503
+        assert report['deleted'] == 2500
+        assert report['deleted_bytes'] == 25000
+        assert [len(batch) for batch in bucket.batches] == [1000, 1000, 500]
+        assert sorted(bucket.objects) == [f"upload/fresh{i}" for i in range(3)]
+        assert checkpoints == sorted(checkpoints)
+        assert storage_inventory._drain()[0][("temp", "upload/")] == [-2500, -25000]
+
+    async def test_resumes_after_position(self):
+        """Прерванный по бюджету проход сохраняет позицию, следующий начинает после нее"""
+        bucket = FakeTempBucket(temp_objects(30), page_size=10)
+        cleanup = TempCleanup(bucket, "temp", batch_size=4)
+
+        first = await cleanup.run(24, time_budget_seconds=1e-9)
+
+        assert first['completed'] is False
+        assert first['position'] == "upload/00009"
+        assert first['deleted'] == 10
+
+        second = await cleanup.run(24, start_after=first['position'])
+
+        assert bucket.listings[1] == (None, "upload/00009")
+        assert second['completed'] is True
+        assert second['deleted'] == 20
+        assert bucket.objects == {}
+
+    async def test_failed_keys_not_counted(self):
+        bucket = FakeTempBucket(temp_objects(5), fail_keys={"upload/00002"})
+
+        report = await TempCleanup(bucket, "temp").run(24)
+
+        assert report['deleted'] == 4
+        assert report['failed'] == 1
+        assert report['deleted_bytes'] == 40
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.track import TrackUpdate
+from app.services.track_service import TrackService
+from app.services.track_metadata import TrackRefs, invalidate_track_refs, resolve_track_refs, track_metadata_cache
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Сессия, отдающая ссылки треков из словаря и считающая запросы"""
+
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        ids = statement.whereclause.right.value
+        return FakeResult([(track_id, *self.tracks[track_id]) for track_id in ids if track_id in self.tracks])
+
+
+class TrackStore(FakeSession):
+    """Та же таблица для TrackService: commit записывает измененные поля трека"""
+
+    def __init__(self, tracks):
+        super().__init__(tracks)
+        self.pending = None
+
+    async def commit(self):
+        track = self.pending
+        self.tracks[track.id] = (track.artist_id, track.album_id, track.genre_id)
+
+    async def refresh(self, instance):
+        pass
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTrackRefs:
+    """Тесты кэша ссылок трека для записи прослушиваний"""
+
+    def setup_method(self):
+        track_metadata_cache.clear()
+
+    async def test_cached_after_first_lookup(self):
+        """Повторное разрешение тех же треков не ходит в базу"""
+        session = FakeSession({1: (10, 20, 30), 2: (11, None, None)})
+
+        refs = await resolve_track_refs(session, [1, 2, 1])
+        assert refs[1] == TrackRefs(artist_id=10, album_id=20, genre_id=30)
+        assert refs[2].album_id is None
+
+        await resolve_track_refs(session, [2, 1])
+        assert session.queries == 1
+
+    async def test_unknown_tracks_missing(self):
+        """Несуществующих треков нет в результате"""
+        refs = await resolve_track_refs(FakeSession({1: (10, 20, 30)}), [1, 99])
+        assert set(refs) == {1}
+
+    async def test_invalidate(self):
+        """После изменения трека ссылки читаются заново"""
+        session = FakeSession({1: (10, 20, 30)})
+        await resolve_track_refs(session, [1])
+        session.tracks[1] = (12, 20, 30)
+        invalidate_track_refs(1)
+
+        refs = await resolve_track_refs(session, [1])
+        assert refs[1].artist_id == 12
+        assert session.queries == 2
+
+    async def test_update_track_changes_artist(self):
+        """Смена исполнителя через TrackService сразу видна при записи прослушиваний"""
+        store = TrackStore({1: (10, 20, 30)})
+        assert (await resolve_track_refs(store, [1]))[1].artist_id == 10
+
+        service = TrackService(store)
+        store.pending = SimpleNamespace(id=1, artist_id=10, album_id=20, genre_id=30)
+
+        async def get_track(track_id):
+            return store.pending
+
+        service.get_track = get_track
+        await service.update_track(1, TrackUpdate(artist_id=12))
+
+        refs = await resolve_track_refs(store, [1])
+        assert refs[1] == TrackRefs(artist_id=12, album_id=20, genre_id=30)
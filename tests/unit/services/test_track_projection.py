@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+from pydantic import BaseModel
+
+from app.schemas.track import TrackWithDetails
+from app.services.track_projection import TRACK_DETAIL_FIELDS, compile_row_mapper, rows_to_track_details
+
+
+ROW = {
+    "id": 7, "title": "Song", "artist_id": 1, "album_id": None, "genre_id": 3,
+    "duration_ms": 180000, "explicit": False, "popularity": 42, "preview_url": None,
+    "file_path": "/music/7.mp3", "tempo": 120.5, "energy": 0.7, "valence": 0.4,
+    "danceability": 0.6, "spotify_id": None, "created_at": datetime(2024, 5, 1, 12, 0),
+    "artist_name": "Artist", "artist_image_url": None, "album_title": None,
+    "album_cover_url": None, "genre_name": "Rock",
+}
+
+
+@pytest.mark.unit
+class TestTrackProjection:
+    """Тесты маппера строк Core-проекции в TrackWithDetails"""
+
+    def test_matches_validated_model(self):
+        """Маппер дает ту же схему, что и валидация"""
+        row = tuple(ROW[field] for field in TRACK_DETAIL_FIELDS)
+        track = rows_to_track_details([row])[0]
+
+        expected = TrackWithDetails(**ROW)
+        assert track == expected
+        assert track.model_dump_json() == expected.model_dump_json()
+        assert track.model_fields_set == set(TrackWithDetails.model_fields)
+
+    def test_extra_columns_ignored(self):
+        """Дополнительные колонки в конце строки (например, rank) не попадают в схему"""
+        row = tuple(ROW[field] for field in TRACK_DETAIL_FIELDS) + (0.93,)
+        assert rows_to_track_details([row])[0].model_dump() == TrackWithDetails(**ROW).model_dump()
+
+    def test_projection_must_cover_schema(self):
+        """Проекция без части полей схемы отклоняется при сборке маппера"""
+        class Partial(BaseModel):
+            id: int
+            title: str
+
+        with pytest.raises(ValueError):
+            compile_row_mapper(Partial, ("id",))
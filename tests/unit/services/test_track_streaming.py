@@ -0,0 +1,83 @@
+import io
+
+import pytest
+
+from app.services import track_streaming
+from app.services.track_streaming import _relay, etag_matches, parse_byte_range, resolve_local_track
+
+
+class FakeBody(io.BytesIO):
+    """Тело ответа S3 с учетом прочитанных кусков"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.mark.unit
+class TestRangeHeaders:
+    """Тесты разбора Range и If-None-Match"""
+
+    @pytest.mark.parametrize("header, expected", [
+        ("bytes=0-99", "bytes=0-99"),
+        ("bytes=100-", "bytes=100-"),
+        ("bytes=-500", "bytes=-500"),
+        ("bytes = 10 - 20", "bytes=10-20"),
+    ])
+    def test_single_range(self, header, expected):
+        assert parse_byte_range(header) == expected
+
+    @pytest.mark.parametrize("header", [None, "", "bytes=-", "bytes=20-10", "bytes=0-1,5-9", "items=0-1"])
+    def test_ignored_range(self, header):
+        """Некорректный или составной диапазон отдает файл целиком"""
+        assert parse_byte_range(header) is None
+
+    def test_etag_list_and_weak(self):
+        assert etag_matches('"a", W/"b"', '"b"')
+        assert etag_matches("*", '"c"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"a"')
+
+
+@pytest.mark.unit
+class TestLocalTracks:
+    """Тесты поиска локальных файлов"""
+
+    def test_traversal_rejected(self, tmp_path, monkeypatch):
+        """Пути вне каталогов треков не отдаются"""
+        root = tmp_path / "tracks"
+        root.mkdir()
+        (root / "a.mp3").write_bytes(b"ID3")
+        (tmp_path / "secret.txt").write_text("x")
+        monkeypatch.setattr(track_streaming, "LOCAL_TRACK_ROOTS", (root,))
+
+        assert resolve_local_track(str(root / "a.mp3")) == (root / "a.mp3").resolve()
+        assert resolve_local_track(str(root / ".." / "secret.txt")) is None
+        assert resolve_local_track(str(root / "missing.mp3")) is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRelay:
+    """Тесты проксирования тела S3"""
+
+    async def test_chunks_and_close(self):
+        body = FakeBody(b"x" * 25)
+        chunks = [chunk async for chunk in _relay(body, 10)]
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert body.closed
+
+    async def test_disconnect_closes_body(self):
+        """Остановка отдачи после первого куска закрывает соединение и не дочитывает объект"""
+        body = FakeBody(b"x" * 1000)
+        relay = _relay(body, 10)
+        assert await relay.__anext__() == b"x" * 10
+        await relay.aclose()
+
+        assert body.closed
+        assert body.reads <= 2
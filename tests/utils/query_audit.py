@@ -0,0 +1,53 @@
+"""
+Аудит планов запросов
+Перехватывает SELECT-запросы, которые выполняют сервисы, и проверяет их планы через EXPLAIN:
+последовательное сканирование большой таблицы в горячем запросе означает пропущенный индекс.
+"""
+
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+def _walk_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_plan(child)
+
+
+class QueryPlanAudit:
+    """Собирает выполненные запросы и ищет в их планах Seq Scan по большим таблицам"""
+
+    def __init__(self, engine: AsyncEngine, large_tables: Iterable[str]):
+        self.engine = engine
+        self.large_tables = set(large_tables)
+        self.statements: List[Tuple[str, Any]] = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+    @contextmanager
+    def capture(self):
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._capture)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", self._capture)
+
+    async def seq_scans(self, connection: AsyncConnection) -> List[Dict[str, str]]:
+        """Запросы, план которых читает большую таблицу целиком"""
+        violations = []
+        for statement, parameters in self.statements:
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+
+            for node in _walk_plan(plan[0]["Plan"]):
+                if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in self.large_tables:
+                    violations.append({"table": node["Relation Name"], "statement": statement})
+        return violations